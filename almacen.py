@@ -0,0 +1,99 @@
+# IMPORTS
+import glob
+import os
+import uuid
+
+import pandas as pd
+
+import trazas
+
+
+
+#####################################################
+## Almacén local particionado por año y mes
+#####################################################
+
+# Los datos ya normalizados (ver ingesta.py) se guardan en Parquet con esta
+# estructura:
+#
+#   Datos/Almacen/<fuente>/year=2023/month=07/part-<id>.parquet
+#
+# El año y el mes se toman del datetime en UTC, el mismo que usan los prep_*
+# para la columna date, así que un día nunca queda repartido entre dos
+# particiones. El dashboard lee solo las particiones que necesita la vista.
+
+RAIZ = 'Datos/Almacen'
+
+FUENTES = ('generacion', 'precio_es', 'precio_eu', 'emisiones')
+
+
+def _dir_particion(fuente, anio, mes, raiz=RAIZ):
+    return os.path.join(raiz, fuente, 'year=%04d' % anio, 'month=%02d' % mes)
+
+
+def existe(fuente=None, raiz=RAIZ):
+    """True si el almacén (o la fuente indicada) tiene al menos una partición."""
+    patron = os.path.join(raiz, fuente or '*', 'year=*', 'month=*', '*.parquet')
+    return bool(glob.glob(patron))
+
+
+def borrar(fuente, raiz=RAIZ):
+    """Elimina todos los ficheros de una fuente (antes de volver a ingerirla)."""
+    for ruta in glob.glob(os.path.join(raiz, fuente, 'year=*', 'month=*', '*.parquet')):
+        os.remove(ruta)
+
+
+def escribir(fuente, df, raiz=RAIZ):
+    """Añade las filas de df a sus particiones (un fichero nuevo por partición)."""
+    fechas = df['datetime'].dt.tz_convert('UTC')
+    rutas = []
+    for (anio, mes), grupo in df.groupby([fechas.dt.year, fechas.dt.month], sort=True):
+        carpeta = _dir_particion(fuente, anio, mes, raiz)
+        os.makedirs(carpeta, exist_ok=True)
+        ruta = os.path.join(carpeta, 'part-%s.parquet' % uuid.uuid4().hex[:12])
+        grupo.to_parquet(ruta, index=False)
+        rutas.append(ruta)
+    return rutas
+
+
+def particion(ruta, raiz=RAIZ):
+    """(fuente, año, mes) de un fichero del almacén (None si no es de una partición)."""
+    partes = os.path.relpath(ruta, raiz).split(os.sep)
+    if (len(partes) != 4 or partes[0] not in FUENTES
+            or not partes[1].startswith('year=') or not partes[2].startswith('month=')):
+        return None
+    return partes[0], int(partes[1][5:]), int(partes[2][6:])
+
+
+def meses(fuente, raiz=RAIZ):
+    """Lista ordenada de (año, mes) con datos para la fuente."""
+    resultado = set()
+    for carpeta in glob.glob(os.path.join(raiz, fuente, 'year=*', 'month=*')):
+        anio = int(os.path.basename(os.path.dirname(carpeta)).split('=')[1])
+        mes = int(os.path.basename(carpeta).split('=')[1])
+        if glob.glob(os.path.join(carpeta, '*.parquet')):
+            resultado.add((anio, mes))
+    return sorted(resultado)
+
+
+def anios(fuente, raiz=RAIZ):
+    return sorted({anio for anio, _ in meses(fuente, raiz)})
+
+
+def ficheros(fuente, anio, mes, raiz=RAIZ):
+    """Ficheros Parquet de una partición (lista vacía si no existe)."""
+    return sorted(glob.glob(os.path.join(_dir_particion(fuente, anio, mes, raiz), '*.parquet')))
+
+
+@trazas.medir('lectura')
+def leer(fuente, anio, mes, raiz=RAIZ):
+    """Lee una partición completa (None si no existe)."""
+    rutas = ficheros(fuente, anio, mes, raiz)
+    if not rutas:
+        return None
+    df = pd.concat([pd.read_parquet(r) for r in rutas], ignore_index=True)
+
+    # concat solo conserva la categoría si todos los ficheros tienen las mismas
+    if 'name' in df and not isinstance(df['name'].dtype, pd.CategoricalDtype):
+        df['name'] = df['name'].astype('category')
+    return df
@@ -0,0 +1,207 @@
+# Benchmarks de tiempo y pico de memoria de cada prep_* y de cada constructor
+# get_plot_* (incluida la serialización del gráfico a Vega-Lite, que es lo que
+# Streamlit envía al navegador), con datos sintéticos (sintetico.py).
+#
+# Los resultados se comparan con benchmarks/baselines.json y el script termina
+# con código 1 si algún caso empeora más que el umbral.
+#
+# Uso (desde la raíz del repositorio):
+#   python benchmarks/bench.py                      # compara con la línea base
+#   python benchmarks/bench.py --guardar            # actualiza la línea base
+#   python benchmarks/bench.py --anios 10 --paises 30 --resolucion 15min
+#   python benchmarks/bench.py --casos prep_g1 get_plot_generacion_dia
+
+import argparse
+import datetime as dt
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sintetico
+from cubo import Cubo
+from emisiones_paises import EmisionesPaises
+from estadisticas_precio import TOTAL, EstadisticasPrecio
+from graficos import (get_plot_generacion_dia, get_plot_generacion_dia_media, get_plot_generacion_anual,
+                      get_plot_generacion_mensual, get_plot_generacion_rango, get_plot_generacion_rango_mix,
+                      get_plot_precio_hora, prices, get_plot_precio_rango, prices_rango,
+                      get_plot_precio_hora_eu, get_plot_precio_eu_rango, get_plot_estadisticas_precio,
+                      get_plot_emisiones_eu, get_plot_emisiones_dia_hora, get_plot_emisiones_comparar,
+                      get_plot_resumen_potencia_emis, get_plot_potencia_emis_pais, get_plot_correlacion_movil,
+                      get_plot_descomposicion)
+from indice import indexar
+from potencia_emisiones import PotenciaEmisiones
+from precios_horarios import PreciosHorarios
+from preprocesado import prep_g1, prep_g3, prep_g4, prep_b1, prep_b2, prep_c1, prep_c2, normalizar_c1
+
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+# Por debajo de este tiempo las diferencias son ruido y no cuentan como regresión
+MINIMO_S = 0.005
+
+
+def preparar(anios, paises, resolucion):
+    # Datos crudos y ya preparados, como los tiene el dashboard tras la carga
+    datos = {
+        'generacion': sintetico.generacion(anios, resolucion),
+        'precio_es': sintetico.precio_es(anios, resolucion),
+        'precio_eu': sintetico.precio_eu(anios, paises, resolucion),
+        'emisiones': sintetico.intensidad_carbono(anios, paises, resolucion),
+        'potencia': sintetico.combinado(anios, paises),
+    }
+    datos['cubo_G'] = Cubo.desde(prep_g1(datos['generacion']))
+    datos['df_B1'], datos['idx_B1'] = indexar(prep_b1(datos['precio_es']))
+    datos['df_B2'], datos['idx_B2'] = indexar(prep_b2(datos['precio_eu']))
+    datos['cubo_B1'] = Cubo.desde(datos['df_B1'])
+    datos['cubo_B2'] = Cubo.desde(datos['df_B2'])
+    datos['estad_B1'] = EstadisticasPrecio.desde_cubo(datos['cubo_B1'], total=True)
+    datos['precios_B2'] = PreciosHorarios.desde_cubo(datos['cubo_B2'])
+    datos['estad_B2'] = EstadisticasPrecio.desde_horarios(datos['precios_B2'])
+    datos['df_emis_avg'] = prep_c1(datos['emisiones'].copy())
+    datos['emis_C'] = EmisionesPaises.desde_cubo(Cubo.desde(normalizar_c1(datos['emisiones'].copy())), 2023)
+    datos['analisis_C'] = PotenciaEmisiones.desde(datos['emis_C'], datos['potencia'])
+    return datos
+
+
+def casos(datos):
+    # nombre -> función sin argumentos. Las entradas que la función modifica se
+    # copian en una función aparte, fuera de la medición
+    fecha = dt.datetime(2023, 7, 15)
+    anio = 2023
+    # Trimestre que contiene la fecha (consultas por periodo)
+    desde, hasta = dt.date(2023, 7, 1), dt.date(2023, 10, 1)
+
+    def serializar(constructor):
+        return lambda: constructor().to_dict()
+
+    return {
+        'prep_g1': (lambda: (datos['generacion'].copy(),), prep_g1),
+        'prep_g3': (lambda: (datos['generacion'].copy(),), prep_g3),
+        'prep_g4': (lambda: (datos['generacion'].copy(),), prep_g4),
+        'prep_b1': (lambda: (datos['precio_es'].copy(),), prep_b1),
+        'prep_b2': (lambda: (datos['precio_eu'].copy(),), prep_b2),
+        'prep_c1': (lambda: (datos['emisiones'].copy(),), prep_c1),
+        'prep_c2': (lambda: (datos['df_emis_avg'], datos['potencia'].copy()), prep_c2),
+        'cubo_generacion': (lambda: (prep_g1(datos['generacion']),), Cubo.desde),
+        'get_plot_generacion_dia': (tuple, serializar(lambda: get_plot_generacion_dia(fecha, datos['cubo_G']))),
+        'get_plot_generacion_dia_media': (tuple, serializar(lambda: get_plot_generacion_dia_media(fecha, datos['cubo_G']))),
+        'get_plot_generacion_anual': (tuple, serializar(lambda: get_plot_generacion_anual(datos['cubo_G'].anual(anio)))),
+        'get_plot_generacion_mensual': (tuple, serializar(lambda: get_plot_generacion_mensual(datos['cubo_G'].mensual(anio), anio))),
+        'get_plot_precio_hora': (tuple, serializar(lambda: get_plot_precio_hora(fecha, datos['df_B1'], datos['idx_B1'], datos['cubo_B1']))),
+        'prices': (tuple, lambda: prices(fecha, datos['df_B1'], datos['idx_B1'])),
+        'precios_horarios': (tuple, lambda: PreciosHorarios.desde_cubo(datos['cubo_B2'])),
+        'estadisticas_precio': (tuple, lambda: EstadisticasPrecio.desde_horarios(datos['precios_B2'])),
+        'estadisticas_resumen': (tuple, lambda: datos['estad_B1'].resumen(fecha, TOTAL)),
+        'get_plot_estadisticas_precio': (tuple, serializar(lambda: get_plot_estadisticas_precio(
+            'media', datos['estad_B2'].paises, datos['estad_B2']))),
+        'get_plot_generacion_rango': (tuple, serializar(lambda: get_plot_generacion_rango(desde, hasta, datos['cubo_G']))),
+        'get_plot_generacion_rango_mix': (tuple, serializar(lambda: get_plot_generacion_rango_mix(desde, hasta, datos['cubo_G']))),
+        'get_plot_precio_rango': (tuple, serializar(lambda: get_plot_precio_rango(desde, hasta, datos['cubo_B1']))),
+        'prices_rango': (tuple, lambda: prices_rango(desde, hasta, datos['cubo_B1'])),
+        'get_plot_precio_eu_rango': (tuple, serializar(lambda: get_plot_precio_eu_rango(desde, hasta, datos['cubo_B2']))),
+        'get_plot_precio_hora_eu': (tuple, serializar(lambda: get_plot_precio_hora_eu(fecha, datos['precios_B2']))),
+        'get_plot_emisiones_eu': (tuple, serializar(lambda: get_plot_emisiones_eu('España', datos['emis_C']))),
+        'get_plot_emisiones_dia_hora': (tuple, serializar(lambda: get_plot_emisiones_dia_hora('España', datos['emis_C']))),
+        'get_plot_emisiones_comparar': (tuple, serializar(lambda: get_plot_emisiones_comparar(datos['emis_C'].paises[:6],
+                                                                                               datos['emis_C']))),
+        'PotenciaEmisiones': (tuple, lambda: PotenciaEmisiones.desde(datos['emis_C'], datos['potencia'])),
+        'get_plot_resumen_potencia_emis': (tuple, serializar(lambda: get_plot_resumen_potencia_emis(datos['analisis_C']))),
+        'get_plot_potencia_emis_pais': (tuple, serializar(lambda: get_plot_potencia_emis_pais('España', datos['analisis_C']))),
+        'get_plot_correlacion_movil': (tuple, serializar(lambda: get_plot_correlacion_movil('España', datos['analisis_C']))),
+        'get_plot_descomposicion': (tuple, serializar(lambda: get_plot_descomposicion('España', datos['analisis_C']))),
+    }
+
+
+def medir(entradas, funcion, repeticiones):
+    # Mejor tiempo de varias repeticiones (sin tracemalloc, que ralentiza) y
+    # pico de memoria de una ejecución aparte
+    tiempos = []
+    for _ in range(repeticiones):
+        argumentos = entradas()
+        inicio = time.perf_counter()
+        funcion(*argumentos)
+        tiempos.append(time.perf_counter() - inicio)
+
+    argumentos = entradas()
+    tracemalloc.start()
+    funcion(*argumentos)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'tiempo_s': min(tiempos), 'pico_mb': pico / 2**20}
+
+
+def comparar(resultado, base, umbral):
+    # Devuelve la lista de métricas que empeoran más que el umbral
+    peores = []
+    if resultado['tiempo_s'] > max(base['tiempo_s'] * (1 + umbral), base['tiempo_s'] + MINIMO_S):
+        peores.append('tiempo')
+    if resultado['pico_mb'] > max(base['pico_mb'] * (1 + umbral), base['pico_mb'] + 1):
+        peores.append('memoria')
+    return peores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de los prep_* y get_plot_* del dashboard')
+    parser.add_argument('--anios', type=int, default=1, help='Años de histórico (1-50)')
+    parser.add_argument('--paises', type=int, default=8, help='Países en precios EU y emisiones (8-31)')
+    parser.add_argument('--resolucion', choices=sorted(sintetico.RESOLUCIONES), default='h')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--casos', nargs='+', help='Ejecutar solo estos casos')
+    parser.add_argument('--umbral', type=float, default=0.25, help='Empeoramiento relativo tolerado')
+    parser.add_argument('--guardar', action='store_true', help='Guardar los resultados como línea base')
+    parser.add_argument('--baselines', default=BASELINES)
+    args = parser.parse_args()
+
+    escala = '%da-%dp-%s' % (args.anios, args.paises, args.resolucion)
+    baselines = {}
+    if os.path.exists(args.baselines):
+        with open(args.baselines, encoding='utf-8') as f:
+            baselines = json.load(f)
+    base = baselines.get(escala, {})
+
+    print('Escala %s: generando datos...' % escala)
+    datos = preparar(args.anios, args.paises, args.resolucion)
+    todos = casos(datos)
+    seleccion = args.casos or list(todos)
+
+    resultados = {}
+    regresiones = []
+    print('%-31s %10s %10s %12s %12s' % ('caso', 'tiempo (s)', 'pico (MB)', 'base (s)', 'base (MB)'))
+    for nombre in seleccion:
+        entradas, funcion = todos[nombre]
+        try:
+            r = medir(entradas, funcion, args.repeticiones)
+        except Exception as e:
+            # Un caso que falla a esta escala (p. ej. MaxRowsError de Altair)
+            # no impide medir el resto; tampoco entra en la línea base
+            print('%-31s ERROR: %s' % (nombre, str(e).splitlines()[0]))
+            regresiones.append((nombre, ['error']))
+            continue
+        resultados[nombre] = r
+
+        previo = base.get(nombre)
+        peores = comparar(r, previo, args.umbral) if previo and not args.guardar else []
+        if peores:
+            regresiones.append((nombre, peores))
+        print('%-31s %10.4f %10.2f %12s %12s %s' % (
+            nombre, r['tiempo_s'], r['pico_mb'],
+            '%.4f' % previo['tiempo_s'] if previo else '-',
+            '%.2f' % previo['pico_mb'] if previo else '-',
+            'REGRESIÓN (%s)' % ', '.join(peores) if peores else ''))
+
+    if args.guardar:
+        baselines[escala] = {**base, **resultados}
+        with open(args.baselines, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('Línea base guardada en %s' % args.baselines)
+    elif regresiones:
+        print('%d casos empeoran más de un %.0f%% respecto a la línea base' % (len(regresiones), 100 * args.umbral))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Benchmark: carga de todas las fuentes de un año (lectura + prep_*) con
+# cargador.py, una etapa detrás de otra y en paralelo con varios hilos, en
+# procesos nuevos y sin los ficheros de compartido.py (arranque en frío).
+# Muestra el tiempo total y el inicio y la duración de cada etapa.
+#
+# Uso (desde la raíz del repositorio):
+#   python benchmarks/carga_fuentes.py [--datos /ruta/con/Datos] [--anio 2023] [--hilos 1 4]
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def medir(datos, anio, hilos):
+    os.chdir(datos)
+    sys.path.insert(0, RAIZ)
+    import cargador
+    import compartido
+    import fuentes
+    compartido.RAIZ = ''
+
+    anio = anio or fuentes.anios_disponibles()[-1]
+    inicio = time.perf_counter()
+    resultados = cargador.ejecutar(fuentes.etapas(anio), hilos)
+    total = time.perf_counter() - inicio
+    etapas = [(n, r.inicio, r.segundos, None if r.ok else repr(r.error)) for n, r in resultados.items()]
+    return total, sorted(etapas, key=lambda e: e[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Carga de las fuentes: secuencial frente a paralela')
+    parser.add_argument('--datos', default=RAIZ, help='Directorio que contiene Datos/ (por defecto, el repositorio)')
+    parser.add_argument('--anio', type=int, default=None, help='Año (por defecto, el último disponible)')
+    parser.add_argument('--hilos', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context('spawn')
+    for hilos in args.hilos:
+        # Un proceso nuevo por medida: las cachés de carga.py empiezan vacías
+        with ProcessPoolExecutor(1, mp_context=contexto) as pool:
+            total, etapas = pool.submit(medir, os.path.abspath(args.datos), args.anio, hilos).result()
+        print('%d hilo(s): %.2f s' % (hilos, total))
+        for nombre, inicio, segundos, error in etapas:
+            print('  %-18s inicio %6.2f s  duración %6.2f s%s' % (nombre, inicio, segundos, '  ' + error if error else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Benchmark de la API HTTP de consultas (servidor.py): el servidor se arranca
+# en un proceso nuevo y varios clientes locales (hilos con conexiones
+# persistentes) piden una mezcla de consultas (todas las de consultas.py con
+# distintos meses y países). Para cada número de clientes se mide, en este
+# orden:
+#
+#   frio         primera petición de cada URL (sin resultado en caché)
+#   cache        las mismas URL ya en la caché de resultados
+#   gzip         igual, con Accept-Encoding: gzip
+#   condicional  con If-None-Match y el ETag recibido (respuestas 304)
+#
+# e informa de peticiones por segundo, latencia p50 y p95 y MB recibidos.
+#
+# Uso (desde la raíz del repositorio):
+#   python benchmarks/consultas_http.py [--datos /ruta/con/Datos] [--clientes 1 4 16] [--peticiones 400]
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import quote, urlencode
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ESCENARIOS = ('frio', 'cache', 'gzip', 'condicional')
+
+
+def _servidor(datos, cola):
+    # Proceso del servidor: puerto libre que se comunica por la cola
+    os.chdir(datos)
+    sys.path.insert(0, RAIZ)
+    import servidor
+    http_servidor = servidor.crear('127.0.0.1', 0)
+    cola.put(http_servidor.server_address[1])
+    http_servidor.serve_forever()
+
+
+def _get(conexion, ruta, cabeceras=None):
+    conexion.request('GET', ruta, headers=cabeceras or {})
+    respuesta = conexion.getresponse()
+    cuerpo = respuesta.read()
+    return respuesta.status, respuesta.getheader('ETag'), cuerpo
+
+
+def urls(conexion):
+    # Mezcla de consultas: cada mes del año por consulta, con todos los
+    # países y con dos al azar, más las anuales
+    anio = json.loads(_get(conexion, '/api/generacion_mensual')[2])['parametros']['anio']
+    # Países con datos el primer mes
+    mes = urlencode({'desde': '%d-01-01' % anio, 'hasta': '%d-02-01' % anio})
+    paises = {consulta: sorted({f['name'] for f in json.loads(_get(conexion, '/api/%s?%s' % (consulta, mes))[2])['datos']})
+              for consulta in ('precios_eu', 'emisiones_diarias')}
+    aleatorio = random.Random(0)
+    rutas = ['/api/generacion_mensual', '/api/estadisticas_precio']
+    for mes in range(1, 13):
+        rango = {'desde': '%d-%02d-01' % (anio, mes),
+                 'hasta': '%d-%02d-01' % (anio + mes // 12, mes % 12 + 1)}
+        rutas.append('/api/mix_diario?' + urlencode(rango))
+        rutas.append('/api/estadisticas_precio?' + urlencode(dict(rango, fuente='precio_es')))
+        for consulta, disponibles in paises.items():
+            rutas.append('/api/%s?%s' % (consulta, urlencode(rango)))
+            elegidos = aleatorio.sample(disponibles, min(2, len(disponibles)))
+            rutas.append('/api/%s?%s' % (consulta, urlencode(dict(rango, paises=','.join(elegidos)), quote_via=quote)))
+    return rutas
+
+
+def _cliente(puerto, rutas, escenario, etags, latencias, recibidos, errores):
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto)
+    try:
+        for ruta in rutas:
+            cabeceras = {}
+            if escenario == 'gzip':
+                cabeceras['Accept-Encoding'] = 'gzip'
+            elif escenario == 'condicional':
+                cabeceras['If-None-Match'] = etags[ruta]
+            inicio = time.perf_counter()
+            estado, etag, cuerpo = _get(conexion, ruta, cabeceras)
+            latencias.append(time.perf_counter() - inicio)
+            recibidos.append(len(cuerpo))
+            if estado not in (200, 304):
+                errores.append('%s: %d %s' % (ruta, estado, cuerpo[:200]))
+            if etag:
+                etags[ruta] = etag
+    finally:
+        conexion.close()
+
+
+def medir(puerto, rutas, clientes, peticiones, escenario, etags):
+    # Las peticiones se reparten entre los clientes; en frío cada URL se pide una vez
+    if escenario == 'frio':
+        tandas = [rutas[i::clientes] for i in range(clientes)]
+    else:
+        aleatorio = random.Random(clientes)
+        tandas = [[aleatorio.choice(rutas) for _ in range(peticiones // clientes)] for _ in range(clientes)]
+
+    latencias, recibidos, errores = [], [], []
+    hilos = [threading.Thread(target=_cliente, args=(puerto, t, escenario, etags, latencias, recibidos, errores))
+             for t in tandas]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    total = time.perf_counter() - inicio
+    return len(latencias) / total, np.array(latencias), sum(recibidos), errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rendimiento de la API HTTP de consultas')
+    parser.add_argument('--datos', default=RAIZ, help='Directorio que contiene Datos/ (por defecto, el repositorio)')
+    parser.add_argument('--clientes', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--peticiones', type=int, default=400, help='Peticiones por escenario (salvo en frío)')
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context('spawn')
+    print('%8s  %-12s %9s %9s %9s %9s' % ('clientes', 'escenario', 'pet/s', 'p50 (ms)', 'p95 (ms)', 'MB'))
+    for clientes in args.clientes:
+        # Un servidor nuevo por número de clientes: en frío la caché está vacía
+        cola = contexto.Queue()
+        proceso = contexto.Process(target=_servidor, args=(os.path.abspath(args.datos), cola), daemon=True)
+        proceso.start()
+        try:
+            puerto = cola.get(timeout=120)
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=600)
+            rutas = urls(conexion)
+            conexion.close()
+
+            etags = {}
+            for escenario in ESCENARIOS:
+                por_segundo, latencias, recibidos, errores = medir(puerto, rutas, clientes, args.peticiones,
+                                                                   escenario, etags)
+                p50, p95 = np.percentile(latencias, [50, 95]) * 1000
+                print('%8d  %-12s %9.0f %9.1f %9.1f %9.1f' % (clientes, escenario, por_segundo, p50, p95,
+                                                               recibidos / 2**20))
+                for error in errores[:3]:
+                    print('    error: %s' % error)
+        finally:
+            proceso.terminate()
+            proceso.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# Benchmark: latencia de filtrar un día con la máscara df['date'] == date frente
+# al índice por días, según los años de histórico cargados.
+#
+# Uso (desde la raíz del repositorio):
+#   python benchmarks/indice_dia.py [--anios 1 5 10 20]
+
+import argparse
+import datetime as dt
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sintetico
+from indice import indexar, filtrar_dia
+from preprocesado import prep_g1
+
+
+def datos_horarios(anios):
+    # Generación preparada (una fila por hora y tecnología), con la columna date
+    # de objetos datetime.date que usaba la máscara original
+    df = prep_g1(sintetico.generacion(anios))
+    df['date'] = df['datetime'].dt.date
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia de filtrar un día: máscara frente a índice')
+    parser.add_argument('--anios', type=int, nargs='+', default=[1, 5, 10, 20])
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    print('%6s %12s %14s %14s %10s' % ('años', 'filas', 'máscara (ms)', 'índice (ms)', 'mejora'))
+    for anios in args.anios:
+        df = datos_horarios(anios)
+        df_idx, indice = indexar(df)
+        date = dt.date(2023, 7, 15)
+
+        t_mascara = timeit.timeit(lambda: filtrar_dia(df, date), number=args.repeticiones)
+        t_indice = timeit.timeit(lambda: filtrar_dia(df_idx, date, indice), number=args.repeticiones)
+
+        assert len(filtrar_dia(df, date)) == len(filtrar_dia(df_idx, date, indice))
+        t_mascara, t_indice = (1000 * t / args.repeticiones for t in (t_mascara, t_indice))
+        print('%6d %12d %14.3f %14.3f %9.0fx' % (anios, len(df), t_mascara, t_indice, t_mascara / t_indice))
+
+
+if __name__ == '__main__':
+    main()
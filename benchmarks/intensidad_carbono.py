@@ -0,0 +1,61 @@
+# Benchmark: cálculo de la intensidad de carbono horaria (intensidad.py) según
+# los años de histórico y el número de países, con uno o varios procesos, y
+# comparación con el cálculo directo en pandas (pivot_table por país y hora).
+#
+# Uso (desde la raíz del repositorio):
+#   python benchmarks/intensidad_carbono.py [--anios 1 10 20] [--paises 31] [--procesos 1 4] [--referencia]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sintetico
+from intensidad import calcular, leer_factores, vector_factores
+
+
+def referencia(df, factores):
+    # Cálculo directo: tabla (país, hora) × tecnología y media ponderada por fila
+    tabla = df.pivot_table(index=['MapCode', 'datetime'], columns='ProductionTypeName',
+                           values='value', aggfunc='sum', observed=True)
+    resultado = {}
+    for pais in tabla.index.get_level_values(0).unique():
+        generacion = tabla.loc[pais]
+        ef = pd.Series(vector_factores(factores, pais, generacion.columns), index=generacion.columns)
+        resultado[pais] = (generacion * ef).sum(axis=1) / generacion.sum(axis=1)
+    return pd.DataFrame(resultado)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Intensidad de carbono horaria: escalado y paralelismo')
+    parser.add_argument('--anios', type=int, nargs='+', default=[1, 10, 20])
+    parser.add_argument('--paises', type=int, default=31)
+    parser.add_argument('--procesos', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--referencia', action='store_true', help='Medir también el cálculo en pandas')
+    args = parser.parse_args()
+
+    factores = leer_factores()
+    print('%6s %7s %12s %9s %10s' % ('años', 'países', 'filas', 'procesos', 'tiempo (s)'))
+    for anios in args.anios:
+        # Datos tipados: como texto no cabrían en memoria a escala de décadas
+        df = sintetico.generacion_por_tipo(anios, args.paises, tipado=True)
+        for procesos in sorted(set(args.procesos)):
+            inicio = time.perf_counter()
+            ci = calcular(df, factores, procesos)
+            print('%6d %7d %12d %9d %10.2f' % (anios, args.paises, len(df), procesos, time.perf_counter() - inicio))
+
+        if args.referencia:
+            inicio = time.perf_counter()
+            ref = referencia(df, factores)
+            print('%6d %7d %12d %9s %10.2f  (máx. diferencia %.2g gCO2eq/kWh)' % (
+                anios, args.paises, len(df), 'pandas', time.perf_counter() - inicio,
+                np.nanmax(np.abs(ref[ci.columns].to_numpy() - ci.to_numpy()))))
+        del df
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# Benchmark: memoria y tiempo de la normalización tipada (preprocesado.normalizar)
+# frente a las funciones prep_g1 / prep_b1 / prep_b2 originales, que convertían
+# name a categoría y después recortaban el texto fila a fila.
+#
+# Uso (desde la raíz del repositorio):
+#   python benchmarks/normalizacion.py [--anios 1 10]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import sintetico
+from preprocesado import prep_g1, prep_b1, prep_b2
+
+
+#####################################################
+## Versiones originales (antes de la normalización tipada)
+#####################################################
+
+def prep_g1_original(df_G):
+    df_G['datetime'] = pd.to_datetime(df_G['datetime'], utc = True)
+    df_G['date'] = df_G['datetime'].dt.date
+    df_G['value'] = df_G['value'].astype(float)
+    df_G['name'] = df_G['name'].astype('category')
+    df_G = df_G.drop(['geoid', 'geoname'], axis=1)
+    df_G = df_G.drop(df_G[df_G['id']== 10195].index)
+    df_G['name'] = df_G['name'].str.slice(18)
+    return df_G
+
+def _prep_precio_original(df, id_total, prefijo):
+    df = df[['id', 'name', 'value', 'datetime']].copy()
+    df['datetime'] = pd.to_datetime(df['datetime'], utc = True)
+    df['name'] = df['name'].astype('category')
+    df = df.drop(df[df['id']== id_total].index)
+    df['name'] = df['name'].str.slice(prefijo).str.capitalize()
+    df['date'] = df['datetime'].dt.date
+    return df
+
+def prep_b1_original(df):
+    return _prep_precio_original(df, 10211, 32)
+
+def prep_b2_original(df):
+    return _prep_precio_original(df, 1001, 27)
+
+
+def medir(funcion, df):
+    # Tiempo, pico de memoria durante la llamada y memoria del resultado. El
+    # tiempo se mide sin tracemalloc, que ralentiza mucho cada asignación
+    entrada = df.copy()
+    inicio = time.perf_counter()
+    resultado = funcion(entrada)
+    tiempo = time.perf_counter() - inicio
+
+    entrada = df.copy()
+    tracemalloc.start()
+    funcion(entrada)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, tiempo, pico, resultado.memory_usage(deep=True).sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalización tipada frente a los prep_* originales')
+    parser.add_argument('--anios', type=int, nargs='+', default=[1, 10])
+    args = parser.parse_args()
+
+    casos = [
+        ('generación', sintetico.generacion, prep_g1_original, prep_g1),
+        ('precio ES', sintetico.precio_es, prep_b1_original, prep_b1),
+        ('precio EU', sintetico.precio_eu, prep_b2_original, prep_b2),
+    ]
+
+    print('%-11s %5s %10s | %9s %9s %10s | %9s %9s %10s' % (
+        'fuente', 'años', 'filas', 'orig (s)', 'pico MB', 'result MB', 'tipado (s)', 'pico MB', 'result MB'))
+    for anios in args.anios:
+        for nombre, generar, original, tipado in casos:
+            df = generar(anios)
+            r_orig, t_orig, p_orig, m_orig = medir(original, df)
+            r_tip, t_tip, p_tip, m_tip = medir(tipado, df)
+
+            # Mismas filas, nombres y valores que las funciones originales
+            assert len(r_orig) == len(r_tip)
+            assert set(r_orig['name']) == set(r_tip['name'].cat.categories)
+            assert np.allclose(r_orig['value'].to_numpy(), r_tip['value'].to_numpy(), rtol=1e-6)
+
+            print('%-11s %5d %10d | %9.2f %9.1f %10.1f | %9.2f %9.1f %10.1f' % (
+                nombre, anios, len(df),
+                t_orig, p_orig / 2**20, m_orig / 2**20,
+                t_tip, p_tip / 2**20, m_tip / 2**20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+# Prueba de carga del dashboard: N sesiones simultáneas que repiten reruns de
+# las tres pestañas (cada rerun abre una pestaña al azar y elige un día al
+# azar en generación y precios o un país en emisiones). Cada sesión es un
+# AppTest de Streamlit en su propio hilo, como las sesiones del servidor; con
+# --procesos las sesiones se reparten entre varios procesos, como varios
+# servidores en la misma máquina.
+#
+# Informa de la latencia de los reruns (p50 y p95, sin contar el primero, que
+# es el que carga los datos), del tiempo hasta el primer gráfico de cada
+# ejecución (el que registra el dashboard) y de la memoria de los procesos al
+# terminar: RSS (cuenta entera cada página compartida en cada proceso) y PSS
+# (reparte las páginas compartidas entre los procesos que las usan; solo en
+# Linux).
+#
+# Uso (desde la raíz del repositorio):
+#   python benchmarks/sesiones.py --sesiones 1 5 20 --reruns 10
+#   python benchmarks/sesiones.py --datos /ruta/con/Datos --procesos 1 4 --sin-compartido
+
+import argparse
+import datetime as dt
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(RAIZ, 'dashboard.py')
+
+PESTANAS = ['Generación por tecnologías', 'Precio de la electricidad', 'Impacto medioambiental']
+
+_EPOCH = dt.datetime(1970, 1, 1)
+
+
+def _memoria():
+    # (RSS, PSS) del proceso en MB; PSS es None fuera de Linux
+    def leer(ruta, campo):
+        try:
+            with open(ruta) as f:
+                for linea in f:
+                    if linea.startswith(campo + ':'):
+                        return int(linea.split()[1]) / 1024
+        except OSError:
+            return None
+
+    rss = leer('/proc/self/status', 'VmRSS')
+    if rss is None:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return rss, leer('/proc/self/smaps_rollup', 'Pss')
+
+
+def _sesion(reruns, semilla, barrera, latencias, primeras, primer_grafico, errores):
+    from streamlit.testing.v1 import AppTest
+
+    aleatorio = random.Random(semilla)
+    try:
+        barrera.wait()
+        at = AppTest.from_file(DASHBOARD, default_timeout=600)
+        inicio = time.perf_counter()
+        at.run()
+        primeras.append(time.perf_counter() - inicio)
+        primer_grafico.append(at.session_state['tiempo_primer_grafico'])
+
+        for _ in range(reruns):
+            # Se abre una pestaña y se vuelve a ejecutar para que aparezcan sus
+            # controles. AppTest no conserva la pestaña entre ejecuciones (el
+            # navegador sí la envía en cada rerun): se indica antes de cada una
+            pestana = aleatorio.choice(PESTANAS)
+            at.session_state['pestana'] = pestana
+            at.run()
+            for slider in at.slider:
+                # Los límites del slider de fechas llegan en microsegundos desde 1970
+                desde, hasta = (_EPOCH + dt.timedelta(microseconds=v) for v in (slider.min, slider.max))
+                slider.set_value(desde + dt.timedelta(days=aleatorio.randint(0, (hasta - desde).days)))
+            # Emisiones: vista (media diaria, día × hora o comparación) y país
+            for vista in at.radio:
+                if vista.label == 'Vista:':
+                    vista.set_value(aleatorio.choice(vista.options))
+            for pais in at.selectbox:
+                if pais.label in ('Seleccione el país:', 'Detalle del país:'):
+                    pais.set_value(aleatorio.choice(pais.options))
+
+            at.session_state['pestana'] = pestana
+            inicio = time.perf_counter()
+            at.run()
+            latencias.append(time.perf_counter() - inicio)
+            primer_grafico.append(at.session_state['tiempo_primer_grafico'])
+            if at.exception:
+                errores.append(at.exception[0].message)
+    except Exception as e:
+        errores.append(repr(e))
+
+
+def servidor(datos, sesiones, reruns, compartir, semilla):
+    """Un proceso con `sesiones` sesiones concurrentes; devuelve sus medidas."""
+    os.chdir(datos)
+    sys.path.insert(0, RAIZ)
+    import compartido
+    if not compartir:
+        compartido.RAIZ = ''
+
+    latencias, primeras, primer_grafico, errores = [], [], [], []
+    barrera = threading.Barrier(sesiones)
+    hilos = [threading.Thread(target=_sesion,
+                              args=(reruns, semilla + i, barrera, latencias, primeras, primer_grafico, errores))
+             for i in range(sesiones)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    rss, pss = _memoria()
+    return latencias, primeras, primer_grafico, errores, rss, pss
+
+
+def medir(datos, sesiones, procesos, reruns, compartir):
+    # Sesiones repartidas entre procesos nuevos (spawn: sin datos heredados)
+    reparto = [sesiones // procesos + (i < sesiones % procesos) for i in range(procesos)]
+    reparto = [n for n in reparto if n]
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(len(reparto), mp_context=contexto) as pool:
+        resultados = list(pool.map(servidor, [datos] * len(reparto), reparto, [reruns] * len(reparto),
+                                   [compartir] * len(reparto), [1000 * i for i in range(len(reparto))]))
+
+    latencias = np.array([l for r in resultados for l in r[0]])
+    primeras = [p for r in resultados for p in r[1]]
+    primer_grafico = np.array([p for r in resultados for p in r[2]])
+    errores = [e for r in resultados for e in r[3]]
+    rss = sum(r[4] for r in resultados)
+    pss = sum(r[5] for r in resultados) if all(r[5] is not None for r in resultados) else None
+    return latencias, primeras, primer_grafico, errores, rss, pss
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga: sesiones simultáneas del dashboard')
+    parser.add_argument('--datos', default=RAIZ, help='Directorio que contiene Datos/ (por defecto, el repositorio)')
+    parser.add_argument('--sesiones', type=int, nargs='+', default=[1, 5, 20])
+    parser.add_argument('--procesos', type=int, nargs='+', default=[1])
+    parser.add_argument('--reruns', type=int, default=10, help='Reruns por sesión')
+    parser.add_argument('--sin-compartido', action='store_true',
+                        help='No usar compartido.py (cada proceso lee y prepara sus ficheros)')
+    args = parser.parse_args()
+    datos = os.path.abspath(args.datos)
+
+    print('%8s %9s %10s %9s %9s %9s %14s %10s %10s' % (
+        'sesiones', 'procesos', 'reruns', '1º (s)', 'p50 (s)', 'p95 (s)', 'gráfico p95', 'RSS (MB)', 'PSS (MB)'))
+    for procesos in args.procesos:
+        for sesiones in args.sesiones:
+            latencias, primeras, primer_grafico, errores, rss, pss = medir(
+                datos, sesiones, min(procesos, sesiones), args.reruns, not args.sin_compartido)
+            p50, p95 = np.percentile(latencias, [50, 95]) if len(latencias) else (np.nan, np.nan)
+            grafico_p95 = np.percentile(primer_grafico, 95) if len(primer_grafico) else np.nan
+            print('%8d %9d %10d %9.2f %9.2f %9.2f %14.2f %10.0f %10s' % (
+                sesiones, min(procesos, sesiones), len(latencias), max(primeras, default=np.nan), p50, p95,
+                grafico_p95, rss, '-' if pss is None else '%.0f' % pss))
+            for error in sorted(set(errores)):
+                print('    error: %s' % error)
+
+
+if __name__ == '__main__':
+    main()
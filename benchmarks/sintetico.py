@@ -0,0 +1,213 @@
+# Generador de datos sintéticos con el formato de los ficheros que lee el
+# dashboard (exportados de ESIOS, intensidad de carbono y combined.csv), para
+# medir sin red ni datos reales cómo escala el código al crecer el histórico.
+#
+# Escalas: de 1 a 50 años, de 8 a 31 países y resolución horaria, 15 o 5 minutos.
+#
+# Uso como script (escribe los ficheros con las mismas rutas que usa el dashboard):
+#   python benchmarks/sintetico.py /tmp/datos --anios 10 --paises 30 --resolucion 15min
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+
+INICIO = '2023-01-01'
+
+RESOLUCIONES = {'h': '1h', '15min': '15min', '5min': '5min'}
+
+# Tecnologías de generación (id ESIOS -> nombre tras "Generación medida ")
+TECNOLOGIAS = {
+    1150: 'Hidráulica UGH', 1151: 'Hidráulica no UGH', 1152: 'Turbinación bombeo',
+    1153: 'Nuclear', 1154: 'Carbón', 1156: 'Ciclo combinado', 1159: 'Eólica terrestre',
+    1161: 'Solar fotovoltaica', 1162: 'Solar térmica', 1164: 'Gas Natural Cogeneración',
+    1168: 'Biomasa', 1169: 'Biogás', 1170: 'Residuos domésticos y similares',
+    1165: 'Derivados del petróleo ó carbón',
+}
+
+# Componentes del precio final (id ESIOS -> nombre tras "Precio medio horario componente ")
+COMPONENTES = {
+    805: 'mercado diario', 806: 'restricciones PBF', 807: 'restricciones tiempo real',
+    808: 'mercado intradiario', 809: 'restricciones intradiario', 810: 'reserva de potencia adicional a subir',
+    811: 'banda secundaria', 812: 'desvíos medidos', 813: 'saldo de desvíos',
+    814: 'pago de capacidad', 815: 'saldo P.O.14.6', 816: 'fallo nominación UPG',
+}
+
+# Países (código -> nombre en ESIOS). Los ocho primeros son los del dashboard
+PAISES = {
+    'DE': 'Alemania', 'BE': 'Bélgica', 'ES': 'España', 'FR': 'Francia', 'IT': 'Italia',
+    'NL': 'Países Bajos', 'PT': 'Portugal', 'GB': 'Reino Unido',
+    'AT': 'Austria', 'BG': 'Bulgaria', 'CY': 'Chipre', 'CZ': 'Chequia', 'DK': 'Dinamarca',
+    'EE': 'Estonia', 'FI': 'Finlandia', 'GR': 'Grecia', 'HR': 'Croacia', 'HU': 'Hungría',
+    'IE': 'Irlanda', 'IS': 'Islandia', 'LT': 'Lituania', 'LU': 'Luxemburgo', 'LV': 'Letonia',
+    'MT': 'Malta', 'NO': 'Noruega', 'PL': 'Polonia', 'RO': 'Rumanía', 'SE': 'Suecia',
+    'SI': 'Eslovenia', 'SK': 'Eslovaquia', 'TR': 'Turquía',
+}
+
+
+def instantes(anios, resolucion='h'):
+    return pd.date_range(INICIO, periods=int(365 * anios * pd.Timedelta('1D') / pd.Timedelta(RESOLUCIONES[resolucion])),
+                         freq=RESOLUCIONES[resolucion], tz='Europe/Madrid')
+
+
+def _texto_esios(fechas):
+    # Formato de ESIOS: 2023-01-01T00:00:00.000+01:00
+    texto = fechas.strftime('%Y-%m-%dT%H:%M:%S.000%z')
+    return texto.str[:-2] + ':' + texto.str[-2:]
+
+
+def _exportado(indicadores, fechas, valores):
+    # indicadores: {id: nombre completo}; valores: matriz (indicadores × instantes)
+    texto = np.asarray(_texto_esios(fechas), dtype=object)
+    n = len(fechas)
+    return pd.DataFrame({
+        'id': np.repeat(list(indicadores), n),
+        'name': np.repeat(list(indicadores.values()), n),
+        'geoid': np.nan,
+        'geoname': np.nan,
+        'value': np.round(valores, 2).ravel(),
+        'datetime': np.tile(texto, len(indicadores)),
+    })
+
+
+def _perfil(fechas, rng, filas, base, amplitud, ruido):
+    # Ciclo diario + ruido, una fila por serie
+    hora = (fechas.hour + fechas.minute / 60).to_numpy()
+    ciclo = np.sin((hora - 6) / 24 * 2 * np.pi)
+    fase = rng.uniform(0.5, 1.5, (filas, 1))
+    return base + amplitud * fase * ciclo + rng.normal(0, ruido, (filas, len(fechas)))
+
+
+def generacion(anios=1, resolucion='h', seed=0):
+    """GeneracionTotal_*.csv: id 10195 (total) + una serie por tecnología."""
+    rng = np.random.default_rng(seed)
+    fechas = instantes(anios, resolucion)
+    tecnologias = np.clip(_perfil(fechas, rng, len(TECNOLOGIAS), 2500, 1500, 300), 0, None)
+    indicadores = {10195: 'Generación medida total',
+                   **{i: 'Generación medida ' + t for i, t in TECNOLOGIAS.items()}}
+    return _exportado(indicadores, fechas, np.vstack([tecnologias.sum(axis=0), tecnologias]))
+
+
+def precio_es(anios=1, resolucion='h', seed=1):
+    """PrecioMedioHorarioFinal_*.xlsx: id 10211 (suma) + una serie por componente."""
+    rng = np.random.default_rng(seed)
+    fechas = instantes(anios, resolucion)
+    componentes = _perfil(fechas, rng, len(COMPONENTES), 5, 4, 2)
+    componentes[0] = _perfil(fechas, rng, 1, 90, 40, 15)[0]
+    indicadores = {10211: 'Precio medio horario final suma de componentes',
+                   **{i: 'Precio medio horario componente ' + c for i, c in COMPONENTES.items()}}
+    return _exportado(indicadores, fechas, np.vstack([componentes.sum(axis=0), componentes]))
+
+
+def precio_eu(anios=1, paises=8, resolucion='h', seed=2):
+    """PrecioEuropa_*.csv: id 1001 (media) + una serie por país."""
+    rng = np.random.default_rng(seed)
+    fechas = instantes(anios, resolucion)
+    nombres = list(PAISES.values())[:paises]
+    precios = _perfil(fechas, rng, paises, 100, 50, 20)
+    indicadores = {1001: 'Precio mercado spot diario Media',
+                   **{600 + i: 'Precio mercado spot diario ' + p for i, p in enumerate(nombres)}}
+    return _exportado(indicadores, fechas, np.vstack([precios.mean(axis=0), precios]))
+
+
+def intensidad_carbono(anios=1, paises=8, resolucion='h', seed=3):
+    """CI_bottom_up_method.csv: datetime en UTC + una columna por país (gCO2eq/kWh)."""
+    rng = np.random.default_rng(seed)
+    fechas = instantes(anios, resolucion).tz_convert('UTC')
+    codigos = list(PAISES)[:paises]
+    valores = np.clip(_perfil(fechas, rng, paises, 300, 120, 40), 0, None)
+    df = pd.DataFrame(valores.T, columns=codigos)
+    df.insert(0, 'datetime', fechas.strftime('%Y-%m-%d %H:%M:%S+00:00'))
+    return df
+
+
+# Tipos de producción (nombres de EF_bottom_up_method.csv para los fósiles)
+TIPOS = ['biomass', 'gas', 'hard_coal', 'hydro', 'lignite', 'nuclear', 'oil', 'other',
+         'other_fossil', 'other_renewable', 'solar', 'waste', 'wind_offshore', 'wind_onshore']
+
+
+def generacion_por_tipo(anios=1, paises=8, resolucion='h', seed=5, tipado=False):
+    """Generación por país y tipo de producción (datetime, MapCode, ProductionTypeName, value).
+
+    Con tipado=True el datetime es datetime64 y los códigos categorías, en lugar
+    de texto como en el CSV (para escalas de décadas que no caben como texto).
+    """
+    rng = np.random.default_rng(seed)
+    fechas = instantes(anios, resolucion).tz_convert('UTC')
+    codigos = list(PAISES)[:paises]
+    n = len(fechas)
+    valores = np.empty((paises * len(TIPOS), n), np.float32)
+    for i in range(paises):
+        filas = slice(i * len(TIPOS), (i + 1) * len(TIPOS))
+        valores[filas] = np.clip(_perfil(fechas, rng, len(TIPOS), 1000, 600, 200), 0, None)
+
+    if tipado:
+        return pd.DataFrame({
+            'datetime': np.tile(fechas, paises * len(TIPOS)),
+            'MapCode': pd.Categorical.from_codes(np.repeat(np.arange(paises, dtype=np.int8), n * len(TIPOS)), codigos),
+            'ProductionTypeName': pd.Categorical.from_codes(
+                np.tile(np.repeat(np.arange(len(TIPOS), dtype=np.int8), n), paises), TIPOS),
+            'value': valores.ravel(),
+        })
+    return pd.DataFrame({
+        'datetime': np.tile(fechas.strftime('%Y-%m-%d %H:%M:%S+00:00'), paises * len(TIPOS)),
+        'MapCode': np.repeat(codigos, n * len(TIPOS)),
+        'ProductionTypeName': np.tile(np.repeat(TIPOS, n), paises),
+        'value': np.round(valores, 1).ravel(),
+    })
+
+
+def combinado(anios=1, paises=8, seed=4):
+    """combined.csv: potencia media diaria por país (date, power, name)."""
+    rng = np.random.default_rng(seed)
+    dias = pd.date_range(INICIO, periods=365 * anios, freq='D')
+    codigos = list(PAISES)[:paises]
+    return pd.DataFrame({
+        'date': np.tile(dias.strftime('%Y-%m-%d'), paises),
+        'power': rng.uniform(5000, 60000, len(dias) * paises),
+        'name': np.repeat(codigos, len(dias)),
+    })
+
+
+def escribir(raiz, anios=1, paises=8, resolucion='h', excel=True):
+    """Escribe los cinco ficheros en `raiz` con las rutas que usa el dashboard."""
+    rutas = {
+        'generacion': os.path.join(raiz, 'Datos/Generacion/GeneracionTotal_2023_h.csv'),
+        'precio_es': os.path.join(raiz, 'Datos/Economico/PrecioMedioHorarioFinal_2023_h.xlsx'),
+        'precio_eu': os.path.join(raiz, 'Datos/Economico/PrecioEuropa_2023_h.csv'),
+        'emisiones': os.path.join(raiz, 'Datos/Emisiones/output/CI_bottom_up_method.csv'),
+        'potencia': os.path.join(raiz, 'Datos/Emisiones/archive/combined.csv'),
+    }
+    for ruta in rutas.values():
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    generacion(anios, resolucion).to_csv(rutas['generacion'], sep=';', index=False)
+    if excel:
+        precio_es(anios, resolucion).to_excel(rutas['precio_es'], index=False)
+    else:
+        rutas['precio_es'] = rutas['precio_es'].replace('.xlsx', '.csv')
+        precio_es(anios, resolucion).to_csv(rutas['precio_es'], sep=';', index=False)
+    precio_eu(anios, paises, resolucion).to_csv(rutas['precio_eu'], sep=';', index=False)
+    intensidad_carbono(anios, paises, resolucion).to_csv(rutas['emisiones'], index=False)
+    combinado(anios, paises).to_csv(rutas['potencia'], index=False)
+    return rutas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos con el formato del dashboard')
+    parser.add_argument('raiz', help='Directorio de salida (se crea Datos/ dentro)')
+    parser.add_argument('--anios', type=int, default=1)
+    parser.add_argument('--paises', type=int, default=8)
+    parser.add_argument('--resolucion', choices=sorted(RESOLUCIONES), default='h')
+    parser.add_argument('--sin-excel', action='store_true',
+                        help='Precio España en CSV (para escalas por encima del límite de filas de Excel; ver ingesta.py)')
+    args = parser.parse_args()
+
+    for fuente, ruta in escribir(args.raiz, args.anios, args.paises, args.resolucion, not args.sin_excel).items():
+        print('%-11s %s' % (fuente, ruta))
+
+
+if __name__ == '__main__':
+    main()
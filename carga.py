@@ -0,0 +1,272 @@
+# IMPORTS
+import contextlib
+import hashlib
+import os
+import threading
+from collections import namedtuple
+
+import trazas
+
+
+
+#####################################################
+## Caché de carga de datos
+#####################################################
+
+# Streamlit vuelve a ejecutar dashboard.py entero con cada interacción (slider,
+# radio...), pero los módulos importados se mantienen vivos en el proceso. Este
+# módulo guarda aquí los DataFrames ya leídos y preprocesados, de forma que un
+# rerun solo filtra y pinta.
+#
+# Cada entrada depende de uno o varios ficheros y se identifica por su huella
+# (ruta, tamaño, mtime y hash del contenido). El hash solo se recalcula si cambia
+# el tamaño o el mtime, así que comprobar una entrada cuesta un os.stat por fichero.
+
+Huella = namedtuple('Huella', ['ruta', 'tamano', 'mtime_ns', 'sha256'])
+
+_Entrada = namedtuple('_Entrada', ['huellas', 'valor'])
+
+# Versión publicada de la caché. Nunca se modifica: cada cambio publica un
+# diccionario nuevo, así que quien tenga una referencia ve siempre un estado
+# completo (ver fijar() y transaccion())
+_cache = {}
+_cerrojos = {}
+_cerrojo = threading.Lock()
+_stats = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0, 'versiones': 0}
+
+# Con vigilancia.py en marcha, los reruns no comprueban los ficheros (fijar)
+_vigilada = False
+_local = threading.local()
+
+
+def _hash_contenido(ruta, bloque=1 << 20):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for trozo in iter(lambda: f.read(bloque), b''):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def huella(ruta, previa=None):
+    """Huella de un fichero; reutiliza el hash de `previa` si no ha cambiado."""
+    st = os.stat(ruta)
+    if (previa is not None and previa.ruta == ruta
+            and previa.tamano == st.st_size and previa.mtime_ns == st.st_mtime_ns):
+        return previa
+    return Huella(ruta, st.st_size, st.st_mtime_ns, _hash_contenido(ruta))
+
+
+def _cerrojo_clave(clave):
+    with _cerrojo:
+        return _cerrojos.setdefault(clave, threading.Lock())
+
+
+def _contar(stat):
+    with _cerrojo:
+        _stats[stat] += 1
+
+
+def _entrada(clave):
+    # Dentro de una transacción, lo pendiente tapa a lo publicado (None: descartada)
+    pendientes = getattr(_local, 'pendientes', None)
+    if pendientes is not None and clave in pendientes:
+        return pendientes[clave]
+    return _cache.get(clave)
+
+
+def _guardar(clave, entrada):
+    global _cache
+    pendientes = getattr(_local, 'pendientes', None)
+    if pendientes is not None:
+        pendientes[clave] = entrada
+        return
+    with _cerrojo:
+        _cache = {**_cache, clave: entrada}
+
+
+def _mismo_contenido(huellas, previas):
+    return [(h.ruta, h.sha256) for h in huellas] == [(h.ruta, h.sha256) for h in previas]
+
+
+def obtener(clave, rutas, construir):
+    """Devuelve el valor cacheado en `clave` o lo construye con `construir()`.
+
+    La entrada es válida mientras el contenido de todos los ficheros de `rutas`
+    sea el mismo que cuando se construyó.
+    """
+    rutas = tuple(rutas)
+
+    with trazas.tramo(str(clave), 'carga') as tramo:
+        # Rerun con la versión fijada: lo que ya está cargado no se comprueba
+        # (vigilancia.py publica los cambios) y no se espera a ningún cerrojo
+        fijada = getattr(_local, 'fijada', None)
+        entrada = fijada.get(clave) if fijada is not None else None
+        if entrada is not None:
+            _contar('aciertos')
+            tramo.datos['acierto'] = True
+            return entrada.valor
+
+        # Un cerrojo por clave: si varias sesiones piden a la vez el mismo dato,
+        # solo una lo lee y las demás esperan y reutilizan el resultado
+        with _cerrojo_clave(clave):
+            entrada = _entrada(clave)
+            previas = (entrada.huellas if entrada is not None and len(entrada.huellas) == len(rutas)
+                       else (None,) * len(rutas))
+            huellas = tuple(huella(r, p) for r, p in zip(rutas, previas))
+
+            if entrada is not None and _mismo_contenido(huellas, entrada.huellas):
+                # Mismo contenido (aunque se haya tocado el fichero): se actualiza la huella
+                if huellas != entrada.huellas:
+                    _guardar(clave, _Entrada(huellas, entrada.valor))
+                _contar('aciertos')
+                tramo.datos['acierto'] = True
+                return entrada.valor
+
+            valor = construir()
+            _guardar(clave, _Entrada(huellas, valor))
+            _contar('fallos')
+            tramo.datos['acierto'] = False
+            tramo.filas = trazas.filas(valor)
+            return valor
+
+
+def version(valor):
+    """Identificador del contenido de los ficheros de los que sale `valor`.
+
+    `valor` es un objeto devuelto por obtener(); None si no está en la caché.
+    Sirve para construir claves de cachés derivadas (ver especificaciones.py).
+    """
+    fijada = getattr(_local, 'fijada', None)
+    for cache in (fijada or {}, _cache):
+        for entrada in list(cache.values()):
+            if entrada.valor is valor:
+                return _resumen(entrada.huellas)
+    return None
+
+
+def version_rutas(rutas, huellas=None):
+    """Como version(), pero calculada directamente sobre los ficheros de `rutas`.
+
+    `huellas` (ruta -> Huella) reutiliza las huellas ya calculadas y guarda las nuevas.
+    """
+    if huellas is None:
+        huellas = {}
+    for r in rutas:
+        if r not in huellas:
+            huellas[r] = huella(r)
+    return _resumen([huellas[r] for r in rutas])
+
+
+def _resumen(huellas):
+    return hashlib.sha256(''.join(h.sha256 for h in huellas).encode()).hexdigest()[:16]
+
+
+def invalidar(clave=None):
+    """Elimina una entrada de la caché, o todas si no se indica clave."""
+    global _cache
+    with _cerrojo:
+        claves = set(_cache) if clave is None else {clave} & set(_cache)
+        _cache = {c: e for c, e in _cache.items() if c not in claves}
+        _stats['invalidaciones'] += len(claves)
+
+
+def estadisticas():
+    """Aciertos, fallos, invalidaciones y versiones publicadas acumulados, y claves cacheadas."""
+    with _cerrojo:
+        stats = dict(_stats)
+        stats['entradas'] = sorted(map(str, _cache))
+    total = stats['aciertos'] + stats['fallos']
+    stats['tasa_aciertos'] = stats['aciertos'] / total if total else 0.0
+    return stats
+
+
+#####################################################
+## Versiones (actualización en segundo plano)
+#####################################################
+
+# vigilancia.py incorpora los ficheros nuevos en un hilo aparte. Para que los
+# reruns no esperen a la ingesta ni vean datos a medio actualizar:
+#
+#   - el hilo trabaja dentro de transaccion(): lo que reemplaza (reemplazar) o
+#     reconstruye (obtener) queda pendiente, visible solo para él, y al salir
+#     se publica todo a la vez en un diccionario nuevo;
+#   - cada rerun empieza con fijar(): hasta el siguiente usa esa versión de la
+#     caché tal cual, sin comprobar los ficheros ni tomar cerrojos.
+#
+# Sin vigilancia (exportar.py, bench.py...) fijar() no hace nada y cada
+# obtener() comprueba los ficheros como siempre.
+
+def vigilar(activa=True):
+    """Activa (o no) el modo en que los reruns usan la versión fijada."""
+    global _vigilada
+    _vigilada = activa
+
+
+def fijar():
+    """Fija para este hilo la versión publicada ahora (al empezar cada rerun)."""
+    _local.fijada = _cache if _vigilada else None
+
+
+def actual(clave):
+    """Valor de `clave` sin comprobar sus ficheros (None si no está cargado)."""
+    entrada = _entrada(clave)
+    return None if entrada is None else entrada.valor
+
+
+def reemplazar(clave, rutas, valor):
+    """Guarda `valor` en `clave` como construido a partir del contenido actual de `rutas`."""
+    with _cerrojo_clave(clave):
+        _guardar(clave, _Entrada(tuple(huella(r) for r in rutas), valor))
+
+
+def descartar(claves):
+    """Quita las entradas de `claves`; dentro de una transacción, al publicarla."""
+    global _cache
+    pendientes = getattr(_local, 'pendientes', None)
+    if pendientes is not None:
+        claves = [c for c in claves if _entrada(c) is not None]
+        pendientes.update(dict.fromkeys(claves))
+    else:
+        with _cerrojo:
+            claves = [c for c in claves if c in _cache]
+            _cache = {c: e for c, e in _cache.items() if c not in claves}
+    with _cerrojo:
+        _stats['invalidaciones'] += len(claves)
+    return claves
+
+
+def descartar_cambiadas():
+    """Quita las entradas con algún fichero cambiado (tamaño o mtime) o borrado; devuelve sus claves."""
+    pendientes = getattr(_local, 'pendientes', None)
+    claves = []
+    for clave, entrada in {**_cache, **(pendientes or {})}.items():
+        for h in entrada.huellas if entrada is not None else ():
+            try:
+                st = os.stat(h.ruta)
+            except FileNotFoundError:
+                claves.append(clave)
+                break
+            if (st.st_size, st.st_mtime_ns) != (h.tamano, h.mtime_ns):
+                claves.append(clave)
+                break
+    return descartar(claves)
+
+
+@contextlib.contextmanager
+def transaccion():
+    """Lo guardado dentro (por este hilo) se publica junto al salir; nada si hay un error.
+
+    Devuelve el diccionario de cambios pendientes (vacío si no se publica nada).
+    """
+    global _cache
+    # Dentro, los ficheros siempre se comprueban (aunque el hilo tenga una versión fijada)
+    fijada = getattr(_local, 'fijada', None)
+    _local.pendientes, _local.fijada = {}, None
+    try:
+        yield _local.pendientes
+        with _cerrojo:
+            if _local.pendientes:
+                _cache = {c: e for c, e in {**_cache, **_local.pendientes}.items() if e is not None}
+                _stats['versiones'] += 1
+    finally:
+        _local.pendientes, _local.fijada = None, fijada
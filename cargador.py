@@ -0,0 +1,143 @@
+# IMPORTS
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+
+#####################################################
+## Carga en paralelo con dependencias
+#####################################################
+
+# Cada fuente es una cadena lectura + preparación independiente de las demás,
+# salvo las que usan el resultado de otra (el análisis de potencia y emisiones
+# necesita las intensidades por país). Aquí cada etapa se lanza en un pool de
+# hilos en cuanto han terminado sus dependencias, así que las cadenas
+# independientes se ejecutan a la vez (la lectura de ficheros y buena parte de
+# read_csv liberan el GIL).
+#
+# Un error en una etapa no detiene las demás: queda guardado en su resultado,
+# y las etapas que dependen de ella no se ejecutan y quedan con un
+# DependenciaFallida. Cada resultado guarda además cuándo empezó y terminó.
+#
+# Las funciones de las etapas son las de fuentes.py, que guardan lo que
+# construyen en la caché de carga.py: precargar una fuente es simplemente
+# pedirla antes de que la pida la pestaña.
+
+Etapa = namedtuple('Etapa', ['nombre', 'funcion', 'depende'])
+
+
+def _circulares(etapas):
+    # Etapas que no se pueden ordenar (forman o dependen de un ciclo)
+    pendientes = dict(etapas)
+    while True:
+        listas = [n for n, e in pendientes.items() if not any(d in pendientes for d in e.depende)]
+        if not listas:
+            return set(pendientes)
+        for n in listas:
+            del pendientes[n]
+
+
+class DependenciaFallida(RuntimeError):
+    """Una etapa no se ha ejecutado porque falló una de sus dependencias."""
+
+
+class Resultado(namedtuple('Resultado', ['valor', 'error', 'inicio', 'fin'])):
+    """Valor o error de una etapa; inicio y fin en segundos desde el comienzo de la carga."""
+
+    @property
+    def segundos(self):
+        return self.fin - self.inicio
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class Carga:
+    """Ejecución en curso de un conjunto de etapas."""
+
+    def __init__(self, etapas, hilos=None):
+        self.etapas = {e.nombre: e for e in etapas}
+        for etapa in etapas:
+            desconocidas = set(etapa.depende) - set(self.etapas)
+            if desconocidas:
+                raise ValueError('La etapa %s depende de etapas desconocidas: %s' % (
+                    etapa.nombre, ', '.join(sorted(desconocidas))))
+        circulares = _circulares(self.etapas)
+        if circulares:
+            raise ValueError('Dependencias circulares entre: %s' % ', '.join(sorted(circulares)))
+
+        self.resultados = {}
+        self._inicio = time.perf_counter()
+        self._cerrojo = threading.Lock()
+        self._terminada = threading.Event()
+        self._lanzadas = set()
+        self._pool = ThreadPoolExecutor(hilos or min(len(etapas), 8) or 1, thread_name_prefix='cargador')
+
+        if not etapas:
+            self._terminar()
+            return
+        with self._cerrojo:
+            listas = self._listas()
+        for etapa in listas:
+            self._pool.submit(self._ejecutar, etapa)
+
+    def _listas(self):
+        # Etapas no lanzadas cuyas dependencias ya tienen resultado (con el cerrojo tomado)
+        listas = [e for n, e in self.etapas.items()
+                  if n not in self._lanzadas and all(d in self.resultados for d in e.depende)]
+        self._lanzadas.update(e.nombre for e in listas)
+        return listas
+
+    def _ejecutar(self, etapa):
+        inicio = time.perf_counter() - self._inicio
+        fallidas = [d for d in etapa.depende if not self.resultados[d].ok]
+        valor, error = None, None
+        if fallidas:
+            error = DependenciaFallida('No se ha ejecutado: falló %s' % ', '.join(fallidas))
+        else:
+            try:
+                valor = etapa.funcion()
+            except Exception as e:
+                error = e
+        fin = time.perf_counter() - self._inicio
+
+        with self._cerrojo:
+            self.resultados[etapa.nombre] = Resultado(valor, error, inicio, fin)
+            listas = self._listas()
+            completa = len(self.resultados) == len(self.etapas)
+        for siguiente in listas:
+            self._pool.submit(self._ejecutar, siguiente)
+        if completa:
+            self._terminar()
+
+    def _terminar(self):
+        self._terminada.set()
+        self._pool.shutdown(wait=False)
+
+    def terminada(self):
+        return self._terminada.is_set()
+
+    def esperar(self, timeout=None):
+        """Espera a que terminen todas las etapas y devuelve los resultados."""
+        self._terminada.wait(timeout)
+        return dict(self.resultados)
+
+    def segundos(self):
+        """Tiempo total hasta ahora (o hasta que terminó la última etapa)."""
+        with self._cerrojo:
+            if self.terminada() and self.resultados:
+                return max(r.fin for r in self.resultados.values())
+        return time.perf_counter() - self._inicio
+
+
+def ejecutar(etapas, hilos=None):
+    """Ejecuta `etapas` respetando sus dependencias y espera a que terminen."""
+    return Carga(etapas, hilos).esperar()
+
+
+def secuencial(etapas):
+    """Igual que ejecutar(), pero una etapa detrás de otra (para comparar tiempos)."""
+    return Carga(etapas, hilos=1).esperar()
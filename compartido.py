@@ -0,0 +1,84 @@
+# IMPORTS
+import glob
+import os
+import uuid
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+import carga
+import trazas
+
+
+
+#####################################################
+## Datos compartidos entre procesos (Arrow mapeado en memoria)
+#####################################################
+
+# carga.py ya hace que todas las sesiones de un proceso de Streamlit compartan
+# los mismos DataFrames. Con varios procesos en la misma máquina (varios
+# servidores detrás de un balanceador, o los procesos de exportar.py) cada uno
+# volvería a leer y preparar los ficheros y tendría su propia copia.
+#
+# Aquí los DataFrames ya preparados se guardan una vez en Arrow IPC sin
+# comprimir y cada proceso los abre mapeados en memoria: las columnas
+# numéricas, de fechas y categóricas son vistas del fichero, no copias, así que
+# todos los procesos comparten las mismas páginas (la caché del sistema
+# operativo). Esas columnas son de solo lectura: los filtros por sesión son
+# vistas (iloc de un tramo) y con copy-on-write de pandas cualquier escritura
+# sobre ellas crea una copia local en lugar de modificar los datos compartidos.
+#
+#   Datos/Compartido/<nombre>-<versión>.arrow
+#
+# La versión es la de carga.version_rutas sobre los ficheros de origen: si
+# cambian, se escribe un fichero nuevo y se borran las versiones anteriores
+# (los procesos que aún las tengan abiertas siguen leyéndolas sin problema).
+
+RAIZ = 'Datos/Compartido'
+
+
+def guardar(df, ruta):
+    """Escribe df en Arrow IPC sin compresión (escritura atómica)."""
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+    temporal = '%s.%s.tmp' % (ruta, uuid.uuid4().hex[:8])
+    with pa.OSFile(temporal, 'wb') as f:
+        with ipc.new_file(f, tabla.schema) as escritor:
+            escritor.write_table(tabla)
+    os.replace(temporal, ruta)
+
+
+@trazas.medir('lectura')
+def abrir(ruta):
+    """DataFrame cuyas columnas apuntan al fichero mapeado en memoria."""
+    tabla = ipc.open_file(pa.memory_map(ruta)).read_all()
+    # split_blocks: una columna por bloque, sin consolidar (que copiaría)
+    return tabla.to_pandas(split_blocks=True)
+
+
+def _anteriores(nombre, actual, raiz):
+    # Otras versiones del mismo nombre (la versión son 16 caracteres hexadecimales)
+    patron = os.path.join(raiz, glob.escape(nombre) + '-' + '?' * 16 + '.arrow')
+    return [r for r in glob.glob(patron) if r != actual]
+
+
+def tabla(nombre, rutas, construir):
+    """DataFrame `construir()` de los ficheros `rutas`, compartido entre procesos.
+
+    El primer proceso que lo pide lo construye y lo guarda; el resto (y las
+    siguientes ejecuciones) lo abren directamente. Con RAIZ vacía no se
+    comparte y se devuelve construir().
+    """
+    if not RAIZ:
+        return construir()
+
+    ruta = os.path.join(RAIZ, '%s-%s.arrow' % (nombre, carga.version_rutas(rutas)))
+    if not os.path.exists(ruta):
+        os.makedirs(RAIZ, exist_ok=True)
+        guardar(construir(), ruta)
+        for anterior in _anteriores(nombre, ruta, RAIZ):
+            try:
+                os.remove(anterior)
+            except FileNotFoundError:
+                # Otro proceso la ha borrado antes
+                pass
+    return abrir(ruta)
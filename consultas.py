@@ -0,0 +1,282 @@
+# IMPORTS
+import datetime as dt
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict, namedtuple
+
+import carga
+import fuentes
+from emisiones_paises import NOMBRES
+from estadisticas_precio import ESTADISTICAS
+
+
+
+#####################################################
+## Consultas de las series agregadas (sin Streamlit)
+#####################################################
+
+# Las mismas cifras que enseña el dashboard (mix diario, generación mensual,
+# estadísticas de precio, precios horarios EU y medias diarias de emisiones)
+# como tablas, para otras herramientas. Cada consulta usa las funciones de
+# fuentes.py, así que comparte con el dashboard la caché de carga.py, el
+# almacén y los ficheros de compartido.py.
+#
+# Los parámetros llegan como texto (de una URL) o ya como valores de Python
+# (date, int, lista) y se validan aquí:
+#
+#   anio     año (por defecto, el de desde/hasta o el último disponible)
+#   desde    primer día (AAAA-MM-DD; por defecto, el 1 de enero del año)
+#   hasta    día siguiente al último, [desde, hasta) (por defecto, el año
+#            entero); el rango debe quedar dentro del año
+#   paises   lista separada por comas (por defecto, todos), con el código
+#            (ES) o el nombre (España) de cada país en cualquier consulta
+#
+# obtener() devuelve el resultado ya serializado a JSON (y comprimido con
+# gzip) con la versión de los datos de los que sale (carga.version). Los
+# resultados se guardan en una
+# caché LRU acotada por bytes con la clave (consulta, parámetros, versión):
+# si cambian los ficheros cambia la versión y la entrada antigua deja de
+# usarse. servidor.py sirve estas consultas por HTTP.
+
+LIMITE_BYTES = 64 * 2**20
+
+# funcion(**parametros) -> (datos cargados, construir) ; construir() -> DataFrame
+Consulta = namedtuple('Consulta', ['funcion', 'parametros', 'descripcion'])
+
+# Resultado serializado: JSON (bytes), el mismo JSON con gzip, versión de los datos y ETag
+Resultado = namedtuple('Resultado', ['cuerpo', 'comprimido', 'version', 'etag'])
+
+
+class ParametroInvalido(ValueError):
+    """Un parámetro de la consulta falta, sobra o no tiene el formato esperado."""
+
+
+#####################################################
+## Parámetros
+#####################################################
+
+def _fecha(texto):
+    if isinstance(texto, dt.date):
+        return texto
+    try:
+        return dt.date.fromisoformat(texto)
+    except ValueError:
+        raise ParametroInvalido('Fecha no válida: %r (formato AAAA-MM-DD)' % texto)
+
+
+def _lista(texto):
+    # Sin repetidos, en el orden en que llegan
+    if isinstance(texto, str):
+        texto = (p.strip() for p in texto.split(','))
+    return tuple(dict.fromkeys(p for p in texto if p))
+
+
+def _anio(texto):
+    try:
+        return int(texto)
+    except (TypeError, ValueError):
+        raise ParametroInvalido('Año no válido: %r' % texto)
+
+
+_CONVERSORES = {
+    'anio': _anio,
+    'desde': _fecha,
+    'hasta': _fecha,
+    'paises': _lista,
+    'estadisticas': _lista,
+    'fuente': str,
+}
+
+
+def normalizar(nombre, parametros):
+    """Parámetros de la consulta `nombre` convertidos y con sus valores por defecto."""
+    consulta = CONSULTAS[nombre]
+    sobran = set(parametros) - set(consulta.parametros)
+    if sobran:
+        raise ParametroInvalido('Parámetros no admitidos en %s: %s' % (nombre, ', '.join(sorted(sobran))))
+    valores = {p: _CONVERSORES[p](v) for p, v in parametros.items() if v not in (None, '')}
+
+    if 'anio' in consulta.parametros:
+        anios = fuentes.anios_disponibles()
+        # Sin año, el del rango pedido; sin año ni rango, el último
+        if 'anio' not in valores and 'desde' in valores:
+            valores['anio'] = valores['desde'].year
+        elif 'anio' not in valores and 'hasta' in valores:
+            valores['anio'] = (valores['hasta'] - dt.timedelta(days=1)).year
+        valores.setdefault('anio', anios[-1])
+        if valores['anio'] not in anios:
+            raise ParametroInvalido('Sin datos de %d (años: %s)' % (valores['anio'], ', '.join(map(str, anios))))
+    if 'desde' in consulta.parametros:
+        valores.setdefault('desde', dt.date(valores['anio'], 1, 1))
+        valores.setdefault('hasta', dt.date(valores['anio'] + 1, 1, 1))
+        if valores['hasta'] <= valores['desde']:
+            raise ParametroInvalido('hasta debe ser posterior a desde')
+        if valores['desde'] < dt.date(valores['anio'], 1, 1) or valores['hasta'] > dt.date(valores['anio'] + 1, 1, 1):
+            raise ParametroInvalido('desde y hasta deben estar dentro de %d' % valores['anio'])
+    if 'fuente' in consulta.parametros:
+        valores.setdefault('fuente', 'precio_eu')
+        if valores['fuente'] not in ('precio_es', 'precio_eu'):
+            raise ParametroInvalido('fuente debe ser precio_es o precio_eu')
+    if 'estadisticas' in consulta.parametros:
+        valores.setdefault('estadisticas', ESTADISTICAS)
+        desconocidas = set(valores['estadisticas']) - set(ESTADISTICAS)
+        if desconocidas:
+            raise ParametroInvalido('Estadísticas desconocidas: %s' % ', '.join(sorted(desconocidas)))
+    return valores
+
+
+def _paises(disponibles, paises):
+    # Todos si no se indican; error si se pide alguno sin datos. Los precios
+    # tienen los países por nombre y las emisiones por código: se admiten los
+    # dos (NOMBRES) y se devuelven como los tienen los datos
+    if not paises:
+        return list(disponibles)
+    alias = {p: p for p in disponibles}
+    for codigo, nombre in NOMBRES.items():
+        if nombre in alias:
+            alias.setdefault(codigo, nombre)
+        if codigo in alias:
+            alias.setdefault(nombre, codigo)
+    desconocidos = [p for p in paises if p not in alias]
+    if desconocidos:
+        raise ParametroInvalido('Países sin datos: %s (hay: %s)' % (', '.join(desconocidos), ', '.join(disponibles)))
+    return list(dict.fromkeys(alias[p] for p in paises))
+
+
+#####################################################
+## Consultas
+#####################################################
+
+def mix_diario(anio, desde, hasta):
+    cubo = fuentes.datos_generacion(anio)
+
+    def construir():
+        df = cubo.diario_rango(desde, hasta)
+        df['proporcion'] = df['value'] / df.groupby('date')['value'].transform('sum')
+        return df
+    return cubo, construir
+
+
+def generacion_mensual(anio):
+    cubo = fuentes.datos_generacion(anio)
+    return cubo, lambda: cubo.mensual(anio)
+
+
+def estadisticas_precio(anio, desde, hasta, fuente, paises=(), estadisticas=ESTADISTICAS):
+    tablas = fuentes.datos_estadisticas_precio(fuente, anio)
+    paises = _paises(tablas.paises, paises)
+    return tablas, lambda: tablas.rango(desde, hasta, paises, estadisticas)
+
+
+def precios_eu(anio, desde, hasta, paises=()):
+    precios = fuentes.datos_precios_horarios(anio)
+    paises = _paises(precios.paises, paises)
+    return precios, lambda: precios.rango(desde, hasta, paises)
+
+
+def emisiones_diarias(anio, desde, hasta, paises=()):
+    emisiones = fuentes.datos_emisiones_paises(anio)
+    paises = _paises(emisiones.paises, paises)
+    return emisiones, lambda: emisiones.rango(desde, hasta, paises)
+
+
+CONSULTAS = {
+    'mix_diario': Consulta(mix_diario, ('anio', 'desde', 'hasta'),
+                           'Generación diaria por tecnología (MWh) y su proporción en el día'),
+    'generacion_mensual': Consulta(generacion_mensual, ('anio',),
+                                   'Generación mensual por tecnología (MWh)'),
+    'estadisticas_precio': Consulta(estadisticas_precio, ('anio', 'desde', 'hasta', 'fuente', 'paises', 'estadisticas'),
+                                    'Estadísticas diarias de precio por país (€/MWh); en precio_es, del precio total'),
+    'precios_eu': Consulta(precios_eu, ('anio', 'desde', 'hasta', 'paises'),
+                           'Precio horario por país (€/MWh)'),
+    'emisiones_diarias': Consulta(emisiones_diarias, ('anio', 'desde', 'hasta', 'paises'),
+                                  'Intensidad de carbono media diaria por país (gCO2eq/kWh)'),
+}
+
+
+def consultar(nombre, **parametros):
+    """DataFrame de la consulta `nombre` (sin serializar ni cachear el resultado)."""
+    _, construir = CONSULTAS[nombre].funcion(**normalizar(nombre, parametros))
+    return construir()
+
+
+#####################################################
+## Resultados serializados (caché LRU)
+#####################################################
+
+_resultados = OrderedDict()
+_bytes = 0
+_limite = LIMITE_BYTES
+_cerrojo = threading.Lock()
+_stats = {'aciertos': 0, 'fallos': 0, 'expulsiones': 0}
+
+
+def _texto(valor):
+    return valor.isoformat() if isinstance(valor, dt.date) else list(valor) if isinstance(valor, tuple) else valor
+
+
+def _serializar(nombre, parametros, version, df):
+    # Cabecera con json.dumps y filas con DataFrame.to_json (en C, fechas ISO)
+    cabecera = json.dumps({'consulta': nombre, 'version': version,
+                           'parametros': {p: _texto(v) for p, v in sorted(parametros.items())},
+                           'filas': len(df)}, ensure_ascii=False)
+    datos = df.to_json(orient='records', date_format='iso', force_ascii=False)
+    return (cabecera[:-1] + ', "datos": ' + datos + '}').encode('utf-8')
+
+
+def _guardar(clave, resultado):
+    global _bytes
+    with _cerrojo:
+        if clave in _resultados:
+            return
+        _resultados[clave] = resultado
+        _bytes += len(resultado.cuerpo) + len(resultado.comprimido)
+        while _bytes > _limite and len(_resultados) > 1:
+            _, expulsado = _resultados.popitem(last=False)
+            _bytes -= len(expulsado.cuerpo) + len(expulsado.comprimido)
+            _stats['expulsiones'] += 1
+
+
+def obtener(nombre, parametros):
+    """Resultado (JSON, JSON con gzip, versión, ETag) de `nombre`, cacheado.
+
+    Lanza KeyError si la consulta no existe y ParametroInvalido si los
+    parámetros no son válidos.
+    """
+    parametros = normalizar(nombre, parametros)
+    # Cargar los datos (o comprobar que siguen al día) da su versión
+    datos, construir = CONSULTAS[nombre].funcion(**parametros)
+    version = carga.version(datos)
+    clave = (nombre, tuple(sorted(parametros.items())), version)
+
+    with _cerrojo:
+        resultado = _resultados.get(clave)
+        if resultado is not None:
+            _resultados.move_to_end(clave)
+            _stats['aciertos'] += 1
+            return resultado
+        _stats['fallos'] += 1
+
+    cuerpo = _serializar(nombre, parametros, version, construir())
+    comprimido = gzip.compress(cuerpo, compresslevel=6, mtime=0)
+    if version is None:
+        # Datos fuera de la caché de carga.py: sin versión no hay ETag ni se guarda
+        return Resultado(cuerpo, comprimido, None, None)
+    resultado = Resultado(cuerpo, comprimido, version, '"%s"' % hashlib.sha256(repr(clave).encode()).hexdigest()[:16])
+    _guardar(clave, resultado)
+    return resultado
+
+
+def vaciar():
+    global _bytes
+    with _cerrojo:
+        _resultados.clear()
+        _bytes = 0
+
+
+def estadisticas():
+    """Aciertos, fallos, expulsiones y tamaño de la caché de resultados."""
+    with _cerrojo:
+        return dict(_stats, entradas=len(_resultados), bytes=_bytes)
@@ -0,0 +1,439 @@
+# IMPORTS
+import numpy as np
+import pandas as pd
+
+import trazas
+
+
+
+#####################################################
+## Cubo de agregados por serie y periodo
+#####################################################
+
+# Sumas y número de valores por serie (tecnología o país) a nivel de 5
+# minutos, 15 minutos, hora, día, mes y año, calculados en una sola pasada
+# vectorizada:
+#
+#   filas normalizadas -> matriz base (periodos × series)          [np.bincount]
+#   5 min -> 15 min -> horas -> días -> meses -> años              [np.add.reduceat]
+#
+# El nivel base es la resolución más fina de las filas recibidas: 'hora' con
+# datos horarios (los niveles de 5 y 15 minutos quedan vacíos) y '15min' o
+# '5min' con las series cuartohorarias o cincominutales de REE. Cada nivel se
+# obtiene del anterior, no de las filas originales. Al añadir filas nuevas
+# (anadir) se suman en la matriz base y solo se recalculan los periodos
+# afectados de los niveles superiores. Los gráficos de generación y la media
+# diaria de emisiones leen de aquí en lugar de agrupar el DataFrame en cada
+# rerun; los gráficos de un día eligen el nivel con nivel_para.
+#
+# Las claves de cada nivel son enteros desde 1970-01-01 en UTC (periodos de 5
+# y 15 minutos, horas, días, meses y años epoch), igual que la columna date
+# de los prep_*. Los valores NaN no se suman ni se cuentan (como en groupby).
+#
+# Un mismo cubo puede tener días horarios y días cuartohorarios (p. ej. el
+# cambio de REE a datos de 15 minutos). Al bajar el nivel base, cada hora
+# queda entera en el primero de sus subperiodos, así que en los niveles
+# finos un día horario no se puede dibujar: se guarda la resolución de cada
+# día y serie() lee cada día como mucho con la suya.
+
+_NS_HORA = 3600 * 10**9
+
+NIVELES = ('5min', '15min', 'hora', 'dia', 'mes', 'anio')
+
+# Niveles hasta el día: duración en ns y periodos por día
+NS = {'5min': 300 * 10**9, '15min': 900 * 10**9, 'hora': _NS_HORA, 'dia': 24 * _NS_HORA}
+POR_DIA = {'5min': 288, '15min': 96, 'hora': 24, 'dia': 1}
+
+
+def resolucion(datetimes):
+    """Nivel más grueso ('hora', '15min' o '5min') en el que cae cada instante."""
+    ns = pd.DatetimeIndex(datetimes).as_unit('ns').asi8
+    for nivel in ('hora', '15min'):
+        if not (ns % NS[nivel]).any():
+            return nivel
+    return '5min'
+
+
+def _dias_subhorarios(ns):
+    # {día epoch: posición en NIVELES} de los días con instantes fuera de la
+    # hora en punto (los demás son horarios)
+    resolucion = {}
+    for nivel in ('15min', '5min'):
+        fuera = ns % NS[NIVELES[NIVELES.index(nivel) + 1]] != 0
+        resolucion.update(dict.fromkeys(np.unique(ns[fuera] // NS['dia']).tolist(), NIVELES.index(nivel)))
+    return resolucion
+
+
+def nivel_para(niveles, dias, puntos):
+    """Primer nivel de `niveles` (de fino a grueso) con a lo sumo `puntos` periodos en `dias` días."""
+    for nivel in niveles:
+        if dias * POR_DIA[nivel] <= puntos:
+            return nivel
+    return niveles[-1]
+
+
+def _5min_a_15min(claves):
+    return claves // 3
+
+def _15min_a_hora(claves):
+    return claves // 4
+
+def _hora_a_dia(horas):
+    return horas // 24
+
+def _dia_a_mes(dias):
+    return dias.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+def _mes_a_anio(meses):
+    return meses // 12
+
+# Nivel -> (nivel del que se obtiene, función que pasa sus claves a este nivel)
+_PADRE = {
+    '15min': ('5min', _5min_a_15min),
+    'hora': ('15min', _15min_a_hora),
+    'dia': ('hora', _hora_a_dia),
+    'mes': ('dia', _dia_a_mes),
+    'anio': ('mes', _mes_a_anio),
+}
+
+
+def _reducir(claves, suma, cuenta, agrupar):
+    # claves está ordenado y agrupar es monótona: cada grupo es un tramo contiguo
+    gruesas = agrupar(claves)
+    nuevas, inicios = np.unique(gruesas, return_index=True)
+    if len(nuevas) == 0:
+        return nuevas, suma[:0], cuenta[:0]
+    return nuevas, np.add.reduceat(suma, inicios, axis=0), np.add.reduceat(cuenta, inicios, axis=0)
+
+
+class Cubo:
+    """Sumas y conteos por serie a nivel de 5 y 15 minutos, hora, día, mes y año."""
+
+    def __init__(self):
+        self.nombres = []
+        # Nivel más fino con datos: las filas se suman en él
+        self.base = 'hora'
+        # Día epoch -> posición en NIVELES de la resolución de sus filas (solo
+        # los días subhorarios; el resto son horarios)
+        self._resolucion = {}
+        self._columnas = {}
+        # Sumas acumuladas por nivel para las consultas por rango (se calculan al pedirlas)
+        self._acumulados = {}
+        # nivel -> (claves ordenadas, suma [claves × series], cuenta [claves × series])
+        self._niveles = {n: (np.empty(0, np.int64), np.zeros((0, 0)), np.zeros((0, 0), np.int64))
+                         for n in NIVELES}
+
+    @classmethod
+    def desde(cls, df):
+        cubo = cls()
+        cubo.anadir(df)
+        return cubo
+
+    def copia(self):
+        """Cubo independiente con los mismos datos (para anadir sin tocar este).
+
+        anadir sustituye los arrays de cada nivel en lugar de escribir en
+        ellos, así que basta con copiar los contenedores.
+        """
+        cubo = Cubo()
+        cubo.nombres = list(self.nombres)
+        cubo.base = self.base
+        cubo._resolucion = dict(self._resolucion)
+        cubo._columnas = dict(self._columnas)
+        cubo._niveles = dict(self._niveles)
+        return cubo
+
+    def _columnas_de(self, name):
+        # Códigos de columna para cada fila; las series nuevas se añaden al final
+        name = pd.Categorical(name)
+        for nombre in name.categories:
+            if nombre not in self._columnas:
+                self._columnas[nombre] = len(self.nombres)
+                self.nombres.append(nombre)
+
+        traduccion = np.array([self._columnas[n] for n in name.categories], dtype=np.int64)
+        return traduccion[name.codes]
+
+    def _ampliar_series(self):
+        # Añade columnas vacías si han aparecido series nuevas
+        n = len(self.nombres)
+        for nivel, (claves, suma, cuenta) in self._niveles.items():
+            if suma.shape[1] < n:
+                extra = n - suma.shape[1]
+                self._niveles[nivel] = (claves,
+                                        np.pad(suma, ((0, 0), (0, extra))),
+                                        np.pad(cuenta, ((0, 0), (0, extra))))
+
+    def _refinar(self, base):
+        # Baja el nivel base hasta `base`: cada periodo pasa al primero de sus
+        # subperiodos (las filas horarias quedan en el minuto 0 de su hora)
+        claves, suma, cuenta = self._niveles[self.base]
+        while self.base != base:
+            fino = NIVELES[NIVELES.index(self.base) - 1]
+            claves = claves * (NS[self.base] // NS[fino])
+            self._niveles[fino] = (claves, suma, cuenta)
+            self.base = fino
+
+    def anadir(self, df, columna='datetime'):
+        """Suma al cubo las filas de df (name, value y `columna`)."""
+        if len(df) == 0:
+            return self
+
+        columnas = self._columnas_de(df['name'])
+        self._ampliar_series()
+        n = len(self.nombres)
+
+        # Datos más finos que los que había: se baja el nivel base
+        base = resolucion(df[columna])
+        if NIVELES.index(base) < NIVELES.index(self.base):
+            self._refinar(base)
+
+        # Resolución de cada día (la más fina si ya tenía filas)
+        ns = pd.DatetimeIndex(df[columna]).as_unit('ns').asi8
+        if base != 'hora':
+            for dia, nivel in _dias_subhorarios(ns).items():
+                self._resolucion[dia] = min(nivel, self._resolucion.get(dia, nivel))
+
+        # Matriz del nivel base de las filas nuevas en una pasada
+        periodos = ns // NS[self.base]
+        periodos_nuevos, fila = np.unique(periodos, return_inverse=True)
+        posicion = fila.ravel() * n + columnas
+        valores = df['value'].to_numpy(dtype=np.float64)
+        # Los valores que faltan (NaN) no cuentan ni en la suma ni en la cuenta, como en groupby
+        hay = ~np.isnan(valores)
+        posicion, valores = posicion[hay], valores[hay]
+        suma_nueva = np.bincount(posicion, weights=valores, minlength=len(periodos_nuevos) * n).reshape(-1, n)
+        cuenta_nueva = np.bincount(posicion, minlength=len(periodos_nuevos) * n).reshape(-1, n)
+
+        # Fusión con los periodos ya existentes
+        claves, suma, cuenta = self._niveles[self.base]
+        if len(claves) == 0 or periodos_nuevos[0] > claves[-1]:
+            # Caso habitual: periodos posteriores a los que ya había
+            claves = np.concatenate([claves, periodos_nuevos])
+            suma = np.concatenate([suma, suma_nueva])
+            cuenta = np.concatenate([cuenta, cuenta_nueva])
+        else:
+            todas = np.union1d(claves, periodos_nuevos)
+            suma_total = np.zeros((len(todas), n))
+            cuenta_total = np.zeros((len(todas), n), np.int64)
+            viejas = np.searchsorted(todas, claves)
+            nuevas = np.searchsorted(todas, periodos_nuevos)
+            suma_total[viejas] = suma
+            cuenta_total[viejas] = cuenta
+            suma_total[nuevas] += suma_nueva
+            cuenta_total[nuevas] += cuenta_nueva
+            claves, suma, cuenta = todas, suma_total, cuenta_total
+        self._niveles[self.base] = (claves, suma, cuenta)
+
+        self._reagregar(periodos_nuevos[0])
+        self._acumulados = {}
+        return self
+
+    def _reagregar(self, primer_periodo):
+        # Recalcula cada nivel por encima del base solo desde el primer periodo afectado
+        primera = primer_periodo
+        for nivel in NIVELES[NIVELES.index(self.base) + 1:]:
+            padre, agrupar = _PADRE[nivel]
+            claves_p, suma_p, cuenta_p = self._niveles[padre]
+            claves, suma, cuenta = self._niveles[nivel]
+
+            primera = int(agrupar(np.array([primera], dtype=np.int64))[0])
+            desde_p = np.searchsorted(agrupar(claves_p), primera)
+            hasta = np.searchsorted(claves, primera)
+
+            nuevas, suma_n, cuenta_n = _reducir(claves_p[desde_p:], suma_p[desde_p:], cuenta_p[desde_p:], agrupar)
+            self._niveles[nivel] = (np.concatenate([claves[:hasta], nuevas]),
+                                    np.concatenate([suma[:hasta], suma_n]),
+                                    np.concatenate([cuenta[:hasta], cuenta_n]))
+
+    #####################################################
+    ## Consultas
+    #####################################################
+
+    def nivel(self, nivel):
+        """(claves, suma, cuenta) de un nivel ('5min', '15min', 'hora', 'dia', 'mes' o 'anio')."""
+        return self._niveles[nivel]
+
+    def _tramo(self, nivel, desde, hasta):
+        # Filas del nivel con clave en [desde, hasta)
+        claves, suma, cuenta = self._niveles[nivel]
+        i, j = np.searchsorted(claves, [desde, hasta])
+        return claves[i:j], suma[i:j], cuenta[i:j]
+
+    def _largo(self, claves, suma, cuenta, columna):
+        # Formato largo (una fila por periodo y serie con datos), como groupby
+        fila, col = np.nonzero(cuenta)
+        return pd.DataFrame({
+            columna: claves[fila],
+            'name': pd.Categorical.from_codes(col, categories=self.nombres),
+            'value': suma[fila, col],
+        })
+
+    def niveles_dia(self):
+        """Niveles con los que se puede dibujar un día, del base (el más fino) a 'dia'."""
+        return NIVELES[NIVELES.index(self.base):NIVELES.index('dia') + 1]
+
+    def nivel_para(self, dias, puntos):
+        """Nivel más fino con a lo sumo `puntos` periodos por serie en `dias` días."""
+        return nivel_para(self.niveles_dia(), dias, puntos)
+
+    def _niveles_serie(self, desde, hasta, nivel):
+        # {nivel: días de [desde, hasta) que se leen en él}: `nivel` o, en los
+        # días con datos más gruesos, el de sus datos (None: todos en `nivel`)
+        minimo = NIVELES.index(nivel)
+        if minimo >= NIVELES.index('hora'):
+            return None
+        d0, d1 = (int(np.datetime64(f, 'D').astype(np.int64)) for f in (desde, hasta))
+        grupos = {}
+        for dia in range(d0, d1):
+            resolucion = self._resolucion.get(dia, NIVELES.index('hora'))
+            grupos.setdefault(NIVELES[max(minimo, resolucion)], []).append(dia)
+        return grupos if set(grupos) - {nivel} else None
+
+    @trazas.medir('filtro')
+    def serie(self, desde, hasta, nivel, media=False):
+        """Valor por periodo de `nivel` y serie en [desde, hasta) (datetime, name, value).
+
+        Con media=False, la suma del periodo dividida entre sus horas (la
+        potencia media en MW si los valores son la energía de cada periodo);
+        con media=True, la media de los valores. Los días con datos más
+        gruesos que `nivel` (p. ej. horarios en un cubo cuartohorario) se dan
+        con los periodos de sus datos.
+        """
+        grupos = self._niveles_serie(desde, hasta, nivel)
+        if grupos is None:
+            i, j = self._limites(desde, hasta, nivel)
+            return self._serie(nivel, slice(i, j), media)
+        partes = []
+        for nivel_dia, dias in grupos.items():
+            claves = self._niveles[nivel_dia][0]
+            partes.append(self._serie(nivel_dia, np.isin(claves // POR_DIA[nivel_dia], dias), media))
+        return pd.concat(partes, ignore_index=True).sort_values('datetime', kind='stable', ignore_index=True)
+
+    def _serie(self, nivel, filas, media):
+        # serie() de las filas `filas` (tramo o máscara) de un nivel
+        claves, suma, cuenta = (a[filas] for a in self._niveles[nivel])
+        suma = suma / np.maximum(cuenta, 1) if media else suma / (NS[nivel] / _NS_HORA)
+        df = self._largo(claves, suma, cuenta, 'datetime')
+        df['datetime'] = pd.to_datetime(df['datetime'] * NS[nivel], utc=True)
+        return df
+
+    @trazas.medir('filtro')
+    def diario(self, date):
+        """Suma por serie del día `date`, de mayor a menor (name, value)."""
+        dia = int(np.datetime64(date, 'D').astype(np.int64))
+        _, suma, cuenta = self._tramo('dia', dia, dia + 1)
+        return self._totales(suma.sum(axis=0), cuenta.sum(axis=0))
+
+    @trazas.medir('filtro')
+    def mensual(self, anio):
+        """Suma por mes y serie del año (month, name, value), como agregar_g4."""
+        primero = (anio - 1970) * 12
+        df = self._largo(*self._tramo('mes', primero, primero + 12), 'month')
+        df['month'] = df['month'] - primero + 1
+        return df
+
+    @trazas.medir('filtro')
+    def anual(self, anio):
+        """Suma y proporción por serie del año, como agregar_g3."""
+        _, suma, cuenta = self._tramo('anio', anio - 1970, anio - 1970 + 1)
+        df = self._totales(suma.sum(axis=0), cuenta.sum(axis=0))
+        df['value_normalized'] = df['value'] / df['value'].sum()
+        return df
+
+    def _totales(self, suma, cuenta, ordenar=True):
+        # Una fila por serie con datos a partir de los vectores suma/cuenta por serie
+        con_datos = cuenta > 0
+        df = pd.DataFrame({
+            'name': pd.Categorical(np.array(self.nombres, dtype=object)[con_datos], categories=self.nombres),
+            'value': suma[con_datos],
+        })
+        if ordenar:
+            df = df.sort_values('value', ascending=False, ignore_index=True)
+        return df
+
+    @trazas.medir('filtro')
+    def medias_diarias(self):
+        """Media diaria por serie (date, name, value), como agregar_c1."""
+        claves, suma, cuenta = self._niveles['dia']
+        fila, col = np.nonzero(cuenta)
+        return pd.DataFrame({
+            'date': pd.to_datetime(claves[fila], unit='D').as_unit('ns'),
+            'name': pd.Categorical.from_codes(col, categories=self.nombres),
+            'value': suma[fila, col] / cuenta[fila, col],
+        })
+
+    #####################################################
+    ## Consultas por rango de fechas (sumas acumuladas)
+    #####################################################
+
+    # Para cada nivel se guarda la suma acumulada (prefijo) de suma y cuenta por
+    # serie, con una fila inicial de ceros. El total de cualquier ventana
+    # [desde, hasta) es la resta de dos filas: dos búsquedas binarias y una
+    # resta por serie, sin importar la longitud de la ventana.
+
+    def _acumulado(self, nivel):
+        if nivel not in self._acumulados:
+            _, suma, cuenta = self._niveles[nivel]
+            n = suma.shape[1]
+            acum_suma = np.zeros((len(suma) + 1, n))
+            acum_cuenta = np.zeros((len(cuenta) + 1, n), np.int64)
+            acum_periodos = np.zeros(len(cuenta) + 1, np.int64)
+            np.cumsum(suma, axis=0, out=acum_suma[1:])
+            np.cumsum(cuenta, axis=0, out=acum_cuenta[1:])
+            # Periodos (horas, días...) con algún dato, para las medias por periodo
+            np.cumsum(cuenta.any(axis=1), out=acum_periodos[1:])
+            self._acumulados[nivel] = (acum_suma, acum_cuenta, acum_periodos)
+        return self._acumulados[nivel]
+
+    def _limites(self, desde, hasta, nivel):
+        # Posiciones en el nivel de las fechas [desde, hasta)
+        dias = np.array([np.datetime64(desde, 'D'), np.datetime64(hasta, 'D')]).astype(np.int64)
+        claves = dias * POR_DIA[nivel]
+        return np.searchsorted(self._niveles[nivel][0], claves)
+
+    @trazas.medir('filtro')
+    def totales(self, desde, hasta, nivel='dia'):
+        """Suma y nº de valores por serie, y nº de periodos con datos, en [desde, hasta)."""
+        acum_suma, acum_cuenta, acum_periodos = self._acumulado(nivel)
+        i, j = self._limites(desde, hasta, nivel)
+        return acum_suma[j] - acum_suma[i], acum_cuenta[j] - acum_cuenta[i], int(acum_periodos[j] - acum_periodos[i])
+
+    @trazas.medir('filtro')
+    def mix(self, desde, hasta):
+        """Total y proporción por serie en [desde, hasta), de mayor a menor."""
+        suma, cuenta, _ = self.totales(desde, hasta)
+        df = self._totales(suma, cuenta)
+        df['value_normalized'] = df['value'] / df['value'].sum()
+        return df
+
+    @trazas.medir('filtro')
+    def medias(self, desde, hasta):
+        """Media de los valores de cada serie en [desde, hasta) (name, value)."""
+        suma, cuenta, _ = self.totales(desde, hasta)
+        return self._totales(suma / np.maximum(cuenta, 1), cuenta, ordenar=False)
+
+    @trazas.medir('filtro')
+    def media_total(self, desde, hasta):
+        """Media por periodo del nivel base de la suma de todas las series en [desde, hasta)."""
+        suma, _, periodos = self.totales(desde, hasta, nivel=self.base)
+        return suma.sum() / periodos if periodos else np.nan
+
+    @trazas.medir('filtro')
+    def total_por_periodo(self, desde, hasta):
+        """Suma de todas las series en cada periodo del nivel base con datos de [desde, hasta)."""
+        i, j = self._limites(desde, hasta, self.base)
+        _, suma, cuenta = self._niveles[self.base]
+        return suma[i:j].sum(axis=1)[cuenta[i:j].any(axis=1)]
+
+    @trazas.medir('filtro')
+    def diario_rango(self, desde, hasta, media=False):
+        """Suma (o media) por día y serie en [desde, hasta) (date, name, value)."""
+        i, j = self._limites(desde, hasta, 'dia')
+        claves, suma, cuenta = self._niveles['dia']
+        claves, suma, cuenta = claves[i:j], suma[i:j], cuenta[i:j]
+        if media:
+            suma = suma / np.maximum(cuenta, 1)
+        df = self._largo(claves, suma, cuenta, 'date')
+        df['date'] = pd.to_datetime(df['date'], unit='D').astype('datetime64[ns]')
+        return df
@@ -1,497 +1,22 @@
 # IMPORTS
 import streamlit as st
-import altair as alt 
 import pandas as pd
 import numpy as np
-from vega_datasets import data
 import datetime as dt
-import openpyxl
-
-
-
-###################################
-# Gráfico A.1: Generación eléctrica por tecnologías en España
-###################################
-
-# Preprocesamiento de datos
-
-def prep_g1(df_G):
-    
-    # Convertir la columna datetime a tipo datetime
-    df_G['datetime'] = pd.to_datetime(df_G['datetime'], utc = True)
-    df_G['date'] = df_G['datetime'].dt.date
-
-    # Convertir la columna value a tipo float
-    df_G['value'] = df_G['value'].astype(float)
-
-    # Convertir la columna name a tipo categoría
-    df_G['name'] = df_G['name'].astype('category')
-
-    # Elimino las columnas vacías
-    df_G = df_G.drop(['geoid', 'geoname'], axis=1)
-
-    # Elimino la categoria total (no es relevante en este caso) y adapto nombres
-    df_G = df_G.drop(df_G[df_G['id']== 10195].index)
-    df_G['name'] = df_G['name'].str.slice(18)
-    
-    return df_G
-    
-
-# Filtrar los datos en función de la fecha seleccionada
-def get_plot_generacion_dia(date, df):
-
-    date = date.date()
-    
-    # Crear una máscara de filtro para la fecha seleccionada
-    mask = (df['date'] == date)
-    df_filtered = df.loc[mask]
-    
-    # Mostrar los datos filtrados para depuración
-    st.write("Datos filtrados:", date)
-
-    # Crear el gráfico Altair
-    selection = alt.selection_point(fields=['name'], bind='legend')
-
-    chart = alt.Chart(df_filtered).mark_area(interpolate='step').encode(
-        x=alt.X('datetime:T', title='Hora del día'),  # Eje X: Hora del día
-        y=alt.Y('sum(value):Q', title='Potencia eléctrica (MW)', scale=alt.Scale(domain=[0, 42000])),  # Suma de potencia
-        color=alt.Color('name:N', title='Tecnología'),  # Diferenciar por tecnología
-        opacity=alt.condition(selection, alt.value(1), alt.value(0.2))
-    ).properties(
-        title='Generación eléctrica por tecnología (diario)',
-        width=700,
-        height=400
-    ).add_params(selection)
-
-    return chart
-
-###################################
-# Gráfico A.2: Generación eléctrica por tecnologías en España (media diaria)
-###################################
-
-# Filtrar los datos en función de la fecha seleccionada
-def get_plot_generacion_dia_media(date, df):
-
-    date = date.date()
-    
-    # Crear una máscara de filtro para la fecha seleccionada
-    mask = (df['date'] == date)
-    df_filtered = df.loc[mask]
-    
-    df_filtered = df_filtered.groupby('name')['value'].sum().sort_values(ascending=False).reset_index()
-    
-    # Calcular la suma total de la columna 'value'
-    total_sum = df_filtered['value'].sum()
-
-    # Normalizar la columna 'value' a un 100%
-    df_filtered['value_normalized'] = (df_filtered['value'] / total_sum)
-    
-    # Mostrar los datos filtrados para depuración
-    st.write("Día seleccionado:", date)
-
-    # Crear el gráfico Altair
-    selection = alt.selection_point(fields=['name'], bind='legend', empty='none')
-
-    chart = alt.Chart(df_filtered).mark_arc().encode(
-    theta="value_normalized",
-    color=alt.Color('name:N', title='Tecnología'),  # Diferenciar por tecnología
-    opacity=alt.condition(selection, alt.value(1), alt.value(0.2))
-    ).properties(
-        title='Proporción de generación eléctrica media diaria por tecnología',
-        width=800,
-        height=500
-    ).add_params(selection)
-    
-    
-    # Añadir un texto para mostrar el porcentaje del segmento seleccionado
-    text = alt.Chart(df_filtered).mark_text(
-        radiusOffset=20,  # Ajusta la distancia del texto desde el centro
-        size=30,          # Tamaño del texto
-        fontWeight='bold' # Hacer el texto en negrita para destacarlo
-    ).encode(
-        theta=alt.Theta("value_normalized:Q", stack=True),
-        text=alt.Text('value_normalized:Q', format=".0%"),
-        color=alt.condition(selection, alt.value('black'), alt.value('transparent')),
-        # Asegurarse de que solo el texto del segmento seleccionado se muestre
-        opacity=alt.condition(selection, alt.value(1), alt.value(0))
-    ).transform_filter(
-        selection
-    )
-
-    return chart + text
-
-
-###################################
-# Gráfico A.3: Generación eléctrica por tecnologías en España (anual)
-###################################
-
-# Preprocesamiento de datos
-
-def prep_g3(df):
-
-    # Elimino la categoria total (no es relevante en este caso) y adapto nombres
-    df = df.drop(df[df['id']== 10195].index)
-    df['name'] = df['name'].str.slice(18)
-    
-    df = df.groupby('name')['value'].sum().sort_values(ascending=False).reset_index()
-
-    # Calcular la suma total de la columna 'value'
-    total_sum = df['value'].sum()
-
-    # Normalizar la columna 'value' a un 100%
-    df['value_normalized'] = (df['value'] / total_sum)
-    
-    return df
-
-# Filtrar los datos en función de la fecha seleccionada
-def get_plot_generacion_anual(df):
-    selection = alt.selection_point(fields=['name'], bind='legend')
-
-    # Base del gráfico
-    base = alt.Chart(df).transform_window(
-        rank='rank(value)',
-        sort=[alt.SortField('value', order='descending')]
-    ).encode(
-        alt.Theta("value:Q", sort=df['name'].to_list()).stack(True),
-        alt.Radius("value").scale(type="sqrt", zero=True),
-        color=alt.Color("name:N", title='Tecnología'),
-        opacity=alt.condition(selection, alt.value(1), alt.value(0.2))
-    ).add_params(selection).properties(
-        title='Generación eléctrica anual por tecnología',
-        width=680,
-        height=500
-    )
-
-    # Grafico de arco
-    c1 = base.mark_arc(innerRadius=12, stroke="#fff")
-
-    # Grafico de texto con formato
-    c2 = base.mark_text(radiusOffset=20, size=20).encode(
-        text=alt.Text("value_normalized:Q", format=".0%")
-        ).transform_filter(
-        alt.datum.rank <= 6
-    )
-        
-    return c1 + c2
-
-
-###################################
-# Gráfico A.4: Generación eléctrica por tecnologías en España (mensual)
-###################################
-
-# Preprocesamiento de datos
-
-def prep_g4(df):
-
-    # Elimino la categoria total (no es relevante en este caso) y adapto nombres
-    df = df.drop(df[df['id']== 10195].index)
-    df['name'] = df['name'].str.slice(18)
-    
-    # Creo una columna llamada Month
-    df['datetime'] = pd.to_datetime(df['datetime'], utc = True)
-    df['month'] = df['datetime'].dt.month
-    df = df.groupby(['month', 'name']).agg({'value': 'sum'}).reset_index()
-
-    return df
-
-# Filtrar los datos en función de la fecha seleccionada
-def get_plot_generacion_mensual(df):
-    selection = alt.selection_point(fields=['name'], bind='legend')
-    
-    chart = alt.Chart(df).mark_bar(size=20).encode(
-        x = alt.X('month', title='Mes de 2023', scale=alt.Scale(domain=[1, 12])),
-        y=alt.Y('sum(value):Q', title='Energía producida (MWh)', scale=alt.Scale(domain=[0, 24000000])),
-        color=alt.Color("name:N", title='Tecnología'),
-        opacity=alt.condition(selection, alt.value(1), alt.value(0.2))
-    ).add_params(selection).properties(
-        title='Generación eléctrica mensual por tecnología',
-        width=680,
-        height=500
-    )
-
-    return chart
-
-
-###################################
-# Gráfico B.1: Desglose horario de precio España
-###################################
-
-# Preprocesamiento de datos
-
-def prep_b1(df):
-    # Seleccionar solo las columnas de interés
-    df = df[['id', 'name', 'value', 'datetime']]
-
-    # Convertir la columna datetime a tipo datetime
-    df['datetime'] = pd.to_datetime(df['datetime'], utc = True) #, utc = True
-
-    # Convertir la columna name a tipo categoría
-    df['name'] = df['name'].astype('category')
-
-    # Limpieza de datos
-    df = df.drop(df[df['id']== 10211].index)
-    df['name'] = df['name'].str.slice(32).str.capitalize()
-    df['date'] = df['datetime'].dt.date
-
-    return df
-
-
-# Filtrar los datos en función de la fecha seleccionada
-def get_plot_precio_hora(date, df):
-
-    date = date.date()
-    
-    # Crear una máscara de filtro para la fecha seleccionada
-    mask = (df['date'] == date)
-    df_filtered = df.loc[mask]
-    
-    # Mostrar los datos filtrados para depuración
-    st.write("Datos filtrados:", date)
-
-    # Crear el gráfico Altair
-    selection = alt.selection_point(fields=['name'], bind='legend')
-
-    chart = alt.Chart(df_filtered).mark_area(interpolate='step').encode(
-        x=alt.X('datetime:T', title='Hora del día'),  # Eje X: Hora del día
-        y=alt.Y('value:Q', title='Precio por MWh (€/MWh)', scale=alt.Scale(domain=[-10, 250])),
-        color=alt.Color('name:N', title='Concepto'),  # Diferenciar por tecnología
-        opacity=alt.condition(selection, alt.value(1), alt.value(0.2)),
-        order=alt.Order('sum(value):Q', sort='descending')
-    ).properties(
-        title='Precio electricidad',
-        width=400,
-        height=400
-    ).add_params(selection)
-
-    return chart
-
-def prices(date, df):
-    date = date.date()
-    
-    # Crear una máscara de filtro para la fecha seleccionada
-    mask = (df['date'] == date)
-    df_filtered = df.loc[mask]
-
-    df_filtered = df_filtered.groupby('datetime')['value'].sum().reset_index()
-
-    avg = df_filtered['value'].mean()
-    min = df_filtered['value'].min()
-    max = df_filtered['value'].max()
-
-    return avg, min, max
-
-###################################
-# Gráfico B.2: Desglose horario de precio EU
-###################################
-
-# Preprocesamiento de datos
-
-def prep_b2(df):
-    # Seleccionar solo las columnas de interés
-    df = df[['id', 'name', 'value', 'datetime']]
-
-    # Convertir la columna datetime a tipo datetime
-    df['datetime'] = pd.to_datetime(df['datetime'], utc = True) #, utc = True
-
-    # Convertir la columna name a tipo categoría
-    df['name'] = df['name'].astype('category')
-
-    # Limpieza de datos
-    df = df.drop(df[df['id']== 1001].index)
-    df['name'] = df['name'].str.slice(27).str.capitalize()
-    df['date'] = df['datetime'].dt.date
-
-    return df
-
-
-def get_plot_precio_hora_eu(date, df):
-    date = date.date()
-    
-    # Crear una máscara de filtro para la fecha seleccionada
-    mask = (df['date'] == date)
-    df_filtered = df.loc[mask]
-    
-    # Mostrar los datos filtrados para depuración
-    st.write("Datos filtrados:", date)
-
-    order = ['Alemania','Bélgica','España','Francia','Italia','Países bajos','Portugal','Reino unido']
-    # Convertir la columna 'category' a un tipo categórico con el orden definido
-    df['name'] = pd.Categorical(df['name'], categories=order, ordered=True)
-    
-    # Ordenar el DataFrame según la columna 'category'
-    df = df.sort_values('name')
-
-    selection = alt.selection_point(fields=['name'], bind='legend')
-
-    # Create a selection that chooses the nearest point & selects based on x-value
-    nearest = alt.selection_point(nearest=True, on="mouseover",
-                             fields=["datetime"], empty=False)
-    
-    # The basic line
-    line = alt.Chart(df_filtered).mark_line(interpolate='step').encode(
-              x=alt.X('datetime:T', title='Hora del día'),  # Eje X: Hora del día
-              y=alt.Y('value:Q', title='Precio por MWh (€/MWh)', scale=alt.Scale(domain=[-10, 300])),
-              color=alt.Color('name:N', title='País'), 
-              opacity=alt.condition(selection, alt.value(1), alt.value(0.2)),
-              ).properties(
-              title='Precio electricidad por paises',
-              width=700,
-              height=400
-              ).add_params(selection)
-    # Draw points on the line, and highlight based on selection
-    points = line.mark_point().encode(
-         opacity=alt.condition(nearest, alt.value(1), alt.value(0)))
-    
-    # Draw a rule at the location of the selection
-    rules = alt.Chart(df_filtered).transform_pivot(
-       "name",
-       value="value",
-       groupby=["datetime"]).mark_rule(color="gray").encode(
-        x="datetime",
-        opacity=alt.condition(nearest, alt.value(0.3), alt.value(0)),
-        tooltip=[alt.Tooltip(c, type="quantitative") for c in order],
-    ).add_params(nearest)
-    # Put the five layers into a chart and bind the data
-    chart = alt.layer(
-        line, points, rules
-    ).properties(
-        width=600, height=300
-    )
-    return chart
-
-
-###################################
-# Gráfico C.1: Emisiones medias diarias
-###################################
-
-# Preprocesamiento de datos
-
-def prep_c1(df):
-    # Convertir la columna datetime a tipo datetime
-    df['datetime'] = pd.to_datetime(df['datetime'], utc = True) 
-    df['date'] = df['datetime'].dt.date
-    
-    df = pd.melt(df, id_vars=['datetime', 'date'], var_name='name', value_name='value')
-
-    df_emis_avg = df.copy().groupby(['date','name']).agg({'value': 'mean'}).reset_index()
-    df_emis_avg['date'] = pd.to_datetime(df_emis_avg['date'])
-    
-    return df_emis_avg
-
-
-# Filtrar los datos por país
-def get_plot_emisiones_eu(pais, df):
-
-    transf = {"Alemania":"DE",
-              'Bélgica':"BE",
-              'España':"ES",
-              'Francia':"FR",
-              'Italia':"IT",
-              'Países bajos':"NL",
-              'Portugal':"PT",
-              'Reino unido':"GB"}
-
-
-    chart = alt.Chart(df[df['name']== transf[pais]], title="Intensidad de carbono media diaria [gCO2eq/kWh]").mark_rect().encode(
-        alt.X("date(date):O").title("Día").axis(format="%e", labelAngle=0),
-        alt.Y("month(date):O").title("Mes"),
-        alt.Color("value").title('gCO2eq/kWh').scale(
-        domain=[0, 450, 900],
-        range=['green', 'red', 'black']),
-        tooltip=[
-            alt.Tooltip("monthdate(date)", title="Fecha"),
-            alt.Tooltip("value", title="Emisiones [gCO2eq/kWh]")]
-    ).configure_view(
-        step=13,
-        strokeWidth=0
-    ).configure_axis(
-        domain=False
-    ).properties(
-    width=700,
-    height=300
-    )
-    
-    
-    return chart
-
-
-###################################
-# Gráfico C.2: Emisiones medias diarias (mapa)
-###################################
-
-def prep_c2(df_emis_avg, df_pot):
-    
-    # Convertir la columna date tipo datetime
-    df_pot['date'] = pd.to_datetime(df_pot['date'])
-    
-    result_df = pd.merge(df_emis_avg, df_pot, on=['date', 'name'], how='inner')
-
-    return result_df
-
-def get_plot_power_emis(df):
-    base = alt.Chart(df)
-    base_bar = base.mark_bar(opacity=0.3, binSpacing=0)
-
-    points = base.mark_circle().encode(
-        alt.X("value").title("Media emisiones diarias [gCO2/kWh]"),
-        alt.Y("power").title("Energía media diaria [MWh]"),
-        color="name",
-    ).properties(width=900, height=600)
-
-    
-    return points
-
-#####################################################
-## Carga de datos
-#####################################################
-
-# Gráfico A.1: Generación por tecnologías
-graf1_path = 'Datos/Generacion/GeneracionTotal_2023_h.csv'
-df_gen = pd.read_csv(graf1_path, delimiter=';')
-
-# Preprocesamiento
-df_G1 = df_gen.copy()
-df_G1 = prep_g1(df_G1)
-
-
-# Gráfico A.3: Generación por tecnologias anual
-df_G3 = df_gen.copy()
-df_G3 = prep_g3(df_G3)
-
-
-# Gráfico A.4: Generación por tecnologias mensual
-df_G4 = df_gen.copy()
-df_G4 = prep_g4(df_G4)
-
-
-# Gráfico B.1: Desglose de precio horario
-graf2_path = 'Datos/Economico/PrecioMedioHorarioFinal_2023_h.xlsx'
-df_E_es = pd.read_excel(graf2_path)
-
-df_B1 = df_E_es.copy()
-df_B1 = prep_b1(df_B1)
-
-# Gráfico B.2: Desglose de precio horario
-graf3_path = 'Datos/Economico/PrecioEuropa_2023_h.csv'
-df_E_eu = pd.read_csv(graf3_path, delimiter=';')
-
-df_B2 = df_E_eu.copy()
-df_B2 = prep_b2(df_B2)
-
-
-# Gráfico C.1: Desglose de precio horario
-graf4_path = 'Datos/Emisiones/output/CI_bottom_up_method.csv'
-df_emis = pd.read_csv(graf4_path, delimiter=',')
-
-df_emis_avg = prep_c1(df_emis)
-
-# Gráfico C.2,3: Desglose de potencias
-df_pot = pd.read_csv('Datos/Emisiones/archive/combined.csv', delimiter=',')
-
-df_emis_pot = prep_c2(df_emis_avg, df_pot)
+import time
 
+import carga
+import especificaciones
+import reduccion
+import trazas
+import vigilancia
+from fuentes import anios_disponibles, precargar
 
+# Los datos y los gráficos de cada pestaña (graficos.py, con altair, lo más
+# lento de importar) se importan dentro de su pestaña, al abrirla
 
+# Inicio de la ejecución (cada rerun vuelve a ejecutar el script)
+inicio_script = time.perf_counter()
 
 
 
@@ -507,114 +32,400 @@ st.set_page_config(
     layout="wide",
     initial_sidebar_state="expanded")
 
-alt.themes.enable("dark")
-
-# Estructura de la web
-
-st.title("Caso práctico de Visualización de Datos - Sector eléctrico español en 2023")
-st.subheader('Visualización de datos - Curso 2023/2024')
-st.subheader('Alumno: Javier Orive Soto')
-
-tab1, tab2, tab3= st.tabs(["Generación por tecnologías", "Precio de la electricidad", "Impacto medioambiental"])
-
-with tab1:
-    
-    # Título
-    st.header("Generación eléctrica por tecnologías en España")
-    
-    # Crear el slider de fecha en Streamlit
-    # Configuración inicial del slider de fecha
-    start_date = dt.datetime(2023, 1, 1)
-    end_date = dt.datetime(2023, 12, 31)
-    selected_date = st.slider(
-        'Seleccione una fecha',
-        min_value=start_date,
-        max_value=end_date,
-        value=start_date,
-        format="YYYY-MM-DD",
-        key = 1
-    )
-   
-    st.altair_chart(get_plot_generacion_dia(selected_date, df_G1), use_container_width=True)
-    
-    col1, col2 = st.columns([5, 4])
-    
-    with col1:
-         st.altair_chart(get_plot_generacion_dia_media(selected_date, df_G1))
-    with col2:
-        st.markdown('')
-        st.markdown('')
-        st.markdown('')
-        st.markdown('')
-        st.markdown('')
-        with st.expander('Información sobre la página', expanded=True):
-            st.write('''
-            Esta página tiene por objetivo mostrar datos de generación eléctrica por tecnología de generación en España durante el año 2023.
-            - Datos: [ESIOS de REE](https://www.esios.ree.es/es)
-            - :orange[**Generación eléctrica por tecnología (diario)**]: muestra el mix eléctrico de un día de 2023 en España (con resolución por hora).
-            - :orange[**Proporción de generación eléctrica media diaria por tecnología**]:  muestra la proporción diaria del mix eléctrico.
-            - :orange[**Generación eléctrica anual por tecnología**]:  muestra la proporción anual del mix eléctrico por tecnologías.
-            - :orange[**Generación eléctrica mensual por tecnología**]:  muestra la proporción mensual del mix eléctrico por tecnologías.         
-            ''')
-        
-    col3, col4 = st.columns(2)
-    
-    with col3:
-        st.altair_chart(get_plot_generacion_anual(df_G3))
-    with col4:
-        st.altair_chart(get_plot_generacion_mensual(df_G4))
-
-with tab2:
-    # Título
-    st.header("Precio diario de la electricidad en España")
-    
-    start_date2 = dt.datetime(2023, 1, 1)
-    end_date2 = dt.datetime(2023, 12, 31)
-    selected_date2 = st.slider(
-        'Seleccione una fecha',
-        min_value=start_date2,
-        max_value=end_date2,
-        value=start_date2,
-        format="YYYY-MM-DD",
-        key = 2
-    )
-
-    colB1, colB2 = st.columns([0.8, 0.2], gap = "large")
-    with colB1:
-        st.altair_chart(get_plot_precio_hora(selected_date2, df_B1), use_container_width=True)
-    with colB2:
-        st.markdown('')
-        st.markdown('')
-        st.markdown('')
-        st.markdown('')
-        with st.expander('#### Resumen de precios:', expanded=True, icon = '💰'):
-            a, b, c = prices(selected_date2, df_B1)
-            st.metric(label="Medio diario", value='%.2f' % a +"€/MWh")
-            st.metric(label="Mínimo diario", value='%.2f' % b +"€/MWh")
-            st.metric(label="Máximo diario", value='%.2f' % c +"€/MWh")
-
-    st.altair_chart(get_plot_precio_hora_eu(selected_date2, df_B2), use_container_width=True)
-    
-with tab3:
-    # Título
-    st.header("Emisiones de CO2 producidas para la generación de electricidad en la UE")
-    st.write("")
-    st.write("")
-    
-    colC1, colC2 = st.columns([0.15, 0.85], gap = "medium")
-    with colC1:
-    
-        country = st.radio('Seleccione el país:',
-                    ['Alemania','Bélgica','España','Francia','Italia','Países bajos','Portugal','Reino unido'])
-    with colC2:
-        st.altair_chart(get_plot_emisiones_eu(country, df_emis_avg), use_container_width=True)
-   
-   
-    colC3, colC4 = st.columns([0.75, 0.25], gap = "small")
-    
-    with colC3:
-        st.altair_chart(get_plot_power_emis(df_emis_pot))        
-    with colC4:
-        st.dataframe(df_emis_pot)
-    
-    
+# Con ?depurar=1 en la URL se miden las etapas del rerun (trazas.py) y se
+# muestran en la barra lateral
+depurar = st.query_params.get('depurar') == '1'
+if depurar:
+    trazas.iniciar()
+
+# Lo que sigue va dentro de try/finally: aunque el rerun se interrumpa (st.rerun,
+# un error) la ejecución de trazas.py se cierra y sus tramos se escriben
+try:
+    # Los ficheros nuevos de Datos/ se incorporan en segundo plano (vigilancia.py);
+    # este rerun usa de principio a fin la versión de los datos publicada ahora
+    vigilante = vigilancia.arrancar()
+    carga.fijar()
+
+    # Selección de periodo: un día o un rango que contiene la fecha del slider
+
+    PERIODOS = ['Día', 'Semana', 'Mes', 'Trimestre', 'Personalizado']
+
+    def rango_periodo(periodo, date):
+        # [desde, hasta) del periodo que contiene date
+        date = date.date()
+        if periodo == 'Semana':
+            desde = date - dt.timedelta(days=date.weekday())
+            return desde, desde + dt.timedelta(days=7)
+        if periodo in ('Mes', 'Trimestre'):
+            meses = 1 if periodo == 'Mes' else 3
+            mes = date.month if periodo == 'Mes' else 3 * ((date.month - 1) // 3) + 1
+            desde = date.replace(month=mes, day=1)
+            fin = mes - 1 + meses
+            return desde, dt.date(desde.year + fin // 12, fin % 12 + 1, 1)
+        return date, date + dt.timedelta(days=1)
+
+    def seleccionar_periodo(selected_date, start_date, end_date, key):
+        periodo = st.radio('Periodo', PERIODOS, horizontal=True, key=key)
+        if periodo != 'Personalizado':
+            return (periodo,) + rango_periodo(periodo, selected_date)
+
+        inicio = selected_date.date()
+        rango = st.date_input('Seleccione el rango de fechas',
+                              value=(inicio, min(inicio + dt.timedelta(days=6), end_date.date())),
+                              min_value=start_date.date(), max_value=end_date.date(), key=key + 1)
+        # Mientras se elige el rango, date_input devuelve solo la fecha inicial
+        return periodo, rango[0], rango[-1] + dt.timedelta(days=1)
+
+    # Gráficos: la especificación Vega-Lite se guarda en especificaciones.py con la
+    # clave (gráfico, selección, versión de los datos de los que sale)
+
+    def tarea(funcion, seleccion, datos, *args):
+        # (clave, constructor) de un gráfico; datos es el valor devuelto por carga.obtener
+        return (funcion.__name__, seleccion, carga.version(datos)), lambda: funcion(*args)
+
+    # Tiempo hasta el primer gráfico de la ejecución
+    tiempos = {}
+
+    def grafico(funcion, seleccion, datos, *args, **kwargs):
+        clave, construir = tarea(funcion, seleccion, datos, *args)
+        try:
+            spec = especificaciones.obtener(clave, construir)
+        except reduccion.CargaExcesiva as e:
+            # Demasiados datos incluso reducidos: solo falta este gráfico
+            st.error('No se puede mostrar el gráfico: %s' % e)
+            return
+        with trazas.tramo('vega_lite_chart', 'serializacion'):
+            st.vega_lite_chart(spec, **kwargs)
+        tiempos.setdefault('primer_grafico', time.perf_counter() - inicio_script)
+
+    def vecinos(date, start_date, end_date, dias=7):
+        # Días alrededor de date dentro del slider, de más cercano a más lejano
+        candidatos = [date + dt.timedelta(days=signo * d) for d in range(1, dias + 1) for signo in (1, -1)]
+        return [d for d in candidatos if start_date <= d <= end_date]
+
+    # Gráficos a precalentar al final del script (una sola tanda por rerun)
+    tareas_precalentar = []
+
+    # Año a visualizar y estado de las cachés
+    with st.sidebar:
+        anios = anios_disponibles()
+        anio = st.selectbox('Año', anios, index=len(anios) - 1)
+        precalentar = st.checkbox('Precalentar días vecinos', value=True)
+
+        stats = carga.estadisticas()
+        st.caption('Caché de datos: %d aciertos / %d fallos' % (stats['aciertos'], stats['fallos']))
+        stats = especificaciones.estadisticas()
+        st.caption('Caché de gráficos: %d aciertos / %d fallos (%.0f%%), %d precalentados, %.1f MB' % (
+            stats['aciertos'], stats['fallos'], 100 * stats['tasa_aciertos'], stats['precalentadas'], stats['bytes'] / 2**20))
+        if vigilante.revisiones:
+            revision = vigilante.revisiones[-1]
+            st.caption('Última actualización de datos: %s (%d filas nuevas, %.2f s)' % (
+                time.strftime('%H:%M:%S', time.localtime(revision.inicio)), sum(revision.filas.values()), revision.segundos))
+        marcador_tiempo = st.empty()
+        marcador_fuentes = st.empty()
+        if st.button('Recargar datos'):
+            carga.invalidar()
+            especificaciones.vaciar()
+            precargar(anio, forzar=True)
+            st.rerun()
+
+    # Estructura de la web
+
+    st.title("Caso práctico de Visualización de Datos - Sector eléctrico español en 2023")
+    st.subheader('Visualización de datos - Curso 2023/2024')
+    st.subheader('Alumno: Javier Orive Soto')
+
+    # Contenido de cada pestaña: solo se ejecuta el de la pestaña abierta, así que
+    # cada una carga sus propios datos la primera vez que se abre
+
+    def pestana_generacion():
+        from fuentes import rango_fechas, datos_generacion
+        from graficos import (get_plot_generacion_dia, get_plot_generacion_dia_media, get_plot_generacion_anual,
+                              get_plot_generacion_mensual, get_plot_generacion_rango, get_plot_generacion_rango_mix)
+
+        # Título
+        st.header("Generación eléctrica por tecnologías en España")
+
+        # Crear el slider de fecha en Streamlit
+        # Configuración inicial del slider de fecha
+        start_date, end_date = rango_fechas('generacion', anio)
+        selected_date = st.slider(
+            'Seleccione una fecha',
+            min_value=start_date,
+            max_value=end_date,
+            value=start_date,
+            format="YYYY-MM-DD",
+            key = 1
+        )
+        periodo, desde, hasta = seleccionar_periodo(selected_date, start_date, end_date, key = 3)
+        cubo_G = datos_generacion(anio)
+
+        if periodo == 'Día':
+            # Mostrar la fecha seleccionada
+            st.write("Datos filtrados:", selected_date.date())
+            grafico(get_plot_generacion_dia, selected_date.date(), cubo_G, selected_date, cubo_G, use_container_width=True)
+            tareas_precalentar.extend([tarea(get_plot_generacion_dia, d.date(), cubo_G, d, cubo_G)
+                                       for d in vecinos(selected_date, start_date, end_date)])
+        else:
+            st.write("Periodo seleccionado:", desde, "-", hasta - dt.timedelta(days=1))
+            grafico(get_plot_generacion_rango, (desde, hasta), cubo_G, desde, hasta, cubo_G, use_container_width=True)
+
+        col1, col2 = st.columns([5, 4])
+
+        with col1:
+            if periodo == 'Día':
+                st.write("Día seleccionado:", selected_date.date())
+                grafico(get_plot_generacion_dia_media, selected_date.date(), cubo_G, selected_date, cubo_G)
+            else:
+                grafico(get_plot_generacion_rango_mix, (desde, hasta), cubo_G, desde, hasta, cubo_G)
+        with col2:
+            st.markdown('')
+            st.markdown('')
+            st.markdown('')
+            st.markdown('')
+            st.markdown('')
+            with st.expander('Información sobre la página', expanded=True):
+                st.write('''
+                Esta página tiene por objetivo mostrar datos de generación eléctrica por tecnología de generación en España durante el año 2023.
+                - Datos: [ESIOS de REE](https://www.esios.ree.es/es)
+                - :orange[**Generación eléctrica por tecnología (diario)**]: muestra el mix eléctrico de un día de 2023 en España (con resolución por hora).
+                - :orange[**Proporción de generación eléctrica media diaria por tecnología**]:  muestra la proporción diaria del mix eléctrico.
+                - :orange[**Periodo**]: con Semana, Mes, Trimestre o Personalizado se muestran la energía diaria y el mix de todo el periodo.
+                - :orange[**Generación eléctrica anual por tecnología**]:  muestra la proporción anual del mix eléctrico por tecnologías.
+                - :orange[**Generación eléctrica mensual por tecnología**]:  muestra la proporción mensual del mix eléctrico por tecnologías.         
+                ''')
+
+        col3, col4 = st.columns(2)
+
+        with col3:
+            grafico(get_plot_generacion_anual, anio, cubo_G, cubo_G.anual(anio))
+        with col4:
+            grafico(get_plot_generacion_mensual, anio, cubo_G, cubo_G.mensual(anio), anio)
+
+    def pestana_precios():
+        from estadisticas_precio import ESTADISTICAS, ETIQUETAS, TOTAL
+        from fuentes import (rango_fechas, datos_precio_es, datos_precios_horarios, datos_precio_cubo,
+                             datos_estadisticas_precio)
+        from graficos import (get_plot_precio_hora, get_plot_precio_rango, prices_rango, get_plot_precio_hora_eu,
+                              get_plot_precio_eu_rango, get_plot_estadisticas_precio)
+
+        # Título
+        st.header("Precio diario de la electricidad en España")
+
+        start_date2, end_date2 = rango_fechas('precio_es', anio)
+        selected_date2 = st.slider(
+            'Seleccione una fecha',
+            min_value=start_date2,
+            max_value=end_date2,
+            value=start_date2,
+            format="YYYY-MM-DD",
+            key = 2
+        )
+        periodo2, desde2, hasta2 = seleccionar_periodo(selected_date2, start_date2, end_date2, key = 5)
+
+        # Cubo de precios de España del año: periodos del rango y, con datos de
+        # 15 o 5 minutos, el nivel del día que cabe en el gráfico
+        cubo_B1 = datos_precio_cubo('precio_es', anio)
+        if periodo2 == 'Día':
+            datos_B1 = datos_precio_es(selected_date2)
+            precios_B2 = datos_precios_horarios(anio)
+            df_B1, idx_B1 = datos_B1
+            # Días vecinos con datos en lo ya cargado (en el almacén, el mes del día elegido)
+            dias_B = [d for d in vecinos(selected_date2, start_date2, end_date2)
+                      if idx_B1.rango(d.date()).stop > idx_B1.rango(d.date()).start]
+        else:
+            cubo_B2 = datos_precio_cubo('precio_eu', anio)
+        sufijo = 'diario' if periodo2 == 'Día' else 'del periodo'
+
+        colB1, colB2 = st.columns([0.8, 0.2], gap = "large")
+        with colB1:
+            if periodo2 == 'Día':
+                st.write("Datos filtrados:", selected_date2.date())
+                grafico(get_plot_precio_hora, selected_date2.date(), datos_B1, selected_date2, df_B1, idx_B1, cubo_B1,
+                        use_container_width=True)
+                tareas_precalentar.extend([tarea(get_plot_precio_hora, d.date(), datos_B1, d, df_B1, idx_B1, cubo_B1)
+                                           for d in dias_B])
+            else:
+                st.write("Periodo seleccionado:", desde2, "-", hasta2 - dt.timedelta(days=1))
+                grafico(get_plot_precio_rango, (desde2, hasta2), cubo_B1, desde2, hasta2, cubo_B1, use_container_width=True)
+        with colB2:
+            st.markdown('')
+            st.markdown('')
+            st.markdown('')
+            st.markdown('')
+            with st.expander('#### Resumen de precios:', expanded=True, icon = '💰'):
+                if periodo2 == 'Día':
+                    # Estadísticas del día ya calculadas al cargar: solo una búsqueda
+                    a, b, c = datos_estadisticas_precio('precio_es', anio).resumen(selected_date2, TOTAL)
+                else:
+                    a, b, c = prices_rango(desde2, hasta2, cubo_B1)
+                st.metric(label="Medio " + sufijo, value='%.2f' % a +"€/MWh")
+                st.metric(label="Mínimo " + sufijo, value='%.2f' % b +"€/MWh")
+                st.metric(label="Máximo " + sufijo, value='%.2f' % c +"€/MWh")
+
+        if periodo2 == 'Día':
+            st.write("Datos filtrados:", selected_date2.date())
+            grafico(get_plot_precio_hora_eu, selected_date2.date(), precios_B2, selected_date2, precios_B2,
+                    use_container_width=True)
+            tareas_precalentar.extend([tarea(get_plot_precio_hora_eu, d.date(), precios_B2, d, precios_B2)
+                                       for d in dias_B if precios_B2.tiene(d)])
+        else:
+            grafico(get_plot_precio_eu_rango, (desde2, hasta2), cubo_B2, desde2, hasta2, cubo_B2, use_container_width=True)
+
+        # Comparación europea de todo el año a partir de las estadísticas diarias
+        st.subheader('Comparación europea: estadísticas diarias del año')
+        tablas_B = datos_estadisticas_precio('precio_eu', anio)
+        colB3, colB4 = st.columns([0.25, 0.75], gap = "medium")
+        with colB3:
+            estadistica = st.selectbox('Estadística:', ESTADISTICAS, format_func=ETIQUETAS.get)
+            paises_B = st.multiselect('Países:', tablas_B.paises, default=tablas_B.paises, key='paises_precio')
+        with colB4:
+            grafico(get_plot_estadisticas_precio, (estadistica, tuple(paises_B)), tablas_B,
+                    estadistica, paises_B, tablas_B, use_container_width=True)
+
+    def pestana_emisiones():
+        from fuentes import datos_emisiones_paises, datos_potencia_emisiones, datos_top_down
+        from graficos import (get_plot_emisiones_eu, get_plot_emisiones_dia_hora, get_plot_emisiones_comparar,
+                              get_plot_resumen_potencia_emis, get_plot_potencia_emis_pais, get_plot_correlacion_movil,
+                              get_plot_descomposicion, get_plot_top_down, get_plot_diferencia_top_down)
+
+        # Título
+        st.header("Emisiones de CO2 producidas para la generación de electricidad en la UE")
+        st.write("")
+        st.write("")
+        # Intensidad por país (una partición por código, todos los países de los datos)
+        emisiones = datos_emisiones_paises(anio)
+
+        colC1, colC2 = st.columns([0.15, 0.85], gap = "medium")
+        with colC1:
+            vista = st.radio('Vista:', ['Media diaria', 'Día × hora', 'Comparar países'])
+            paises = emisiones.nombres
+            if vista == 'Comparar países':
+                paises_C = st.multiselect('Países:', paises, default=paises[:6])
+            else:
+                country = st.selectbox('Seleccione el país:', paises, index=paises.index('España') if 'España' in paises else 0)
+        with colC2:
+            if vista == 'Comparar países':
+                if paises_C:
+                    grafico(get_plot_emisiones_comparar, tuple(paises_C), emisiones, paises_C, emisiones)
+                else:
+                    st.info('Seleccione al menos un país.')
+            else:
+                funcion = get_plot_emisiones_eu if vista == 'Media diaria' else get_plot_emisiones_dia_hora
+                grafico(funcion, country, emisiones, country, emisiones, use_container_width=True)
+                # Los vecinos de la lista, en la misma vista
+                i = paises.index(country)
+                tareas_precalentar.extend([tarea(funcion, p, emisiones, p, emisiones)
+                                           for p in paises[max(i - 2, 0):i + 3] if p != country])
+
+
+        # Intensidad frente a potencia: resumen de todos los países y detalle del elegido
+        st.subheader("Intensidad de carbono y potencia por país")
+        analisis = datos_potencia_emisiones(anio)
+
+        colC3, colC4 = st.columns([0.45, 0.55], gap = "small")
+        with colC3:
+            grafico(get_plot_resumen_potencia_emis, anio, analisis, analisis, use_container_width=True)
+        with colC4:
+            st.dataframe(analisis.resumen(), hide_index=True,
+                         column_config={c: st.column_config.NumberColumn(format='%.2f') for c in ('r', 'pendiente (por GW)')})
+
+        if analisis.nombres:
+            pais_C = st.selectbox('Detalle del país:', analisis.nombres,
+                                  index=analisis.nombres.index('España') if 'España' in analisis.nombres else 0)
+            colC5, colC6 = st.columns(2, gap = "small")
+            with colC5:
+                grafico(get_plot_potencia_emis_pais, pais_C, analisis, pais_C, analisis, use_container_width=True)
+            with colC6:
+                grafico(get_plot_correlacion_movil, pais_C, analisis, pais_C, analisis, use_container_width=True)
+            grafico(get_plot_descomposicion, pais_C, analisis, pais_C, analisis)
+
+        # Tablas anuales top-down (1990-2018): todas en un array (método, año, país)
+        st.subheader("Intensidad de carbono y emisiones anuales por país (top-down)")
+        tablas = datos_top_down()
+
+        colC7, colC8 = st.columns([0.25, 0.75], gap = "medium")
+        with colC7:
+            metodo = st.selectbox('Método:', tablas.metodos[:-1] if 'CI_bottom_up' in tablas.i_metodo else tablas.metodos)
+            paises_td = st.multiselect('Países:', tablas.paises, default=['DE', 'ES', 'FR', 'IT', 'PL'])
+        with colC8:
+            grafico(get_plot_top_down, (metodo, tuple(paises_td)), tablas, metodo, paises_td, tablas, use_container_width=True)
+
+        colC9, colC10 = st.columns([0.25, 0.75], gap = "medium")
+        with colC9:
+            metodo_a = st.selectbox('Comparar:', tablas.metodos, index=len(tablas.metodos) - 1)
+            metodo_b = st.selectbox('Con:', tablas.metodos, index=tablas.i_metodo.get('CI_1', 0))
+            # Años con datos de los dos métodos
+            comunes = ~np.isnan(tablas.diferencia(metodo_a, metodo_b)).all(axis=1)
+            anios_td = [int(a) for a in tablas.anios[comunes]]
+        with colC10:
+            if anios_td:
+                anio_td = st.select_slider('Año:', anios_td, value=anios_td[-1]) if len(anios_td) > 1 else anios_td[0]
+                grafico(get_plot_diferencia_top_down, (metodo_a, metodo_b, anio_td), tablas,
+                        metodo_a, metodo_b, anio_td, tablas, use_container_width=True)
+            else:
+                st.info('Los dos métodos no tienen ningún año en común.')
+
+    # altair se importa con la barra lateral y la cabecera ya pintadas
+    import altair as alt
+    alt.themes.enable("dark")
+
+    tab1, tab2, tab3 = st.tabs(["Generación por tecnologías", "Precio de la electricidad", "Impacto medioambiental"],
+                               key='pestana', on_change='rerun')
+
+    for pestana, contenido in ((tab1, pestana_generacion), (tab2, pestana_precios), (tab3, pestana_emisiones)):
+        with pestana:
+            # open es None si las pestañas no siguen su estado: entonces se ejecutan todas
+            if pestana.open is not False:
+                try:
+                    contenido()
+                except OSError as e:
+                    # Falta o no se puede leer un fichero: solo falla esta pestaña
+                    st.error('No se han podido cargar los datos de esta pestaña: %s' % e)
+                except Exception as e:
+                    # Cualquier otro error (un fichero con otro formato...): tampoco cae la página
+                    st.error('Error al mostrar esta pestaña: %s' % e)
+                    st.exception(e)
+
+    if 'primer_grafico' in tiempos:
+        st.session_state['tiempo_primer_grafico'] = tiempos['primer_grafico']
+        marcador_tiempo.caption('Primer gráfico: %.2f s' % tiempos['primer_grafico'])
+
+    if precalentar:
+        especificaciones.precalentar(tareas_precalentar)
+
+    # Carga en segundo plano de las fuentes de las demás pestañas, una vez pintada
+    # la abierta; las que ya estén en la caché terminan al momento
+    carga_fuentes = precargar(anio)
+    with marcador_fuentes.expander('Carga de fuentes (%.2f s)' % carga_fuentes.segundos()):
+        resultados = carga_fuentes.resultados.copy()
+        st.dataframe(pd.DataFrame({
+            'Etapa': list(carga_fuentes.etapas),
+            'Estado': ['en curso' if n not in resultados else 'ok' if resultados[n].ok else str(resultados[n].error)
+                       for n in carga_fuentes.etapas],
+            'Inicio (s)': [resultados[n].inicio if n in resultados else None for n in carga_fuentes.etapas],
+            'Duración (s)': [resultados[n].segundos if n in resultados else None for n in carga_fuentes.etapas],
+        }), hide_index=True)
+finally:
+    tramos = trazas.terminar() if depurar else []
+
+# Depuración: tramos del rerun actual y tiempos acumulados del proceso
+if depurar:
+    from graficos import get_plot_cascada
+    with st.sidebar:
+        st.subheader('Depuración')
+        if tramos:
+            df_tramos = pd.DataFrame([t.como_dict() for t in tramos])
+            total = df_tramos.loc[df_tramos['nivel'] == 0, 'duracion'].sum()
+            st.caption('%d tramos, %.2f s medidos (en %s)' % (len(tramos), total, trazas.RUTA or 'memoria'))
+            st.vega_lite_chart(get_plot_cascada(df_tramos).to_dict(), use_container_width=True)
+        stats = trazas.estadisticas()
+        st.dataframe(pd.DataFrame({
+            'Categoría': [c for c, _ in stats],
+            'Tramo': [n for _, n in stats],
+            'Llamadas': [s['llamadas'] for s in stats.values()],
+            'Total (ms)': [1000 * s['total'] for s in stats.values()],
+            'Media (ms)': [1000 * s['total'] / s['llamadas'] for s in stats.values()],
+            'Máximo (ms)': [1000 * s['maximo'] for s in stats.values()],
+            'Filas': [s['filas'] for s in stats.values()],
+        }).sort_values('Total (ms)', ascending=False), hide_index=True)
@@ -0,0 +1,120 @@
+# IMPORTS
+import numpy as np
+import pandas as pd
+
+from precios_horarios import ordenar_paises, por_dia
+import trazas
+
+
+
+#####################################################
+## Intensidad de carbono por país (una partición por código)
+#####################################################
+
+# get_plot_emisiones_eu filtraba en cada clic el DataFrame fundido de todos los
+# países (df[df['name'] == código]) y solo conocía ocho países. Aquí la
+# intensidad horaria del año sale una vez del cubo de emisiones (cubo.py) y se
+# guarda en un array (país, día, hora): la partición de un país es la vista
+# contigua horas[i], que se encuentra con un diccionario (código -> posición),
+# y sus medias diarias están ya calculadas en medias[i]. Están todos los
+# países de CI_bottom_up_method.csv.
+#
+# Las tres vistas del gráfico C.1 salen de aquí sin recorrer el resto de
+# países: calendario de medias diarias, mapa día × hora (el bloque del país tal
+# cual, una fila por día) y comparación de varios países.
+
+# Nombre en el dashboard de cada código de país; los que no están se muestran con el código
+NOMBRES = {
+    'AL': 'Albania', 'AT': 'Austria', 'BA': 'Bosnia y Herzegovina', 'BE': 'Bélgica', 'BG': 'Bulgaria',
+    'CH': 'Suiza', 'CY': 'Chipre', 'CZ': 'Chequia', 'DE': 'Alemania', 'DK': 'Dinamarca', 'EE': 'Estonia',
+    'ES': 'España', 'FI': 'Finlandia', 'FR': 'Francia', 'GB': 'Reino unido', 'GR': 'Grecia', 'HR': 'Croacia',
+    'HU': 'Hungría', 'IE': 'Irlanda', 'IS': 'Islandia', 'IT': 'Italia', 'LT': 'Lituania', 'LU': 'Luxemburgo',
+    'LV': 'Letonia', 'ME': 'Montenegro', 'MK': 'Macedonia del Norte', 'MT': 'Malta', 'NL': 'Países bajos',
+    'NO': 'Noruega', 'PL': 'Polonia', 'PT': 'Portugal', 'RO': 'Rumanía', 'RS': 'Serbia', 'SE': 'Suecia',
+    'SI': 'Eslovenia', 'SK': 'Eslovaquia', 'TR': 'Turquía', 'XK': 'Kosovo',
+}
+
+# Columnas de las horas en las filas del mapa día × hora
+HORAS = ['%02d' % h for h in range(24)]
+
+
+class EmisionesPaises:
+    """Intensidad de carbono por (país, día, hora) en un array con índices por eje."""
+
+    def __init__(self, horas, dias, paises):
+        self.horas = np.ascontiguousarray(horas)
+        self.dias = np.asarray(dias)
+        self.paises = list(paises)
+        self.nombres = [NOMBRES.get(p, p) for p in self.paises]
+        # Posición por código y por nombre
+        self.i_pais = {p: i for i, p in enumerate(self.paises)}
+        self.i_pais.update((n, i) for i, n in enumerate(self.nombres))
+
+        # Media diaria de las horas con datos (NaN si el día no tiene ninguna)
+        hay = ~np.isnan(self.horas)
+        cuenta = hay.sum(axis=2)
+        suma = np.where(hay, self.horas, 0).sum(axis=2)
+        self.medias = np.where(cuenta > 0, suma / np.maximum(cuenta, 1), np.nan)
+
+    @classmethod
+    def desde_cubo(cls, cubo, anio):
+        """Intensidad de cada país, día y hora de `anio` en el cubo de emisiones."""
+        dias, horas, series = por_dia(cubo)
+        i, j = np.searchsorted(dias, [np.datetime64('%d-01-01' % anio, 'D').astype(np.int64),
+                                      np.datetime64('%d-01-01' % (anio + 1), 'D').astype(np.int64)])
+        # Países en el orden de los gráficos, por su nombre
+        nombres = {NOMBRES.get(s, s): s for s in series}
+        paises = [nombres[n] for n in ordenar_paises(nombres)]
+        columnas = [series.index(p) for p in paises]
+        return cls(horas[i:j][:, :, columnas].transpose(2, 0, 1), dias[i:j], paises)
+
+    @property
+    def fechas(self):
+        return pd.to_datetime(self.dias, unit='D').as_unit('ns')
+
+    def particion(self, pais):
+        """(horas día × hora, medias diarias) de un país por código o nombre (vistas del array)."""
+        i = self.i_pais[pais]
+        return self.horas[i], self.medias[i]
+
+    @trazas.medir('filtro')
+    def diario(self, pais):
+        """Media diaria del país en los días con datos (date, value)."""
+        _, medias = self.particion(pais)
+        hay = ~np.isnan(medias)
+        return pd.DataFrame({'date': self.fechas[hay], 'value': medias[hay]})
+
+    @trazas.medir('filtro')
+    def dia_hora(self, pais):
+        """Una fila por día con datos y una columna por hora UTC (date, '00'...'23')."""
+        horas, medias = self.particion(pais)
+        hay = ~np.isnan(medias)
+        df = pd.DataFrame(horas[hay], columns=HORAS)
+        df.insert(0, 'date', self.fechas[hay])
+        return df
+
+    @trazas.medir('filtro')
+    def comparar(self, paises):
+        """Medias diarias de varios países (date, name, value), con name su nombre."""
+        indices = [self.i_pais[p] for p in paises]
+        bloque = self.medias[indices].T
+        dia, pais = np.nonzero(~np.isnan(bloque))
+        return pd.DataFrame({
+            'date': self.fechas[dia],
+            'name': pd.Categorical.from_codes(pais, categories=[self.nombres[i] for i in indices]),
+            'value': bloque[dia, pais],
+        })
+
+    @trazas.medir('filtro')
+    def rango(self, desde, hasta, paises=None):
+        """Medias diarias (date, name, value) de los días [desde, hasta) y `paises` (códigos)."""
+        paises = self.paises if paises is None else list(paises)
+        i, j = np.searchsorted(self.dias, [np.datetime64(desde, 'D').astype(np.int64),
+                                           np.datetime64(hasta, 'D').astype(np.int64)])
+        bloque = self.medias[[self.i_pais[p] for p in paises], i:j].T
+        dia, pais = np.nonzero(~np.isnan(bloque))
+        return pd.DataFrame({
+            'date': self.fechas[i:j][dia],
+            'name': pd.Categorical.from_codes(pais, categories=paises),
+            'value': bloque[dia, pais],
+        })
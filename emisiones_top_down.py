@@ -0,0 +1,116 @@
+# IMPORTS
+import os
+
+import numpy as np
+import pandas as pd
+
+import trazas
+
+
+
+#####################################################
+## Tablas anuales de emisiones (método top-down)
+#####################################################
+
+# Los ficheros *_top_down.csv son tablas anchas año × país (una columna por
+# código de país). Se cargan todas en un único array (método, año, país) con
+# diccionarios de posición para cada eje, de forma que un valor es una
+# indexación directa y las comparaciones entre métodos son restas de arrays.
+#
+# CI_table.csv compara para un año la intensidad top-down (CI_1) con la
+# bottom-up; la columna CI_bottom_up se guarda como el método 'CI_bottom_up'
+# en ese año (el resto de años quedan a NaN).
+
+CARPETA = 'Datos/Emisiones/output'
+
+# Método -> fichero (intensidades en gCO2eq/kWh; ei_* son emisiones en kt CO2)
+METODOS = {
+    'CI_0': 'CI_0_top_down.csv',
+    'CI_1': 'CI_1_top_down.csv',
+    'CI_MAP_1': 'CI_MAP_1_top_down.csv',
+    'ei_AP': 'ei_AP_top_down.csv',
+    'ei_MAP': 'ei_MAP_top_down.csv',
+}
+
+TABLA_COMPARACION = 'CI_table.csv'
+
+# Año de CI_table.csv (su columna CI_top_down es CI_1 de ese año)
+ANIO_COMPARACION = 2018
+
+
+class TablasTopDown:
+    """Valores por (método, año, país) en un array con índices por eje."""
+
+    def __init__(self, valores, metodos, anios, paises):
+        self.valores = valores
+        self.metodos = list(metodos)
+        self.anios = np.asarray(anios)
+        self.paises = list(paises)
+        self.i_metodo = {m: i for i, m in enumerate(self.metodos)}
+        self.i_anio = {int(a): i for i, a in enumerate(self.anios)}
+        self.i_pais = {p: i for i, p in enumerate(self.paises)}
+
+    @classmethod
+    def desde_csv(cls, carpeta=CARPETA):
+        """Lee los *_top_down.csv (y CI_table.csv si existe) de `carpeta`."""
+        tablas = {m: pd.read_csv(os.path.join(carpeta, f), index_col='Year') for m, f in METODOS.items()}
+
+        # Ejes comunes: unión de años y países de todas las tablas
+        anios = sorted(set().union(*(t.index for t in tablas.values())))
+        paises = list(dict.fromkeys(p for t in tablas.values() for p in t.columns))
+
+        comparacion = os.path.join(carpeta, TABLA_COMPARACION)
+        if os.path.exists(comparacion):
+            ci_table = pd.read_csv(comparacion, index_col='country')
+            tablas['CI_bottom_up'] = ci_table[['CI_bottom_up']].T.set_axis([ANIO_COMPARACION])
+            anios = sorted(set(anios) | {ANIO_COMPARACION})
+            paises += [p for p in ci_table.index if p not in paises]
+
+        valores = np.stack([t.reindex(index=anios, columns=paises).to_numpy(dtype=np.float64)
+                            for t in tablas.values()])
+        return cls(valores, tablas, anios, paises)
+
+    def valor(self, metodo, anio, pais):
+        """Un valor (NaN si no hay dato)."""
+        return self.valores[self.i_metodo[metodo], self.i_anio[anio], self.i_pais[pais]]
+
+    def serie(self, metodo, pais):
+        """Valores de un país en todos los años (vista del array)."""
+        return self.valores[self.i_metodo[metodo], :, self.i_pais[pais]]
+
+    def anio(self, metodo, anio):
+        """Valores de todos los países en un año (vista del array)."""
+        return self.valores[self.i_metodo[metodo], self.i_anio[anio], :]
+
+    def tabla(self, metodo, paises=None):
+        """Bloque años × países de un método, como array (vista si no se filtra)."""
+        bloque = self.valores[self.i_metodo[metodo]]
+        if paises is None:
+            return bloque
+        return bloque[:, [self.i_pais[p] for p in paises]]
+
+    def diferencia(self, metodo_a, metodo_b, relativa=False):
+        """a - b para todos los años y países (en % de a si relativa=True).
+
+        Con a = 'CI_bottom_up' y b = 'CI_1' en ANIO_COMPARACION son las
+        columnas diff_bottom_up_vs_CI_top_down y diff_pro de CI_table.csv.
+        """
+        a = self.valores[self.i_metodo[metodo_a]]
+        b = self.valores[self.i_metodo[metodo_b]]
+        diferencia = a - b
+        if relativa:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                return diferencia / a * 100
+        return diferencia
+
+    @trazas.medir('filtro')
+    def largo(self, metodo, paises=None):
+        """(Year, name, value) de un método, sin filas a NaN, para los gráficos."""
+        paises = self.paises if paises is None else list(paises)
+        bloque = self.tabla(metodo, paises)
+        anio, pais = np.nonzero(~np.isnan(bloque))
+        return pd.DataFrame({
+            'Year': self.anios[anio],
+            'name': pd.Categorical.from_codes(pais, categories=paises),
+            'value': bloque[anio, pais],
+        })
@@ -0,0 +1,131 @@
+# IMPORTS
+import json
+import threading
+from collections import OrderedDict
+
+import trazas
+
+
+
+#####################################################
+## Caché de especificaciones Vega-Lite
+#####################################################
+
+# Mover el slider adelante y atrás vuelve a construir los mismos gráficos y a
+# serializarlos. Aquí se guarda el JSON de la especificación ya generada, con
+# una clave (gráfico, selección, versión de los datos); la versión es la de
+# carga.version, que cambia cuando cambia el contenido de los ficheros.
+#
+# La caché es LRU y está acotada por el tamaño total del JSON guardado. Se
+# guarda el texto y no el dict para que cada rerun reciba su propia copia.
+#
+# precalentar() construye en un hilo en segundo plano las especificaciones que
+# probablemente se pidan a continuación (los días vecinos al seleccionado).
+
+LIMITE_BYTES = 64 * 2**20
+
+_specs = OrderedDict()
+_bytes = 0
+_limite = LIMITE_BYTES
+_cerrojo = threading.Lock()
+_stats = {'aciertos': 0, 'fallos': 0, 'expulsiones': 0, 'precalentadas': 0}
+
+# Cada llamada a precalentar() cancela la tanda anterior que siga en marcha
+_tanda = 0
+
+
+def _guardar(clave, texto):
+    global _bytes
+    with _cerrojo:
+        if clave in _specs:
+            return
+        _specs[clave] = texto
+        _bytes += len(texto)
+        # Se expulsan las menos usadas recientemente hasta volver bajo el límite
+        while _bytes > _limite and len(_specs) > 1:
+            _, expulsada = _specs.popitem(last=False)
+            _bytes -= len(expulsada)
+            _stats['expulsiones'] += 1
+
+
+def _serializar(construir):
+    grafico = construir()
+    with trazas.tramo('to_dict', 'serializacion'):
+        spec = grafico.to_dict()
+    with trazas.tramo('json', 'serializacion'):
+        return json.dumps(spec)
+
+
+def obtener(clave, construir):
+    """Especificación (dict) del gráfico `construir()` para `clave`, cacheada."""
+    with _cerrojo:
+        texto = _specs.get(clave)
+        if texto is not None:
+            _specs.move_to_end(clave)
+            _stats['aciertos'] += 1
+        else:
+            _stats['fallos'] += 1
+
+    if texto is None:
+        texto = _serializar(construir)
+        _guardar(clave, texto)
+    return json.loads(texto)
+
+
+def precalentar(tareas):
+    """Construye en segundo plano las especificaciones de `tareas` que falten.
+
+    `tareas` es una lista de (clave, construir) en orden de prioridad.
+    """
+    global _tanda
+    with _cerrojo:
+        _tanda += 1
+        tanda = _tanda
+        pendientes = [(c, f) for c, f in tareas if c not in _specs]
+    if not pendientes:
+        return None
+
+    def trabajar():
+        for clave, construir in pendientes:
+            if tanda != _tanda:
+                return
+            if clave in _specs:
+                continue
+            try:
+                _guardar(clave, _serializar(construir))
+            except Exception:
+                # Un gráfico que no se puede construir se pedirá (y fallará) en primer plano
+                continue
+            with _cerrojo:
+                _stats['precalentadas'] += 1
+
+    hilo = threading.Thread(target=trabajar, name='precalentar-graficos', daemon=True)
+    hilo.start()
+    return hilo
+
+
+def limitar(limite):
+    """Cambia el tamaño máximo de la caché (expulsa lo que sobre)."""
+    global _limite, _bytes
+    with _cerrojo:
+        _limite = limite
+        while _bytes > _limite and _specs:
+            _, expulsada = _specs.popitem(last=False)
+            _bytes -= len(expulsada)
+            _stats['expulsiones'] += 1
+
+
+def vaciar():
+    global _bytes
+    with _cerrojo:
+        _specs.clear()
+        _bytes = 0
+
+
+def estadisticas():
+    """Aciertos, fallos, expulsiones, especificaciones precalentadas y tamaño."""
+    with _cerrojo:
+        stats = dict(_stats, entradas=len(_specs), bytes=_bytes)
+    total = stats['aciertos'] + stats['fallos']
+    stats['tasa_aciertos'] = stats['aciertos'] / total if total else 0.0
+    return stats
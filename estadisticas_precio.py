@@ -0,0 +1,165 @@
+# IMPORTS
+import numpy as np
+import pandas as pd
+
+import trazas
+from precios_horarios import por_dia
+
+
+
+#####################################################
+## Estadísticas diarias de precio por país
+#####################################################
+
+# prices() filtraba el día y agrupaba por hora en cada rerun solo para obtener
+# media, mínimo y máximo. Aquí se calculan una vez, al cargar, todas las
+# estadísticas de todos los días y países del año, en una pasada vectorizada
+# sobre la matriz horaria del cubo de precios (cubo.py):
+#
+#   horas × países -> array (día, hora del día, país) -> estadísticas por día y país
+#
+# El array (día, hora, país) es el de precios_horarios.py. El resultado es
+# otro array (estadística, día, país) con índices por eje, como TablasTopDown:
+# una tarjeta st.metric es una indexación directa y la serie anual de una
+# estadística es una vista del array.
+#
+# Los días son días UTC, como en el resto de consultas (indice.py, cubo.py).
+# Con el precio de España (componentes) la serie es la suma de los componentes
+# en cada hora, igual que prices() y prices_rango(); con el de Europa, el
+# precio de cada país (la media si hay varios valores en la hora).
+
+ESTADISTICAS = ('media', 'minimo', 'maximo', 'p10', 'p50', 'p90', 'diferencial', 'volatilidad', 'horas_negativas')
+
+ETIQUETAS = {
+    'media': 'Precio medio',
+    'minimo': 'Precio mínimo',
+    'maximo': 'Precio máximo',
+    'p10': 'Percentil 10',
+    'p50': 'Mediana',
+    'p90': 'Percentil 90',
+    'diferencial': 'Diferencial punta (8-20 h, hora de Madrid) - valle',
+    'volatilidad': 'Volatilidad intradía (desviación típica)',
+    'horas_negativas': 'Horas con precio negativo',
+}
+
+# Horas punta: de 8 a 20 h en hora local de ZONA_PUNTA. Las horas del array
+# son UTC, así que las que caen en la punta cambian con el horario de verano
+# (7 a 19 UTC en invierno, 6 a 18 UTC en verano) y se calculan para cada día
+HORAS_PUNTA = (8, 20)
+ZONA_PUNTA = 'Europe/Madrid'
+
+# Nombre de la serie del precio total de España (suma de los componentes)
+TOTAL = 'Total'
+
+
+def punta(dias):
+    """Máscara (día, hora UTC) de las horas punta de cada día epoch de `dias`."""
+    horas = np.asarray(dias, dtype=np.int64)[:, None] * 24 + np.arange(24)
+    locales = pd.DatetimeIndex(pd.to_datetime(horas.ravel(), unit='h', utc=True)).tz_convert(ZONA_PUNTA).hour
+    locales = np.asarray(locales).reshape(horas.shape)
+    return (locales >= HORAS_PUNTA[0]) & (locales < HORAS_PUNTA[1])
+
+
+def _media(horas, hay):
+    # Media sobre el eje de las horas de los valores de `hay` (NaN sin ninguno)
+    n = hay.sum(axis=1)
+    suma = np.where(hay, horas, 0).sum(axis=1)
+    return np.where(n > 0, suma / np.maximum(n, 1), np.nan)
+
+
+def calcular(horas, dias):
+    """Estadísticas (estadística, día, serie) de un array (día, hora UTC, serie) de los días epoch `dias`."""
+    hay = ~np.isnan(horas)
+    n = hay.sum(axis=1)
+    en_punta = punta(dias)[:, :, None]
+
+    # Sumas y cuentas con np.where, como en cubo.py: los días y series sin
+    # datos quedan a NaN sin pasar por los avisos de numpy (warnings no es
+    # seguro entre hilos)
+    media = _media(horas, hay)
+    desviacion = np.where(hay, horas - media[:, None, :], 0)
+    valores = {
+        'media': media,
+        'diferencial': _media(horas, hay & en_punta) - _media(horas, hay & ~en_punta),
+        'volatilidad': np.where(n > 0, np.sqrt((desviacion ** 2).sum(axis=1) / np.maximum(n, 1)), np.nan),
+        'horas_negativas': np.where(n > 0, (horas < 0).sum(axis=1), np.nan),
+    }
+
+    # Mínimo, máximo y percentiles solo de los (día, serie) con algún dato
+    filas = np.moveaxis(horas, 1, -1)[n > 0]
+    calculados = {'minimo': np.nanmin(filas, axis=1), 'maximo': np.nanmax(filas, axis=1)}
+    calculados.update(zip(('p10', 'p50', 'p90'), np.nanpercentile(filas, [10, 50, 90], axis=1)))
+    for estadistica, calculado in calculados.items():
+        valores[estadistica] = np.full(n.shape, np.nan)
+        valores[estadistica][n > 0] = calculado
+    return np.stack([valores[e] for e in ESTADISTICAS])
+
+
+class EstadisticasPrecio:
+    """Estadísticas de precio por (estadística, día, país) en un array con índices por eje."""
+
+    def __init__(self, valores, dias, paises):
+        self.valores = valores
+        self.dias = np.asarray(dias)
+        self.paises = list(paises)
+        self.i_estadistica = {e: i for i, e in enumerate(ESTADISTICAS)}
+        self.i_dia = {int(d): i for i, d in enumerate(self.dias)}
+        self.i_pais = {p: i for i, p in enumerate(self.paises)}
+
+    @classmethod
+    def desde_cubo(cls, cubo, total=False):
+        """Estadísticas de cada día y serie del cubo (o de su suma si total=True)."""
+        dias, horas, series = por_dia(cubo, total)
+        return cls(calcular(horas, dias), dias, [TOTAL] if total else series)
+
+    @classmethod
+    def desde_horarios(cls, precios):
+        """Estadísticas de un PreciosHorarios, con sus países en el mismo orden."""
+        return cls(calcular(precios.horas, precios.dias), precios.dias, precios.paises)
+
+    @property
+    def fechas(self):
+        return pd.to_datetime(self.dias, unit='D').as_unit('ns')
+
+    def valor(self, estadistica, date, pais):
+        """Un valor (NaN si no hay datos ese día)."""
+        i = self.i_dia.get(int(np.datetime64(date, 'D').astype(np.int64)))
+        if i is None:
+            return np.nan
+        return self.valores[self.i_estadistica[estadistica], i, self.i_pais[pais]]
+
+    def resumen(self, date, pais, estadisticas=('media', 'minimo', 'maximo')):
+        """Valores de `estadisticas` de un día (por defecto, los de prices())."""
+        return tuple(self.valor(e, date, pais) for e in estadisticas)
+
+    def serie(self, estadistica, pais):
+        """Valores de un país en todos los días (vista del array)."""
+        return self.valores[self.i_estadistica[estadistica], :, self.i_pais[pais]]
+
+    @trazas.medir('filtro')
+    def largo(self, estadistica, paises=None):
+        """(date, name, value) de una estadística, sin filas a NaN, para los gráficos."""
+        paises = self.paises if paises is None else list(paises)
+        bloque = self.valores[self.i_estadistica[estadistica]][:, [self.i_pais[p] for p in paises]]
+        dia, pais = np.nonzero(~np.isnan(bloque))
+        return pd.DataFrame({
+            'date': self.fechas[dia],
+            'name': pd.Categorical.from_codes(pais, categories=paises),
+            'value': bloque[dia, pais],
+        })
+
+    @trazas.medir('filtro')
+    def rango(self, desde, hasta, paises=None, estadisticas=ESTADISTICAS):
+        """(date, name, <estadística>...) de los días [desde, hasta), una fila por día y país con datos."""
+        paises = self.paises if paises is None else list(paises)
+        i, j = np.searchsorted(self.dias, [np.datetime64(desde, 'D').astype(np.int64),
+                                           np.datetime64(hasta, 'D').astype(np.int64)])
+        bloque = self.valores[[self.i_estadistica[e] for e in estadisticas]][:, i:j][:, :, [self.i_pais[p] for p in paises]]
+        dia, pais = np.nonzero(~np.isnan(bloque).all(axis=0))
+        df = pd.DataFrame({
+            'date': self.fechas[i:j][dia],
+            'name': pd.Categorical.from_codes(pais, categories=paises),
+        })
+        for k, estadistica in enumerate(estadisticas):
+            df[estadistica] = bloque[k, dia, pais]
+        return df
@@ -0,0 +1,206 @@
+# IMPORTS
+import argparse
+import os
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import carga
+import trazas
+
+
+
+#####################################################
+## Lectura rápida de libros Excel (con fichero auxiliar)
+#####################################################
+
+# pd.read_excel con openpyxl construye un objeto por celda de todas las
+# columnas y es, con diferencia, el paso más lento de la carga. Aquí:
+#
+#   - el libro se recorre en modo solo lectura, fila a fila, guardando solo
+#     las columnas que usa normalizar (id, name, value, datetime);
+#   - lo leído se guarda una vez en un Parquet junto al libro
+#     (PrecioMedioHorarioFinal_2023_h.xlsx -> PrecioMedioHorarioFinal_2023_h.xlsx.parquet)
+#     con el sha256 del libro en sus metadatos;
+#   - las siguientes lecturas usan el Parquet si el hash coincide con el del
+#     libro actual; si el libro cambia, se vuelve a convertir.
+#
+# Los .xls (formato antiguo, sin lectura por filas) se leen enteros con
+# pd.read_excel, o con pd.read_html si son las tablas HTML que ESIOS exporta
+# con extensión .xls, y también se guardan en su Parquet.
+#
+# Si no se puede escribir junto al libro (carpeta de solo lectura) se lee el
+# libro directamente.
+#
+# Uso (desde la raíz del repositorio), para convertir de antemano:
+#   python excel.py Datos/Economico/PrecioMedioHorarioFinal_*_h.xlsx
+
+# Columnas que conservan los prep_* (normalizar en preprocesado.py)
+COLUMNAS = ['id', 'name', 'value', 'datetime']
+
+EXTENSIONES = ('.xlsx', '.xlsm', '.xls')
+
+_CLAVE_HASH = b'sha256_origen'
+_CLAVE_COLUMNAS = b'columnas'
+
+
+def es_excel(path):
+    return path.lower().endswith(EXTENSIONES)
+
+
+def ruta_auxiliar(path):
+    return path + '.parquet'
+
+
+def es_auxiliar(path):
+    """True si `path` es el Parquet auxiliar de un libro (ruta_auxiliar de un Excel)."""
+    sufijo = ruta_auxiliar('')
+    return path.endswith(sufijo) and es_excel(path[:-len(sufijo)])
+
+
+def auxiliar_valido(path, columnas=COLUMNAS):
+    """True si el Parquet de `path` existe, tiene `columnas` y es del libro actual."""
+    auxiliar = ruta_auxiliar(path)
+    if not os.path.exists(auxiliar):
+        return False
+    try:
+        metadatos = pq.read_schema(auxiliar).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    guardadas = metadatos.get(_CLAVE_COLUMNAS, b'').decode().split(',')
+    return (metadatos.get(_CLAVE_HASH) == carga.huella(path).sha256.encode()
+            and all(c in guardadas for c in columnas))
+
+
+def _filas_xlsx(path, columnas, filas):
+    # Bloques de `filas` filas con solo `columnas`, sin cargar la hoja entera
+    import openpyxl
+
+    libro = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        iterador = libro.active.iter_rows(values_only=True)
+        cabecera = list(next(iterador))
+        faltan = [c for c in columnas if c not in cabecera]
+        if faltan:
+            raise ValueError('%s no tiene las columnas %s' % (path, ', '.join(faltan)))
+        posiciones = [cabecera.index(c) for c in columnas]
+
+        bloque = [[] for _ in columnas]
+        vacias = 0
+        for fila in iterador:
+            # Como read_excel, las filas vacías solo se conservan si hay datos detrás
+            if all(v is None for v in fila):
+                vacias += 1
+                continue
+            for valores, i in zip(bloque, posiciones):
+                valores.extend([None] * vacias)
+                valores.append(fila[i])
+            vacias = 0
+            if len(bloque[0]) == filas:
+                yield pd.DataFrame(dict(zip(columnas, bloque)))
+                bloque = [[] for _ in columnas]
+        if bloque[0]:
+            yield pd.DataFrame(dict(zip(columnas, bloque)))
+    finally:
+        libro.close()
+
+
+def _es_html(path):
+    with open(path, 'rb') as f:
+        return f.read(512).lstrip().startswith(b'<')
+
+
+def leer_libro(path, columnas=COLUMNAS, filas=250_000):
+    """Bloques del libro con `columnas`, leyendo el Excel (sin fichero auxiliar)."""
+    if path.lower().endswith('.xls'):
+        df = pd.read_html(path)[0] if _es_html(path) else pd.read_excel(path, usecols=columnas)
+        return iter([df[columnas]])
+    return _filas_xlsx(path, columnas, filas)
+
+
+def _tipos_simples(bloque):
+    # Una columna de objetos con valores de varios tipos (p. ej. números y
+    # números con formato como texto) no tiene tipo Arrow: se guarda como texto
+    for columna in bloque.columns[bloque.dtypes == object]:
+        if pd.api.types.infer_dtype(bloque[columna], skipna=True) in ('mixed', 'mixed-integer'):
+            bloque[columna] = bloque[columna].where(bloque[columna].isna(), bloque[columna].astype(str))
+    return bloque
+
+
+def convertir(path, columnas=COLUMNAS, filas=250_000):
+    """Escribe el Parquet auxiliar de `path` (un grupo de filas por bloque; filas=None, uno solo)."""
+    auxiliar = ruta_auxiliar(path)
+    temporal = '%s.%s.tmp' % (auxiliar, uuid.uuid4().hex[:8])
+    metadatos = {_CLAVE_HASH: carga.huella(path).sha256.encode(), _CLAVE_COLUMNAS: ','.join(columnas).encode()}
+
+    escritor = None
+    try:
+        for bloque in leer_libro(path, columnas, filas):
+            tabla = pa.Table.from_pandas(_tipos_simples(bloque), preserve_index=False)
+            if escritor is None:
+                esquema = tabla.schema.with_metadata(metadatos)
+                escritor = pq.ParquetWriter(temporal, esquema)
+            elif not tabla.schema.equals(esquema):
+                # Los tipos del primer bloque no valen para este (p. ej. un
+                # número guardado como texto, o una columna vacía en todo el
+                # primer bloque): se convierte de nuevo con la hoja en un solo
+                # bloque, y los tipos salen de la columna entera como en read_excel
+                escritor.close()
+                escritor = None
+                return convertir(path, columnas, filas=None)
+            escritor.write_table(tabla.replace_schema_metadata(metadatos))
+        if escritor is None:
+            escritor = pq.ParquetWriter(temporal, pa.schema([(c, pa.null()) for c in columnas], metadata=metadatos))
+        escritor.close()
+        escritor = None
+        os.replace(temporal, auxiliar)
+    finally:
+        if escritor is not None:
+            escritor.close()
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return auxiliar
+
+
+def bloques(path, columnas=COLUMNAS, filas=250_000):
+    """Bloques de `filas` filas del libro, del Parquet auxiliar si es posible."""
+    if not auxiliar_valido(path, columnas):
+        try:
+            convertir(path, columnas, filas)
+        except OSError:
+            # Sin permiso para escribir junto al libro: se lee el Excel
+            return leer_libro(path, columnas, filas)
+    fichero = pq.ParquetFile(ruta_auxiliar(path))
+    return (lote.to_pandas() for lote in fichero.iter_batches(batch_size=filas, columns=columnas))
+
+
+@trazas.medir('lectura')
+def leer(path, columnas=COLUMNAS):
+    """DataFrame con `columnas` del libro (como pd.read_excel(path)[columnas])."""
+    partes = list(bloques(path, columnas))
+    if not partes:
+        return pd.DataFrame(columns=columnas)
+    return pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convierte libros Excel a su Parquet auxiliar')
+    parser.add_argument('paths', nargs='+', help='Libros .xlsx/.xlsm/.xls')
+    parser.add_argument('--columnas', nargs='+', default=COLUMNAS)
+    parser.add_argument('--forzar', action='store_true', help='Convertir aunque el auxiliar esté al día')
+    args = parser.parse_args()
+
+    for path in args.paths:
+        inicio = time.perf_counter()
+        if not args.forzar and auxiliar_valido(path, args.columnas):
+            print('%s: al día' % path)
+            continue
+        auxiliar = convertir(path, args.columnas)
+        print('%s -> %s en %.1f s' % (path, auxiliar, time.perf_counter() - inicio))
+
+
+if __name__ == '__main__':
+    main()
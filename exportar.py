@@ -0,0 +1,209 @@
+# IMPORTS
+import argparse
+import datetime as dt
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import altair as alt
+import numpy as np
+from altair.utils.html import spec_to_html
+
+import carga
+import fuentes
+from graficos import get_plot_generacion_dia, get_plot_precio_hora, get_plot_precio_hora_eu, get_plot_emisiones_eu
+
+
+
+#####################################################
+## Exportación de los gráficos diarios a Vega-Lite
+#####################################################
+
+# Genera sin Streamlit los gráficos diarios de generación, precio España y
+# precio EU, y los mapas de calor de emisiones por país, con los mismos
+# get_plot_* y los mismos datos (almacén o ficheros exportados) que el dashboard.
+#
+#   salida/generacion/2023/2023-07-15.json
+#   salida/precio_es/2023/2023-07-15.json
+#   salida/precio_eu/2023/2023-07-15.json
+#   salida/emisiones/2023/España.json
+#
+# El trabajo se reparte por unidades (un mes de una fuente, o un país) entre
+# varios procesos; cada proceso carga los datos una vez (caché de carga.py) y
+# escribe los ficheros según los termina. salida/manifiesto.json guarda por
+# unidad la versión de sus datos de entrada (y del código de los gráficos): si
+# no ha cambiado y los ficheros siguen ahí, la unidad se salta.
+#
+# Uso (desde la raíz del repositorio):
+#   python exportar.py salida
+#   python exportar.py salida --anio 2023 --graficos precio_es precio_eu --html --procesos 4
+
+GRAFICOS = ('generacion', 'precio_es', 'precio_eu', 'emisiones')
+
+MANIFIESTO = 'manifiesto.json'
+
+# Un cambio en el código de los gráficos o de sus datos también invalida lo
+# exportado: cuentan todos los módulos del proyecto que cargan los imports de
+# arriba (graficos, fuentes y lo que importan: reduccion, cubo,
+# precios_horarios, emisiones_paises, estadisticas_precio, preprocesado...)
+_RAIZ = os.path.dirname(os.path.abspath(__file__))
+CODIGO = sorted({os.path.abspath(m.__file__) for m in list(sys.modules.values())
+                 if getattr(m, '__file__', None) and os.path.dirname(os.path.abspath(m.__file__)) == _RAIZ})
+
+
+def _dias_mes(dias_epoch, anio, mes):
+    # Días (datetime) del mes con datos, a partir de días desde 1970-01-01
+    inicio = np.datetime64('%04d-%02d' % (anio, mes), 'D').astype(np.int64)
+    fin = (np.datetime64('%04d-%02d' % (anio, mes), 'M') + 1).astype('datetime64[D]').astype(np.int64)
+    dias = dias_epoch[(dias_epoch >= inicio) & (dias_epoch < fin)]
+    return [dt.datetime(1970, 1, 1) + dt.timedelta(days=int(d)) for d in dias]
+
+
+def graficos_unidad(grafico, anio, elemento):
+    """(nombre, gráfico) de una unidad: los días de un mes o el mapa de un país."""
+    if grafico == 'emisiones':
+        return [(elemento, get_plot_emisiones_eu(elemento, fuentes.datos_emisiones_paises(anio)))]
+
+    if grafico == 'generacion':
+        cubo = fuentes.datos_generacion(anio)
+        dias = _dias_mes(cubo.nivel('dia')[0], anio, elemento)
+        return ((d.strftime('%Y-%m-%d'), get_plot_generacion_dia(d, cubo)) for d in dias)
+
+    if grafico == 'precio_eu':
+        precios = fuentes.datos_precios_horarios(anio)
+        return ((d.strftime('%Y-%m-%d'), get_plot_precio_hora_eu(d, precios)) for d in _dias_mes(precios.dias, anio, elemento))
+
+    df, indice = fuentes.datos_precio_es(dt.datetime(anio, elemento, 1))
+    cubo = fuentes.datos_precio_cubo('precio_es', anio)
+    return ((d.strftime('%Y-%m-%d'), get_plot_precio_hora(d, df, indice, cubo)) for d in _dias_mes(indice.dias, anio, elemento))
+
+
+def _escribir(ruta, texto):
+    # Escritura atómica: un fichero a medias nunca sustituye a uno completo
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(texto)
+    os.replace(temporal, ruta)
+
+
+def exportar_unidad(grafico, anio, elemento, salida, html=False):
+    """Construye y escribe los gráficos de una unidad; devuelve las rutas escritas."""
+    carpeta = os.path.join(salida, grafico, str(anio))
+    os.makedirs(carpeta, exist_ok=True)
+
+    escritos = []
+    for nombre, chart in graficos_unidad(grafico, anio, elemento):
+        spec = chart.to_dict()
+        ruta = os.path.join(carpeta, nombre + '.json')
+        _escribir(ruta, json.dumps(spec))
+        escritos.append(ruta)
+        if html:
+            _escribir(ruta[:-5] + '.html', spec_to_html(
+                spec, mode='vega-lite', vega_version=alt.VEGA_VERSION,
+                vegaembed_version=alt.VEGAEMBED_VERSION, vegalite_version=alt.VEGALITE_VERSION))
+    return escritos
+
+
+def unidades(anio, seleccion):
+    """(gráfico, año, mes o país, ficheros de entrada) de cada unidad de trabajo."""
+    resultado = []
+    for grafico in seleccion:
+        if grafico == 'emisiones':
+            entradas = fuentes.rutas('emisiones', anio)
+            resultado += [(grafico, anio, pais, entradas) for pais in fuentes.datos_emisiones_paises(anio).nombres]
+            continue
+        meses = fuentes.meses_almacen(grafico, anio) if fuentes.usar_almacen() else range(1, 13)
+        resultado += [(grafico, anio, mes, fuentes.rutas(grafico, anio, mes)) for mes in meses]
+    return resultado
+
+
+def _clave(grafico, anio, elemento):
+    return '%s/%d/%s' % (grafico, anio, elemento)
+
+
+def _leer_manifiesto(salida):
+    ruta = os.path.join(salida, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _vigente(entrada, version):
+    return (entrada is not None and entrada['version'] == version
+            and all(os.path.exists(r) for r in entrada['ficheros']))
+
+
+def _iniciar_proceso():
+    # Mismo tema que el dashboard
+    alt.themes.enable('dark')
+
+
+def exportar(salida, anios, seleccion=GRAFICOS, html=False, procesos=None, forzar=False):
+    """Exporta las unidades de `anios` cuya versión de entrada haya cambiado.
+
+    Una unidad que falla se informa y no entra en el manifiesto (se repite en
+    la próxima exportación); las demás siguen. Devuelve (unidades exportadas,
+    unidades saltadas, ficheros escritos, unidades con error).
+    """
+    os.makedirs(salida, exist_ok=True)
+    manifiesto = _leer_manifiesto(salida)
+
+    pendientes = []
+    saltadas = 0
+    # Las unidades comparten ficheros (los del año, CODIGO): cada uno se lee una sola vez
+    huellas = {}
+    for anio in anios:
+        for grafico, _, elemento, entradas in unidades(anio, seleccion):
+            version = carga.version_rutas(entradas + CODIGO, huellas) + ('-html' if html else '')
+            clave = _clave(grafico, anio, elemento)
+            if not forzar and _vigente(manifiesto.get(clave), version):
+                saltadas += 1
+                continue
+            pendientes.append((clave, version, (grafico, anio, elemento, salida, html)))
+
+    ficheros = 0
+    errores = 0
+    with ProcessPoolExecutor(procesos, initializer=_iniciar_proceso) as pool:
+        futuros = {pool.submit(exportar_unidad, *args): (clave, version) for clave, version, args in pendientes}
+        for futuro in as_completed(futuros):
+            clave, version = futuros[futuro]
+            try:
+                escritos = futuro.result()
+            except Exception as e:
+                errores += 1
+                print('Error en %s: %s: %s' % (clave, type(e).__name__, e), file=sys.stderr)
+                continue
+            ficheros += len(escritos)
+
+            # El manifiesto se actualiza con cada unidad terminada: si se
+            # interrumpe la exportación, lo ya escrito no se repite
+            manifiesto[clave] = {'version': version, 'ficheros': escritos}
+            _escribir(os.path.join(salida, MANIFIESTO), json.dumps(manifiesto, indent=1, ensure_ascii=False))
+
+    return len(pendientes) - errores, saltadas, ficheros, errores
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exporta los gráficos diarios a Vega-Lite sin Streamlit')
+    parser.add_argument('salida', help='Directorio de salida')
+    parser.add_argument('--anio', type=int, nargs='+', help='Años a exportar (por defecto, todos)')
+    parser.add_argument('--graficos', nargs='+', choices=GRAFICOS, default=list(GRAFICOS))
+    parser.add_argument('--html', action='store_true', help='Escribir también una página HTML por gráfico')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos en paralelo (por defecto, uno por CPU)')
+    parser.add_argument('--forzar', action='store_true', help='Exportar aunque los datos no hayan cambiado')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    exportadas, saltadas, ficheros, errores = exportar(args.salida, args.anio or fuentes.anios_disponibles(),
+                                              args.graficos, args.html, args.procesos, args.forzar)
+    print('%d unidades exportadas (%d ficheros), %d sin cambios, %d con error, en %.1f s' % (
+        exportadas, ficheros, saltadas, errores, time.perf_counter() - inicio))
+    if errores:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
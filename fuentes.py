@@ -0,0 +1,313 @@
+# IMPORTS
+import datetime as dt
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import almacen
+import carga
+import compartido
+import excel
+import trazas
+from cargador import Carga, Etapa
+from cubo import Cubo
+from emisiones_paises import EmisionesPaises
+from emisiones_top_down import CARPETA, METODOS, TABLA_COMPARACION, TablasTopDown
+from estadisticas_precio import EstadisticasPrecio
+from indice import indexar
+from ingesta import FUENTES
+from precios_horarios import PreciosHorarios
+from potencia_emisiones import PotenciaEmisiones
+from preprocesado import prep_g1, prep_b1, prep_b2, normalizar_c1
+
+
+
+#####################################################
+## Carga de datos
+#####################################################
+
+# Los ficheros se leen y preprocesan una única vez por proceso: en los reruns
+# de Streamlit se recuperan de la caché de carga.py mientras no cambien.
+#
+# Si existe el almacén particionado (python ingesta.py ...) se leen solo las
+# particiones de la selección actual: el mes del día elegido para los precios y,
+# para generación y emisiones, el cubo de agregados del año construido mes a mes.
+# Si no, se usan directamente los ficheros exportados de 2023.
+#
+# No hay llamadas a Streamlit: dashboard.py y exportar.py usan las mismas funciones.
+
+def usar_almacen():
+    return almacen.existe()
+
+graf1_path = 'Datos/Generacion/GeneracionTotal_2023_h.csv'
+graf2_path = 'Datos/Economico/PrecioMedioHorarioFinal_2023_h.xlsx'
+graf3_path = 'Datos/Economico/PrecioEuropa_2023_h.csv'
+graf4_path = 'Datos/Emisiones/output/CI_bottom_up_method.csv'
+graf5_path = 'Datos/Emisiones/archive/combined.csv'
+
+# Fichero exportado de cada fuente
+FICHEROS = {'generacion': graf1_path, 'precio_es': graf2_path, 'precio_eu': graf3_path, 'emisiones': graf4_path}
+
+
+# Ficheros exportados (un año completo en memoria)
+
+@trazas.medir('lectura')
+def leer_csv(path, delimiter):
+    return pd.read_csv(path, delimiter=delimiter)
+
+# Las filas ya preparadas se leen de compartido.py: se preparan una vez por
+# máquina y cada proceso las abre mapeadas en memoria, sin copiarlas
+
+def generacion_fichero():
+    filas = lambda: compartido.tabla('generacion', [graf1_path],
+                                     lambda: prep_g1(leer_csv(graf1_path, ';')))
+    return carga.obtener('generacion', [graf1_path], lambda: Cubo.desde(filas()))
+
+def _emisiones_filas_de(df):
+    # Sin la columna date (objetos datetime.date) y con name categórica: todas
+    # las columnas se pueden mapear sin copia
+    return normalizar_c1(df).drop(columns=['date']).astype({'name': 'category'})
+
+def _emisiones_filas():
+    return _emisiones_filas_de(leer_csv(graf4_path, ','))
+
+def emisiones_fichero():
+    filas = lambda: compartido.tabla('emisiones', [graf4_path], _emisiones_filas)
+    return carga.obtener('emisiones', [graf4_path], lambda: Cubo.desde(filas()))
+
+
+# Almacén particionado
+
+def meses_almacen(fuente, anio):
+    return [mes for a, mes in almacen.meses(fuente) if a == anio]
+
+def vacio():
+    # Mes sin datos: mismas columnas que los datos normalizados pero sin filas
+    return pd.DataFrame({'datetime': pd.to_datetime([], utc=True), 'name': pd.Categorical([]),
+                         'value': np.array([], dtype=np.float32)})
+
+def cargar_mes(fuente, date):
+    # Partición del mes de date, ordenada e indexada por días
+    rutas = almacen.ficheros(fuente, date.year, date.month)
+    if not rutas:
+        return indexar(vacio())
+    nombre = 'almacen-%s-%04d-%02d' % (fuente, date.year, date.month)
+    return carga.obtener(('almacen', fuente, date.year, date.month), rutas,
+                         lambda: indexar(compartido.tabla(nombre, rutas, lambda: indexar(
+                             almacen.leer(fuente, date.year, date.month))[0])))
+
+def cargar_cubo(fuente, anio):
+    # Cubo del año añadiendo mes a mes: nunca hay más de una partición cruda en memoria
+    meses = meses_almacen(fuente, anio)
+    rutas = [r for mes in meses for r in almacen.ficheros(fuente, anio, mes)]
+
+    def construir():
+        cubo = Cubo()
+        for mes in meses:
+            cubo.anadir(almacen.leer(fuente, anio, mes))
+        return cubo
+
+    return carga.obtener(('almacen', fuente, anio), rutas, construir)
+
+
+def rutas(fuente, anio, mes=None):
+    # Ficheros de los que salen los datos de la fuente en el año (o en el mes)
+    if not usar_almacen():
+        return [FICHEROS[fuente]]
+    meses = [mes] if mes else meses_almacen(fuente, anio)
+    return [r for m in meses for r in almacen.ficheros(fuente, anio, m)]
+
+
+# Datos de cada vista
+
+def anios_disponibles():
+    if usar_almacen():
+        return almacen.anios('generacion') or [2023]
+    return [2023]
+
+def rango_fechas(fuente, anio):
+    # Límites del slider: del primer al último día con datos del año
+    meses = meses_almacen(fuente, anio) if usar_almacen() else []
+    if not meses:
+        return dt.datetime(anio, 1, 1), dt.datetime(anio, 12, 31)
+    fin = dt.datetime(anio + meses[-1] // 12, meses[-1] % 12 + 1, 1) - dt.timedelta(days=1)
+    return dt.datetime(anio, meses[0], 1), fin
+
+def datos_generacion(anio):
+    # Cubo de agregados de generación: alimenta los cuatro gráficos de la pestaña
+    if usar_almacen():
+        return cargar_cubo('generacion', anio)
+    return generacion_fichero()
+
+def datos_precio_es(date):
+    if usar_almacen():
+        return cargar_mes('precio_es', date)
+    return carga.obtener('precio_es', [graf2_path], lambda: indexar(compartido.tabla(
+        'precio_es', [graf2_path], lambda: indexar(prep_b1(excel.leer(graf2_path)))[0])))
+
+def datos_precio_eu(date):
+    if usar_almacen():
+        return cargar_mes('precio_eu', date)
+    return carga.obtener('precio_eu', [graf3_path], lambda: indexar(compartido.tabla(
+        'precio_eu', [graf3_path], lambda: indexar(prep_b2(leer_csv(graf3_path, ';')))[0])))
+
+def datos_precio_cubo(fuente, anio):
+    # Cubo de precios del año para las consultas por periodo (semana, mes...)
+    if usar_almacen():
+        return cargar_cubo(fuente, anio)
+    path, datos = (graf2_path, datos_precio_es) if fuente == 'precio_es' else (graf3_path, datos_precio_eu)
+    return carga.obtener(('cubo', fuente), [path], lambda: Cubo.desde(datos(None)[0]))
+
+def datos_precios_horarios(anio):
+    # Precio de cada país por día y hora del año (array denso, orden de países fijo)
+    cubo = datos_precio_cubo('precio_eu', anio)
+    return carga.obtener(('horarios', 'precio_eu', anio), rutas('precio_eu', anio),
+                         lambda: PreciosHorarios.desde_cubo(cubo))
+
+def datos_estadisticas_precio(fuente, anio):
+    # Estadísticas diarias del año por país (en España, del precio total)
+    if fuente == 'precio_eu':
+        precios = datos_precios_horarios(anio)
+        construir = lambda: EstadisticasPrecio.desde_horarios(precios)
+    else:
+        cubo = datos_precio_cubo(fuente, anio)
+        construir = lambda: EstadisticasPrecio.desde_cubo(cubo, total=True)
+    return carga.obtener(('estadisticas', fuente, anio), rutas(fuente, anio), construir)
+
+def datos_emisiones_cubo(anio):
+    return cargar_cubo('emisiones', anio) if usar_almacen() else emisiones_fichero()
+
+def datos_emisiones_paises(anio):
+    # Intensidad horaria y media diaria del año por país (una partición por código)
+    cubo = datos_emisiones_cubo(anio)
+    return carga.obtener(('emisiones_paises', anio), rutas('emisiones', anio),
+                         lambda: EmisionesPaises.desde_cubo(cubo, anio))
+
+def datos_combinado():
+    # Emisiones y energía diarias por país (Datos/Emisiones/archive/combined.csv)
+    return carga.obtener('combinado', [graf5_path], lambda: leer_csv(graf5_path, ','))
+
+def datos_potencia_emisiones(anio):
+    # Potencia (combined.csv) e intensidad por país y día alineadas, con sus análisis
+    emisiones = datos_emisiones_paises(anio)
+    return carga.obtener(('potencia_emisiones', anio), rutas('emisiones', anio) + [graf5_path],
+                         lambda: PotenciaEmisiones.desde(emisiones, datos_combinado()))
+
+# Tablas anuales top-down: un único array (método, año, país) para todos los años
+def datos_top_down():
+    ficheros = list(METODOS.values()) + [TABLA_COMPARACION]
+    return carga.obtener('top_down', ['%s/%s' % (CARPETA, f) for f in ficheros], TablasTopDown.desde_csv)
+
+
+# Precarga de todas las fuentes de un año en paralelo (ver cargador.py)
+
+def etapas(anio):
+    """Etapas de carga de las fuentes de `anio`, con sus dependencias."""
+    inicio = rango_fechas('precio_es', anio)[0]
+    return [
+        Etapa('generacion', lambda: datos_generacion(anio), []),
+        Etapa('precio_es', lambda: datos_precio_es(inicio), []),
+        Etapa('precio_eu', lambda: datos_precio_eu(inicio), []),
+        Etapa('emisiones', lambda: datos_emisiones_cubo(anio), []),
+        Etapa('combinado', datos_combinado, []),
+        Etapa('top_down', datos_top_down, []),
+        # Sin almacén, los cubos de precios salen de los DataFrames ya preparados
+        Etapa('precio_es_cubo', lambda: datos_precio_cubo('precio_es', anio), ['precio_es']),
+        Etapa('precio_eu_cubo', lambda: datos_precio_cubo('precio_eu', anio), ['precio_eu']),
+        Etapa('precio_es_estadisticas', lambda: datos_estadisticas_precio('precio_es', anio), ['precio_es_cubo']),
+        Etapa('precio_eu_horarios', lambda: datos_precios_horarios(anio), ['precio_eu_cubo']),
+        Etapa('precio_eu_estadisticas', lambda: datos_estadisticas_precio('precio_eu', anio), ['precio_eu_horarios']),
+        Etapa('emisiones_paises', lambda: datos_emisiones_paises(anio), ['emisiones']),
+        Etapa('potencia_emisiones', lambda: datos_potencia_emisiones(anio), ['emisiones_paises', 'combinado']),
+    ]
+
+# Una carga por año y proceso; la comparten todas las sesiones
+_precargas = {}
+_cerrojo_precargas = threading.Lock()
+
+def precargar(anio, forzar=False):
+    """Lanza (una vez por año) la carga en paralelo de las fuentes de `anio`."""
+    with _cerrojo_precargas:
+        if forzar or anio not in _precargas:
+            _precargas[anio] = Carga(etapas(anio))
+        return _precargas[anio]
+
+
+# Incorporación de filas nuevas sin releer los ficheros (ver vigilancia.py)
+
+def normalizar_filas(fuente, df):
+    """Filas leídas de un fichero de `fuente`, con la misma forma que las que se cargan."""
+    if fuente == 'combinado':
+        return df
+    if fuente == 'emisiones':
+        return _emisiones_filas_de(df)
+    return FUENTES[fuente][1](df)
+
+def _concatenar(df, nuevas):
+    # Filas nuevas al final, uniendo las categorías de name (concat las perdería)
+    nuevas = nuevas[list(df.columns)]
+    if isinstance(df['name'].dtype, pd.CategoricalDtype):
+        name = union_categoricals([df['name'].array, pd.Categorical(nuevas['name'])], ignore_order=True)
+        return pd.concat([df, nuevas], ignore_index=True).assign(name=name)
+    return pd.concat([df, nuevas], ignore_index=True)
+
+def _reemplazar(clave, rutas, actualizar):
+    # Solo lo que ya está cargado; el resto se leerá de los ficheros cuando se pida
+    valor = carga.actual(clave)
+    if valor is not None:
+        carga.reemplazar(clave, rutas, actualizar(valor))
+
+def incorporar(fuente, filas):
+    """Añade `filas` (normalizar_filas) a los datos de `fuente` ya cargados.
+
+    Los cubos se copian y se amplían (Cubo.anadir) y los DataFrames de precios
+    se concatenan: nunca se modifica un valor que pueda estar usando un rerun.
+    Con almacén, las filas se escriben además en sus particiones (devuelve los
+    ficheros escritos). Pensada para llamarse dentro de carga.transaccion(),
+    seguida de refrescar().
+    """
+    if len(filas) == 0:
+        return []
+    if fuente == 'combinado':
+        _reemplazar('combinado', [graf5_path], lambda df: pd.concat([df, filas], ignore_index=True))
+        return []
+    filas = filas.drop(columns=['date'], errors='ignore')
+
+    if not usar_almacen():
+        if fuente in ('generacion', 'emisiones'):
+            _reemplazar(fuente, [FICHEROS[fuente]], lambda cubo: cubo.copia().anadir(filas))
+        else:
+            _reemplazar(fuente, [FICHEROS[fuente]], lambda datos: indexar(_concatenar(datos[0], filas)))
+            _reemplazar(('cubo', fuente), [FICHEROS[fuente]], lambda cubo: cubo.copia().anadir(filas))
+        return []
+
+    escritas = almacen.escribir(fuente, filas)
+    fechas = filas['datetime'].dt.tz_convert('UTC')
+    for anio, del_anio in filas.groupby(fechas.dt.year):
+        _reemplazar(('almacen', fuente, int(anio)), rutas(fuente, int(anio)),
+                    lambda cubo: cubo.copia().anadir(del_anio))
+    for (anio, mes), del_mes in filas.groupby([fechas.dt.year, fechas.dt.month]):
+        _reemplazar(('almacen', fuente, int(anio), int(mes)), almacen.ficheros(fuente, anio, mes),
+                    lambda datos: indexar(_concatenar(datos[0], del_mes)))
+    return escritas
+
+def refrescar():
+    """Vuelve a pedir, en este hilo y en orden, las etapas de los años ya precargados.
+
+    Las que dependen de ficheros que han cambiado se reconstruyen (p. ej. las
+    estadísticas a partir del cubo ya ampliado); el resto son aciertos de la
+    caché. Devuelve los errores por etapa, sin detenerse en ellos.
+    """
+    with _cerrojo_precargas:
+        anios = sorted(_precargas)
+    errores = {}
+    for anio in anios:
+        for etapa in etapas(anio):
+            try:
+                etapa.funcion()
+            except Exception as e:
+                errores[(anio, etapa.nombre)] = e
+    return errores
+
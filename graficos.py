@@ -0,0 +1,646 @@
+# IMPORTS
+import datetime as dt
+
+import altair as alt
+import numpy as np
+import pandas as pd
+
+from emisiones_paises import HORAS
+from estadisticas_precio import ETIQUETAS
+from indice import filtrar_dia
+from potencia_emisiones import VENTANA
+from reduccion import datos, reducir_apiladas, reducir_lineas
+import trazas
+
+
+
+# Constructores de los gráficos Altair del dashboard. No llaman a Streamlit:
+# reciben los datos ya preparados y devuelven el gráfico, de modo que se pueden
+# usar también fuera de la aplicación (benchmarks, exportación...).
+#
+# Los datos pasan por reduccion.datos antes de alt.Chart: solo las columnas
+# que usa el gráfico y, si hay demasiados puntos, reducidos (ver reduccion.py).
+#
+# Los gráficos de un día reciben su ancho en píxeles (`ancho`) y usan la
+# resolución más fina (5 min, 15 min, hora o día) que da a lo sumo un punto
+# por píxel y serie: un día de datos cincominutales se dibuja entero y nunca
+# hay que reducirlo después.
+
+def _apiladas(x):
+    return lambda df, presupuesto: reducir_apiladas(df, x, 'value', 'name', presupuesto)
+
+###################################
+# Gráfico A.1: Generación eléctrica por tecnologías en España
+###################################
+
+# Filtrar los datos en función de la fecha seleccionada
+@trazas.medir('grafico')
+def get_plot_generacion_dia(date, cubo, ancho=700):
+
+    date = date.date()
+    
+    # Potencia media por periodo y tecnología del día seleccionado (del cubo de
+    # agregados), con el nivel que cabe en el ancho del gráfico
+    nivel = cubo.nivel_para(1, ancho)
+    df_filtered = datos(cubo.serie(date, date + dt.timedelta(days=1), nivel),
+                        ['datetime', 'name', 'value'], _apiladas('datetime'))
+    
+    # Crear el gráfico Altair
+    selection = alt.selection_point(fields=['name'], bind='legend')
+
+    chart = alt.Chart(df_filtered).mark_area(interpolate='step').encode(
+        x=alt.X('datetime:T', title='Hora del día'),  # Eje X: Hora del día
+        y=alt.Y('sum(value):Q', title='Potencia eléctrica (MW)', scale=alt.Scale(domain=[0, 42000])),  # Suma de potencia
+        color=alt.Color('name:N', title='Tecnología'),  # Diferenciar por tecnología
+        opacity=alt.condition(selection, alt.value(1), alt.value(0.2))
+    ).properties(
+        title='Generación eléctrica por tecnología (diario)',
+        width=ancho,
+        height=400
+    ).add_params(selection)
+
+    return chart
+
+###################################
+# Gráfico A.2: Generación eléctrica por tecnologías en España (media diaria)
+###################################
+
+# Filtrar los datos en función de la fecha seleccionada
+@trazas.medir('grafico')
+def get_plot_generacion_dia_media(date, cubo):
+
+    date = date.date()
+    
+    # Total diario por tecnología, de mayor a menor (del cubo de agregados)
+    df_filtered = cubo.diario(date)
+    
+    # Calcular la suma total de la columna 'value'
+    total_sum = df_filtered['value'].sum()
+
+    # Normalizar la columna 'value' a un 100%
+    df_filtered['value_normalized'] = (df_filtered['value'] / total_sum)
+    
+    return get_plot_mix(df_filtered, 'Proporción de generación eléctrica media diaria por tecnología')
+
+# Gráfico de tarta del mix (name, value_normalized), común al día y a los rangos
+@trazas.medir('grafico')
+def get_plot_mix(df_filtered, title):
+    df_filtered = datos(df_filtered, ['name', 'value_normalized'])
+
+    # Crear el gráfico Altair
+    selection = alt.selection_point(fields=['name'], bind='legend', empty='none')
+
+    chart = alt.Chart(df_filtered).mark_arc().encode(
+    theta="value_normalized",
+    color=alt.Color('name:N', title='Tecnología'),  # Diferenciar por tecnología
+    opacity=alt.condition(selection, alt.value(1), alt.value(0.2))
+    ).properties(
+        title=title,
+        width=800,
+        height=500
+    ).add_params(selection)
+    
+    
+    # Añadir un texto para mostrar el porcentaje del segmento seleccionado
+    text = alt.Chart(df_filtered).mark_text(
+        radiusOffset=20,  # Ajusta la distancia del texto desde el centro
+        size=30,          # Tamaño del texto
+        fontWeight='bold' # Hacer el texto en negrita para destacarlo
+    ).encode(
+        theta=alt.Theta("value_normalized:Q", stack=True),
+        text=alt.Text('value_normalized:Q', format=".0%"),
+        color=alt.condition(selection, alt.value('black'), alt.value('transparent')),
+        # Asegurarse de que solo el texto del segmento seleccionado se muestre
+        opacity=alt.condition(selection, alt.value(1), alt.value(0))
+    ).transform_filter(
+        selection
+    )
+
+    return chart + text
+
+
+###################################
+# Gráfico A.5: Generación eléctrica por tecnologías en un periodo (semana, mes...)
+###################################
+
+# Los totales del periodo salen de las sumas acumuladas del cubo (coste fijo por
+# tecnología, sea cual sea la longitud del periodo)
+@trazas.medir('grafico')
+def get_plot_generacion_rango_mix(desde, hasta, cubo):
+    return get_plot_mix(cubo.mix(desde, hasta), 'Proporción de generación eléctrica por tecnología en el periodo')
+
+# Energía diaria por tecnología a lo largo del periodo
+@trazas.medir('grafico')
+def get_plot_generacion_rango(desde, hasta, cubo):
+    df = datos(cubo.diario_rango(desde, hasta), ['date', 'name', 'value'], _apiladas('date'))
+
+    selection = alt.selection_point(fields=['name'], bind='legend')
+
+    chart = alt.Chart(df).mark_area(interpolate='step-after').encode(
+        x=alt.X('date:T', title='Día'),
+        y=alt.Y('value:Q', title='Energía producida (MWh)'),
+        color=alt.Color('name:N', title='Tecnología'),
+        opacity=alt.condition(selection, alt.value(1), alt.value(0.2))
+    ).properties(
+        title='Generación eléctrica diaria por tecnología en el periodo',
+        width=700,
+        height=400
+    ).add_params(selection)
+
+    return chart
+
+
+###################################
+# Gráfico A.3: Generación eléctrica por tecnologías en España (anual)
+###################################
+
+# Filtrar los datos en función de la fecha seleccionada
+@trazas.medir('grafico')
+def get_plot_generacion_anual(df):
+    df = datos(df, ['name', 'value', 'value_normalized'])
+    selection = alt.selection_point(fields=['name'], bind='legend')
+
+    # Base del gráfico
+    base = alt.Chart(df).transform_window(
+        rank='rank(value)',
+        sort=[alt.SortField('value', order='descending')]
+    ).encode(
+        alt.Theta("value:Q", sort=df['name'].to_list()).stack(True),
+        alt.Radius("value").scale(type="sqrt", zero=True),
+        color=alt.Color("name:N", title='Tecnología'),
+        opacity=alt.condition(selection, alt.value(1), alt.value(0.2))
+    ).add_params(selection).properties(
+        title='Generación eléctrica anual por tecnología',
+        width=680,
+        height=500
+    )
+
+    # Grafico de arco
+    c1 = base.mark_arc(innerRadius=12, stroke="#fff")
+
+    # Grafico de texto con formato
+    c2 = base.mark_text(radiusOffset=20, size=20).encode(
+        text=alt.Text("value_normalized:Q", format=".0%")
+        ).transform_filter(
+        alt.datum.rank <= 6
+    )
+        
+    return c1 + c2
+
+
+###################################
+# Gráfico A.4: Generación eléctrica por tecnologías en España (mensual)
+###################################
+
+# Filtrar los datos en función de la fecha seleccionada
+@trazas.medir('grafico')
+def get_plot_generacion_mensual(df, anio=2023):
+    df = datos(df, ['month', 'name', 'value'])
+    selection = alt.selection_point(fields=['name'], bind='legend')
+    
+    chart = alt.Chart(df).mark_bar(size=20).encode(
+        x = alt.X('month', title='Mes de %d' % anio, scale=alt.Scale(domain=[1, 12])),
+        y=alt.Y('sum(value):Q', title='Energía producida (MWh)', scale=alt.Scale(domain=[0, 24000000])),
+        color=alt.Color("name:N", title='Tecnología'),
+        opacity=alt.condition(selection, alt.value(1), alt.value(0.2))
+    ).add_params(selection).properties(
+        title='Generación eléctrica mensual por tecnología',
+        width=680,
+        height=500
+    )
+
+    return chart
+
+
+###################################
+# Gráfico B.1: Desglose horario de precio España
+###################################
+
+# Filtrar los datos en función de la fecha seleccionada
+@trazas.medir('grafico')
+def get_plot_precio_hora(date, df, indice=None, cubo=None, ancho=400):
+
+    date = date.date()
+    
+    # Si los datos del cubo del año dan más puntos que píxeles, media por
+    # periodo del nivel que cabe (ya calculado en el cubo); si no, las filas del
+    # día seleccionado (con el índice por días si se proporciona)
+    nivel = cubo.nivel_para(1, ancho) if cubo is not None else None
+    if nivel is not None and nivel != cubo.base:
+        df_filtered = cubo.serie(date, date + dt.timedelta(days=1), nivel, media=True)
+    else:
+        df_filtered = filtrar_dia(df, date, indice)
+    df_filtered = datos(df_filtered, ['datetime', 'name', 'value'], _apiladas('datetime'))
+    
+    # Crear el gráfico Altair
+    selection = alt.selection_point(fields=['name'], bind='legend')
+
+    chart = alt.Chart(df_filtered).mark_area(interpolate='step').encode(
+        x=alt.X('datetime:T', title='Hora del día'),  # Eje X: Hora del día
+        y=alt.Y('value:Q', title='Precio por MWh (€/MWh)', scale=alt.Scale(domain=[-10, 250])),
+        color=alt.Color('name:N', title='Concepto'),  # Diferenciar por tecnología
+        opacity=alt.condition(selection, alt.value(1), alt.value(0.2)),
+        order=alt.Order('sum(value):Q', sort='descending')
+    ).properties(
+        title='Precio electricidad',
+        width=ancho,
+        height=400
+    ).add_params(selection)
+
+    return chart
+
+@trazas.medir('grafico')
+def prices(date, df, indice=None):
+    date = date.date()
+    
+    # Filas del día seleccionado (con el índice por días si se proporciona)
+    df_filtered = filtrar_dia(df, date, indice)
+
+    df_filtered = df_filtered.groupby('datetime')['value'].sum().reset_index()
+
+    avg = df_filtered['value'].mean()
+    min = df_filtered['value'].min()
+    max = df_filtered['value'].max()
+
+    return avg, min, max
+
+# Resumen de precios de un periodo: la media sale de las sumas acumuladas del
+# cubo; mínimo y máximo recorren el total de cada periodo (hora, o 15 o 5
+# minutos si los datos los tienen)
+@trazas.medir('grafico')
+def prices_rango(desde, hasta, cubo):
+    total = cubo.total_por_periodo(desde, hasta)
+    if len(total) == 0:
+        return np.nan, np.nan, np.nan
+    return cubo.media_total(desde, hasta), total.min(), total.max()
+
+# Precio medio diario por concepto a lo largo del periodo
+@trazas.medir('grafico')
+def get_plot_precio_rango(desde, hasta, cubo):
+    df = datos(cubo.diario_rango(desde, hasta, media=True), ['date', 'name', 'value'], _apiladas('date'))
+
+    selection = alt.selection_point(fields=['name'], bind='legend')
+
+    chart = alt.Chart(df).mark_area(interpolate='step-after').encode(
+        x=alt.X('date:T', title='Día'),
+        y=alt.Y('value:Q', title='Precio medio diario (€/MWh)'),
+        color=alt.Color('name:N', title='Concepto'),
+        opacity=alt.condition(selection, alt.value(1), alt.value(0.2)),
+        order=alt.Order('sum(value):Q', sort='descending')
+    ).properties(
+        title='Precio electricidad en el periodo',
+        width=400,
+        height=400
+    ).add_params(selection)
+
+    return chart
+
+###################################
+# Gráfico B.2: Desglose horario de precio EU
+###################################
+
+
+@trazas.medir('grafico')
+def get_plot_precio_hora_eu(date, precios, ancho=600):
+    date = date.date()
+
+    # Día ya pivotado (precios_horarios.py): una fila por periodo (el más fino
+    # que cabe en el ancho) y una columna por país, en orden fijo. Las capas
+    # comparten estos datos: la tabla del tooltip los usa tal cual y las
+    # líneas despliegan las columnas de países
+    df_filtered = precios.ancho(date, ancho)
+    paises = list(df_filtered.columns[1:])
+    df_filtered = datos(df_filtered, ['datetime'] + paises)
+
+    selection = alt.selection_point(fields=['name'], bind='legend')
+
+    # Create a selection that chooses the nearest point & selects based on x-value
+    nearest = alt.selection_point(nearest=True, on="mouseover",
+                             fields=["datetime"], empty=False)
+    
+    # The basic line
+    line = alt.Chart().transform_fold(paises, as_=['name', 'value']).mark_line(interpolate='step').encode(
+              x=alt.X('datetime:T', title='Hora del día'),  # Eje X: Hora del día
+              y=alt.Y('value:Q', title='Precio por MWh (€/MWh)', scale=alt.Scale(domain=[-10, 300])),
+              color=alt.Color('name:N', title='País', sort=paises), 
+              opacity=alt.condition(selection, alt.value(1), alt.value(0.2)),
+              ).properties(
+              title='Precio electricidad por paises',
+              width=700,
+              height=400
+              ).add_params(selection)
+    # Draw points on the line, and highlight based on selection
+    points = line.mark_point().encode(
+         opacity=alt.condition(nearest, alt.value(1), alt.value(0)))
+    
+    # Draw a rule at the location of the selection
+    rules = alt.Chart().mark_rule(color="gray").encode(
+        x="datetime:T",
+        opacity=alt.condition(nearest, alt.value(0.3), alt.value(0)),
+        tooltip=[alt.Tooltip(c, type="quantitative") for c in paises],
+    ).add_params(nearest)
+    # Put the five layers into a chart and bind the data (una vez, para todas las capas)
+    chart = alt.layer(
+        line, points, rules, data=df_filtered
+    ).properties(
+        width=ancho, height=300
+    )
+    return chart
+
+
+###################################
+# Gráfico C.1: Emisiones medias diarias
+###################################
+
+# Calendario de medias diarias de un país (su partición, sin filtrar el resto)
+@trazas.medir('grafico')
+def get_plot_emisiones_eu(pais, emisiones):
+
+    df = datos(emisiones.diario(pais), ['date', 'value'])
+
+    chart = alt.Chart(df, title="Intensidad de carbono media diaria [gCO2eq/kWh]").mark_rect().encode(
+        alt.X("date(date):O").title("Día").axis(format="%e", labelAngle=0),
+        alt.Y("month(date):O").title("Mes"),
+        alt.Color("value").title('gCO2eq/kWh').scale(
+        domain=[0, 450, 900],
+        range=['green', 'red', 'black']),
+        tooltip=[
+            alt.Tooltip("monthdate(date)", title="Fecha"),
+            alt.Tooltip("value", title="Emisiones [gCO2eq/kWh]")]
+    ).configure_view(
+        step=13,
+        strokeWidth=0
+    ).configure_axis(
+        domain=False
+    ).properties(
+    width=700,
+    height=300
+    )
+    
+    
+    return chart
+
+# Mapa día × hora de un país: se envía una fila por día con las 24 horas en
+# columnas (ya agrupadas en el array) y el navegador las despliega
+@trazas.medir('grafico')
+def get_plot_emisiones_dia_hora(pais, emisiones):
+    df = datos(emisiones.dia_hora(pais), ['date'] + HORAS)
+
+    chart = alt.Chart(df, title="Intensidad de carbono horaria [gCO2eq/kWh]").transform_fold(
+        HORAS, as_=['hora', 'value']
+    ).mark_rect().encode(
+        alt.X("yearmonthdate(date):T").title("Día"),
+        alt.Y("hora:O").title("Hora (UTC)"),
+        alt.Color("value:Q").title('gCO2eq/kWh').scale(
+            domain=[0, 450, 900],
+            range=['green', 'red', 'black']),
+        tooltip=[
+            alt.Tooltip("monthdate(date)", title="Fecha"),
+            alt.Tooltip("hora:O", title="Hora"),
+            alt.Tooltip("value:Q", title="Emisiones [gCO2eq/kWh]", format=".0f")]
+    ).configure_view(
+        strokeWidth=0
+    ).properties(
+        width=700,
+        height=300
+    )
+
+    return chart
+
+# Medias diarias de varios países, un gráfico pequeño por país con la misma escala
+@trazas.medir('grafico')
+def get_plot_emisiones_comparar(paises, emisiones):
+    orden = [emisiones.nombres[emisiones.i_pais[p]] for p in paises]
+    df = datos(emisiones.comparar(paises), ['date', 'name', 'value'],
+               lambda df, presupuesto: reducir_lineas(df, 'date', 'value', 'name', presupuesto))
+
+    chart = alt.Chart(df).mark_area(line=True, opacity=0.4).encode(
+        alt.X("date:T").title(None),
+        alt.Y("value:Q").title('gCO2eq/kWh'),
+        tooltip=[
+            alt.Tooltip("monthdate(date)", title="Fecha"),
+            alt.Tooltip("value:Q", title="Emisiones [gCO2eq/kWh]", format=".0f")]
+    ).properties(
+        width=220,
+        height=120
+    ).facet(
+        alt.Facet("name:N", sort=orden).title(None),
+        columns=3,
+        title="Intensidad de carbono media diaria por país [gCO2eq/kWh]"
+    )
+
+    return chart
+
+
+###################################
+# Gráfico C.2: Intensidad de carbono frente a potencia por país
+###################################
+
+# Resumen de todos los países (potencia_emisiones.py): una barra por país con
+# la correlación del año, coloreada por la pendiente de la recta
+@trazas.medir('grafico')
+def get_plot_resumen_potencia_emis(analisis):
+    df = datos(analisis.resumen().dropna(subset=['r']), ['país', 'días', 'r', 'pendiente (por GW)'])
+
+    chart = alt.Chart(df).mark_bar().encode(
+        x=alt.X('r:Q', title='Correlación intensidad - potencia (r)', scale=alt.Scale(domain=[-1, 1])),
+        y=alt.Y('país:N', title='País', sort='-x'),
+        color=alt.Color('pendiente (por GW):Q', title='gCO2eq/kWh por GW',
+                        scale=alt.Scale(scheme='redblue', reverse=True, domainMid=0)),
+        tooltip=[alt.Tooltip('país:N'), alt.Tooltip('días:Q'), alt.Tooltip('r:Q', format='.2f'),
+                 alt.Tooltip('pendiente (por GW):Q', format='.2f')]
+    ).properties(
+        title='Intensidad de carbono frente a potencia media diaria por país',
+        width=600,
+        height=alt.Step(16)
+    )
+
+    return chart
+
+# Días de un país: nube de puntos y recta de mínimos cuadrados
+@trazas.medir('grafico')
+def get_plot_potencia_emis_pais(pais, analisis):
+    df = datos(analisis.pais(pais), ['date', 'power', 'value', 'fitted'])
+    base = alt.Chart(df).encode(alt.X('power:Q', title='Potencia media diaria (MW)', scale=alt.Scale(zero=False)))
+
+    points = base.mark_circle(opacity=0.6).encode(
+        alt.Y('value:Q', title='Intensidad media diaria [gCO2eq/kWh]'),
+        tooltip=[alt.Tooltip('monthdate(date)', title='Fecha'), alt.Tooltip('power:Q', format='.0f'),
+                 alt.Tooltip('value:Q', format='.0f')]
+    )
+    recta = base.mark_line(color='black').encode(alt.Y('fitted:Q'))
+
+    return (points + recta).properties(title='%s: intensidad frente a potencia' % pais, width=350, height=300)
+
+# Correlación móvil de un país a lo largo del año
+@trazas.medir('grafico')
+def get_plot_correlacion_movil(pais, analisis):
+    df = datos(analisis.correlacion_pais(pais), ['date', 'value'])
+
+    chart = alt.Chart(df).mark_line().encode(
+        alt.X('date:T', title='Día'),
+        alt.Y('value:Q', title='r', scale=alt.Scale(domain=[-1, 1])),
+        tooltip=[alt.Tooltip('monthdate(date)', title='Fecha'), alt.Tooltip('value:Q', title='r', format='.2f')]
+    ).properties(
+        title='Correlación en ventanas de %d días' % VENTANA,
+        width=350,
+        height=300
+    )
+
+    return chart
+
+# Descomposición de la intensidad de un país: un gráfico por componente
+@trazas.medir('grafico')
+def get_plot_descomposicion(pais, analisis):
+    df = datos(analisis.descomposicion(pais), ['date', 'componente', 'value'])
+
+    chart = alt.Chart(df).mark_line().encode(
+        alt.X('date:T', title=None),
+        alt.Y('value:Q', title='gCO2eq/kWh'),
+        tooltip=[alt.Tooltip('monthdate(date)', title='Fecha'), alt.Tooltip('value:Q', format='.1f')]
+    ).properties(
+        width=800,
+        height=90
+    ).facet(
+        row=alt.Row('componente:N', sort=['observada', 'tendencia', 'semanal', 'residuo'], title=None),
+        title='%s: descomposición de la intensidad de carbono (periodo semanal)' % pais
+    ).resolve_scale(y='independent')
+
+    return chart
+
+
+###################################
+# Gráfico B.3: Precio medio por países en un periodo
+###################################
+
+@trazas.medir('grafico')
+def get_plot_precio_eu_rango(desde, hasta, cubo):
+    # Media por país del periodo (sumas acumuladas del cubo de precios EU)
+    df = datos(cubo.medias(desde, hasta), ['name', 'value'])
+
+    chart = alt.Chart(df).mark_bar().encode(
+        x=alt.X('name:N', title='País', sort='-y'),
+        y=alt.Y('value:Q', title='Precio medio (€/MWh)'),
+        color=alt.Color('name:N', title='País', legend=None),
+        tooltip=[alt.Tooltip('name:N', title='País'), alt.Tooltip('value:Q', title='€/MWh', format='.2f')]
+    ).properties(
+        title='Precio medio de la electricidad por países en el periodo',
+        width=600,
+        height=300
+    )
+
+    return chart
+
+
+###################################
+# Gráfico B.3: Estadísticas diarias de precio por países
+###################################
+
+@trazas.medir('grafico')
+def get_plot_estadisticas_precio(estadistica, paises, tablas):
+    # Una línea por país con la estadística de cada día del año (estadisticas_precio.py)
+    df = datos(tablas.largo(estadistica, paises), ['date', 'name', 'value'],
+               lambda df, presupuesto: reducir_lineas(df, 'date', 'value', 'name', presupuesto))
+    titulo = 'Horas' if estadistica == 'horas_negativas' else '€/MWh'
+
+    selection = alt.selection_point(fields=['name'], bind='legend')
+
+    chart = alt.Chart(df).mark_line(interpolate='step-after').encode(
+        x=alt.X('date:T', title='Día'),
+        y=alt.Y('value:Q', title=titulo),
+        color=alt.Color('name:N', title='País'),
+        opacity=alt.condition(selection, alt.value(1), alt.value(0.15)),
+        tooltip=[alt.Tooltip('date:T', title='Día'), alt.Tooltip('name:N', title='País'),
+                 alt.Tooltip('value:Q', title=titulo, format='.2f')]
+    ).properties(
+        title=ETIQUETAS[estadistica] + ' diario por países',
+        width=700,
+        height=300
+    ).add_params(selection)
+
+    return chart
+
+
+###################################
+# Gráfico C.3: Tablas anuales top-down por país
+###################################
+
+# Título del eje de cada método de emisiones_top_down.py
+TITULOS_TOP_DOWN = {
+    'CI_0': 'Intensidad de carbono CI_0 [gCO2eq/kWh]',
+    'CI_1': 'Intensidad de carbono CI_1 [gCO2eq/kWh]',
+    'CI_MAP_1': 'Intensidad de carbono CI_MAP_1 [gCO2eq/kWh]',
+    'ei_AP': 'Emisiones ei_AP [kt CO2]',
+    'ei_MAP': 'Emisiones ei_MAP [kt CO2]',
+    'CI_bottom_up': 'Intensidad de carbono bottom-up [gCO2eq/kWh]',
+}
+
+@trazas.medir('grafico')
+def get_plot_top_down(metodo, paises, tablas):
+    # Serie anual de los países elegidos: un corte del array (método, año, país)
+    df = tablas.largo(metodo, paises)
+
+    chart = alt.Chart(df).mark_line(point=True).encode(
+        x=alt.X('Year:O', title='Año'),
+        y=alt.Y('value:Q', title=TITULOS_TOP_DOWN.get(metodo, metodo)),
+        color=alt.Color('name:N', title='País'),
+        tooltip=[alt.Tooltip('name:N', title='País'), alt.Tooltip('Year:O', title='Año'),
+                 alt.Tooltip('value:Q', title='Valor', format='.2f')]
+    ).properties(
+        title='Evolución anual por país (top-down)',
+        width=700,
+        height=350
+    )
+
+    return chart
+
+@trazas.medir('grafico')
+def get_plot_diferencia_top_down(metodo_a, metodo_b, anio, tablas):
+    # Diferencia a - b por país en un año (en % de a), de la resta de dos planos del array
+    fila = tablas.i_anio[anio]
+    relativa = tablas.diferencia(metodo_a, metodo_b, relativa=True)[fila]
+    absoluta = tablas.diferencia(metodo_a, metodo_b)[fila]
+    hay = ~np.isnan(relativa)
+    df = pd.DataFrame({'name': np.asarray(tablas.paises)[hay], 'value': relativa[hay], 'diferencia': absoluta[hay]})
+
+    chart = alt.Chart(df).mark_bar().encode(
+        x=alt.X('name:N', title='País', sort='-y'),
+        y=alt.Y('value:Q', title='Diferencia (%)'),
+        color=alt.condition(alt.datum.value > 0, alt.value('firebrick'), alt.value('seagreen')),
+        tooltip=[alt.Tooltip('name:N', title='País'), alt.Tooltip('value:Q', title='%', format='.1f'),
+                 alt.Tooltip('diferencia:Q', title='Diferencia', format='.2f')]
+    ).properties(
+        title='%s frente a %s en %d' % (metodo_a, metodo_b, anio),
+        width=700,
+        height=300
+    )
+
+    return chart
+
+
+###################################
+# Depuración: cascada de tiempos de un rerun (trazas.py)
+###################################
+
+def get_plot_cascada(df):
+    # Una barra por tramo, de su inicio a su fin, en el orden en que empezaron;
+    # la sangría del nombre es el nivel de anidamiento
+    df = df.sort_values('inicio', kind='stable').reset_index(drop=True)
+    df = df.assign(
+        fin=df['inicio'] + df['duracion'],
+        ms=1000 * df['duracion'],
+        etiqueta=['%03d %s%s' % (i, '· ' * n, nombre) for i, (n, nombre) in enumerate(zip(df['nivel'], df['nombre']))])
+
+    chart = alt.Chart(df).mark_bar().encode(
+        x=alt.X('inicio:Q', title='Segundos desde el inicio del rerun'),
+        x2='fin:Q',
+        y=alt.Y('etiqueta:N', title=None, sort=None, axis=alt.Axis(labelLimit=300)),
+        color=alt.Color('categoria:N', title='Categoría'),
+        tooltip=[alt.Tooltip('nombre:N', title='Tramo'), alt.Tooltip('categoria:N', title='Categoría'),
+                 alt.Tooltip('ms:Q', title='ms', format='.1f'), alt.Tooltip('filas:Q', title='Filas')]
+    ).properties(
+        title='Cascada del rerun',
+        height=max(100, 14 * len(df))
+    )
+
+    return chart
@@ -0,0 +1,68 @@
+# IMPORTS
+import numpy as np
+import pandas as pd
+
+import trazas
+
+
+
+#####################################################
+## Índice por días
+#####################################################
+
+# Los gráficos diarios filtraban con df['date'] == date, que compara objetos
+# datetime.date de Python fila a fila sobre todo el histórico. El índice se
+# construye una vez al preparar los datos: el DataFrame queda ordenado por
+# datetime y para cada día se guarda el rango contiguo de filas que ocupa, de
+# forma que obtener un día es una búsqueda binaria y un iloc (una vista).
+
+_NS_DIA = 86_400 * 10**9
+
+
+def _dias_epoch(datetimes):
+    # Día (UTC) desde 1970-01-01 como int64, igual que datetime.dt.date con utc=True
+    valores = pd.DatetimeIndex(datetimes).tz_convert('UTC').tz_localize(None)
+    return valores.as_unit('ns').asi8 // _NS_DIA
+
+
+def _dia_epoch(date):
+    return int(np.datetime64(date, 'D').astype(np.int64))
+
+
+class IndiceDiario:
+    """Rangos de filas por día de un DataFrame ordenado por `columna`."""
+
+    def __init__(self, df, columna='datetime'):
+        dias = _dias_epoch(df[columna])
+        if len(dias) and np.any(np.diff(dias) < 0):
+            raise ValueError('El DataFrame debe estar ordenado por %s' % columna)
+
+        self.dias, self.inicios = np.unique(dias, return_index=True)
+        self.finales = np.append(self.inicios[1:], len(dias))
+
+    def rango(self, date):
+        """slice con las filas de `date` (vacío si no hay datos ese día)."""
+        i = np.searchsorted(self.dias, _dia_epoch(date))
+        if i < len(self.dias) and self.dias[i] == _dia_epoch(date):
+            return slice(int(self.inicios[i]), int(self.finales[i]))
+        return slice(0, 0)
+
+    def __len__(self):
+        return len(self.dias)
+
+
+def indexar(df, columna='datetime'):
+    """Ordena df por `columna` (orden estable) y devuelve (df, índice por días)."""
+    # Si ya viene ordenado (p. ej. de compartido.py) no se copia
+    if not df[columna].is_monotonic_increasing:
+        df = df.sort_values(columna, kind='stable', ignore_index=True)
+    return df, IndiceDiario(df, columna)
+
+
+@trazas.medir('filtro')
+def filtrar_dia(df, date, indice=None):
+    """Filas de df del día `date`, usando el índice si se proporciona."""
+    if indice is None:
+        dias = df['date'] if 'date' in df else df['datetime'].dt.date
+        return df.loc[dias == date]
+    return df.iloc[indice.rango(date)]
@@ -0,0 +1,84 @@
+# IMPORTS
+import argparse
+import time
+
+import pandas as pd
+
+import almacen
+import excel
+from preprocesado import prep_g1, prep_b1, prep_b2, normalizar_c1
+
+
+
+#####################################################
+## Ingesta de exportaciones ESIOS / emisiones al almacén
+#####################################################
+
+# Lee los ficheros por bloques (nunca enteros en memoria), aplica las mismas
+# reglas de limpieza que el dashboard y escribe el resultado en el almacén
+# particionado por año y mes (ver almacen.py).
+#
+# Uso (desde la raíz del repositorio):
+#   python ingesta.py generacion Datos/Generacion/GeneracionTotal_*_h.csv
+#   python ingesta.py precio_es Datos/Economico/PrecioMedioHorarioFinal_*_h.xlsx
+#   python ingesta.py precio_eu Datos/Economico/PrecioEuropa_*_h.csv
+#   python ingesta.py emisiones Datos/Emisiones/output/CI_bottom_up_method.csv
+
+# Separador de los CSV y normalización de cada fuente
+FUENTES = {
+    'generacion': (';', prep_g1),
+    'precio_es': (';', prep_b1),
+    'precio_eu': (';', prep_b2),
+    'emisiones': (',', normalizar_c1),
+}
+
+
+def leer_por_bloques(path, delimiter, filas):
+    # Los Excel se leen de su Parquet auxiliar (ver excel.py) o, si no lo hay,
+    # recorriendo el libro en modo solo lectura
+    if excel.es_excel(path):
+        return excel.bloques(path, filas=filas)
+    return pd.read_csv(path, delimiter=delimiter, chunksize=filas)
+
+
+def ingerir(fuente, paths, raiz=almacen.RAIZ, filas=250_000, anadir=False):
+    """Normaliza los ficheros de `paths` y los escribe en el almacén.
+
+    Salvo con anadir=True, la fuente se vacía antes para que repetir la ingesta
+    no duplique filas. Devuelve el número de filas escritas.
+    """
+    delimiter, normalizar = FUENTES[fuente]
+    if not anadir:
+        almacen.borrar(fuente, raiz)
+
+    total = 0
+    for path in paths:
+        for bloque in leer_por_bloques(path, delimiter, filas):
+            df = normalizar(bloque)
+
+            # date se recalcula a partir de datetime; no hace falta guardarla
+            df = df.drop(columns=['date'], errors='ignore')
+            almacen.escribir(fuente, df, raiz)
+            total += len(df)
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingesta de datos al almacén particionado')
+    parser.add_argument('fuente', choices=sorted(FUENTES))
+    parser.add_argument('paths', nargs='+', help='Ficheros exportados (CSV, XLSX o XLS)')
+    parser.add_argument('--raiz', default=almacen.RAIZ, help='Directorio del almacén')
+    parser.add_argument('--filas', type=int, default=250_000, help='Filas por bloque de lectura')
+    parser.add_argument('--anadir', action='store_true', help='No vaciar la fuente antes de escribir')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    total = ingerir(args.fuente, args.paths, args.raiz, args.filas, args.anadir)
+    print('%s: %d filas en %.1f s (%d meses en %s)' % (
+        args.fuente, total, time.perf_counter() - inicio,
+        len(almacen.meses(args.fuente, args.raiz)), args.raiz))
+
+
+if __name__ == '__main__':
+    main()
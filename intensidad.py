@@ -0,0 +1,196 @@
+# IMPORTS
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+
+#####################################################
+## Intensidad de carbono horaria (método bottom-up)
+#####################################################
+
+# La intensidad de carbono de una hora es la media de los factores de emisión
+# de cada tecnología ponderada por su generación:
+#
+#   CI[h] = sum_t G[h, t] * EF[t] / sum_t G[h, t]        (gCO2eq/kWh)
+#
+# Con la generación de un país como matriz (horas × tecnologías) es un único
+# producto matriz-vector. EF_bottom_up_method.csv solo trae factores para las
+# tecnologías fósiles (gas, hard_coal, lignite, other_fossil); el resto emite 0.
+# Si un país no tiene factor para una tecnología fósil se usa la media de esa
+# tecnología en los países que sí lo tienen.
+#
+# La entrada es la generación horaria por país y tecnología en formato largo
+# (datetime, MapCode, ProductionTypeName, value en MW) y la salida tiene la
+# forma de CI_bottom_up_method.csv (datetime + una columna por país), que es
+# la que lee normalizar_c1.
+#
+# Uso (desde la raíz del repositorio):
+#   python intensidad.py generacion_por_tipo.csv [...] --salida Datos/Emisiones/output/CI_bottom_up_method.csv
+#   python intensidad.py generacion_por_tipo_*.csv --almacen
+
+FACTORES = 'Datos/Emisiones/output/EF_bottom_up_method.csv'
+SALIDA = 'Datos/Emisiones/output/CI_bottom_up_method.csv'
+
+
+def leer_factores(ruta=FACTORES):
+    """Factores de emisión en gCO2eq/kWh (país × tecnología, NaN si no hay factor)."""
+    ef = pd.read_csv(ruta)
+    # EF viene en tCO2/MWh (= kgCO2/kWh)
+    return ef.pivot(index='MapCode', columns='ProductionTypeName', values='EF') * 1000
+
+
+def vector_factores(factores, pais, tecnologias):
+    """Factor de cada tecnología de `tecnologias` para `pais` (0 si no es fósil)."""
+    medias = factores.mean()
+    propios = factores.loc[pais] if pais in factores.index else pd.Series(dtype=float)
+    vector = propios.reindex(tecnologias).fillna(medias.reindex(tecnologias)).fillna(0)
+    return vector.to_numpy(dtype=np.float64)
+
+
+def intensidad(generacion, ef):
+    """CI horaria de una matriz de generación (horas × tecnologías) y sus factores.
+
+    Las horas sin generación quedan como NaN.
+    """
+    generacion = np.nan_to_num(np.asarray(generacion, dtype=np.float64))
+    total = generacion.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total > 0, generacion @ ef / total, np.nan)
+
+
+def _matriz(celdas, valores, n_horas, n_tecnologias):
+    # Generación en formato largo (celda = hora * n_tecnologias + tecnología) a matriz densa
+    plano = np.bincount(celdas, weights=valores, minlength=n_horas * n_tecnologias)
+    return plano.reshape(n_horas, n_tecnologias)
+
+
+def _intensidad_pais(args):
+    # Trabajo de un proceso: matriz del país y producto por sus factores
+    celdas, valores, n_horas, n_tecnologias, ef = args
+    return intensidad(_matriz(celdas, valores, n_horas, n_tecnologias), ef)
+
+
+def _codigos(columna):
+    # (códigos, valores); en las categorías se usan sus propios códigos
+    if isinstance(columna.dtype, pd.CategoricalDtype):
+        return columna.cat.codes.to_numpy(), list(columna.cat.categories)
+    codigos, valores = pd.factorize(columna)
+    return codigos, list(valores)
+
+
+def _horas(columna):
+    # (código de cada fila, horas UTC ordenadas)
+    if pd.api.types.is_datetime64_any_dtype(columna):
+        # Sobre los int64 (en su unidad): to_numpy() de un datetime con zona
+        # crea un objeto por fila
+        fechas = pd.DatetimeIndex(columna)
+        codigos, unicos = pd.factorize(fechas.asi8)
+        # Se ordenan los valores distintos y se renumeran los códigos
+        orden = np.argsort(unicos)
+        rango = np.empty_like(orden)
+        rango[orden] = np.arange(len(orden))
+        # asi8 está en UTC si hay zona; sin zona se toma como UTC
+        return rango[codigos], pd.DatetimeIndex(pd.to_datetime(unicos[orden], unit=fechas.unit, utc=True))
+
+    # Texto: cada instante se repite una vez por país y tecnología, así que
+    # solo se convierten los distintos
+    codigo_texto, textos = pd.factorize(columna)
+    codigo_unico, horas = pd.factorize(pd.to_datetime(textos, utc=True), sort=True)
+    return codigo_unico[codigo_texto], horas
+
+
+def calcular(df, factores=None, procesos=None):
+    """CI horaria por país a partir de la generación en formato largo.
+
+    Devuelve un DataFrame ancho: índice datetime (UTC) y una columna por país.
+    Los países se reparten entre `procesos` procesos (1: sin procesos).
+    """
+    factores = leer_factores() if factores is None else factores
+
+    # Ejes comunes a todos los países: horas y tecnologías
+    codigo_hora, horas = _horas(df['datetime'])
+    codigo_tec, tecnologias = _codigos(df['ProductionTypeName'])
+
+    # Posición de cada fila en la matriz horas × tecnologías de su país
+    celdas = codigo_hora * len(tecnologias) + codigo_tec
+    valores = df['value'].to_numpy(dtype=np.float64)
+
+    # Filas de cada país. Lo habitual es que ya vengan agrupadas (un fichero
+    # por país): entonces cada país es un tramo y no hace falta reordenar
+    codigo_pais, paises = _codigos(df['MapCode'])
+    if np.any(codigo_pais[1:] < codigo_pais[:-1]):
+        orden = np.argsort(codigo_pais, kind='stable')
+        codigo_pais, celdas, valores = codigo_pais[orden], celdas[orden], valores[orden]
+    limites = np.searchsorted(codigo_pais, np.arange(len(paises) + 1, dtype=codigo_pais.dtype))
+
+    tareas = []
+    con_datos = []
+    for k, pais in enumerate(paises):
+        i, j = limites[k], limites[k + 1]
+        if i == j:
+            continue
+        con_datos.append(pais)
+        tareas.append((celdas[i:j], valores[i:j], len(horas), len(tecnologias),
+                       vector_factores(factores, pais, tecnologias)))
+
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1 or len(tareas) == 1:
+        columnas = [_intensidad_pais(t) for t in tareas]
+    else:
+        with ProcessPoolExecutor(min(procesos, len(tareas))) as pool:
+            columnas = list(pool.map(_intensidad_pais, tareas))
+
+    ci = pd.DataFrame(dict(zip(con_datos, columnas)), index=pd.DatetimeIndex(horas, name='datetime'))
+    return ci[sorted(con_datos)]
+
+
+def escribir_csv(ci, ruta=SALIDA):
+    """Escribe la CI con la forma de CI_bottom_up_method.csv."""
+    salida = ci.round(2).reset_index()
+    salida['datetime'] = salida['datetime'].dt.strftime('%Y-%m-%d %H:%M:%S+00:00')
+    salida.to_csv(ruta, index=False)
+
+
+def escribir_almacen(ci, raiz=None):
+    """Escribe la CI en la fuente 'emisiones' del almacén (la vacía antes)."""
+    import almacen
+    from preprocesado import normalizar_c1
+
+    raiz = raiz or almacen.RAIZ
+    almacen.borrar('emisiones', raiz)
+    df = normalizar_c1(ci.reset_index()).drop(columns=['date'])
+    return almacen.escribir('emisiones', df, raiz)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Intensidad de carbono horaria por país (bottom-up)')
+    parser.add_argument('paths', nargs='+',
+                        help='CSV de generación por tipo (datetime, MapCode, ProductionTypeName, value)')
+    parser.add_argument('--factores', default=FACTORES, help='Factores de emisión (EF_bottom_up_method.csv)')
+    parser.add_argument('--salida', default=SALIDA, help='CSV de salida')
+    parser.add_argument('--almacen', action='store_true', help='Escribir en el almacén en lugar del CSV')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos en paralelo (por defecto, uno por CPU)')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    df = pd.concat([pd.read_csv(p) for p in args.paths], ignore_index=True)
+    ci = calcular(df, leer_factores(args.factores), args.procesos)
+    calculado = time.perf_counter()
+
+    if args.almacen:
+        escribir_almacen(ci)
+        destino = 'almacén'
+    else:
+        escribir_csv(ci, args.salida)
+        destino = args.salida
+    print('%d horas × %d países en %.1f s (%.1f s de cálculo) -> %s' % (
+        len(ci), ci.shape[1], time.perf_counter() - inicio, calculado - inicio, destino))
+
+
+if __name__ == '__main__':
+    main()
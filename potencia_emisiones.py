@@ -0,0 +1,214 @@
+# IMPORTS
+import numpy as np
+import pandas as pd
+
+import trazas
+
+
+
+#####################################################
+## Intensidad de carbono frente a potencia por país
+#####################################################
+
+# prep_c2 unía con pd.merge las medias diarias de emisiones y la potencia de
+# combined.csv, y el dashboard dibujaba y enseñaba la tabla unida entera (una
+# fila por día y país). Aquí las dos series se alinean una vez en dos matrices
+# (país × día) con los países y días de EmisionesPaises, y sobre ellas se
+# calcula para todos los países a la vez, con operaciones de NumPy sobre ejes
+# completos (sin bucles por país):
+#
+#   regresión   recta de mínimos cuadrados intensidad ~ potencia y su r
+#   correlación correlación móvil en ventanas de VENTANA días (sumas acumuladas)
+#   estacional  descomposición aditiva clásica con periodo semanal: tendencia
+#               (media móvil centrada), componente semanal (media por día de
+#               la semana de lo que queda sin tendencia) y residuo
+#
+# Los días sin alguna de las dos series son NaN y no cuentan en ningún cálculo.
+# El dashboard enseña el resumen por país y, para el país elegido, sus series.
+
+# Días de la ventana de la correlación móvil
+VENTANA = 30
+
+# Pares de valores mínimos para dar una correlación (en la ventana o en el año)
+MINIMO = 10
+
+# Días de la estacionalidad (semanal en datos diarios)
+PERIODO = 7
+
+
+def _sumas_moviles(valores, ventana):
+    # Suma en las ventanas [d - ventana + 1, d] de cada fila; las primeras
+    # ventana - 1 columnas suman lo que hay desde el principio
+    acumulado = np.zeros(valores.shape[:-1] + (valores.shape[-1] + 1,))
+    np.cumsum(valores, axis=-1, out=acumulado[..., 1:])
+    inicio = np.maximum(np.arange(1, valores.shape[-1] + 1) - ventana, 0)
+    return acumulado[..., 1:] - acumulado[..., inicio]
+
+
+def _momentos(x, y, validos):
+    # Número de pares y sumas centradas en la media de cada fila
+    n = validos.sum(axis=-1)
+    x = np.where(validos, x, 0.0)
+    y = np.where(validos, y, 0.0)
+    mx = x.sum(axis=-1) / np.maximum(n, 1)
+    my = y.sum(axis=-1) / np.maximum(n, 1)
+    dx = np.where(validos, x - mx[..., None], 0.0)
+    dy = np.where(validos, y - my[..., None], 0.0)
+    return n, mx, my, dx, dy
+
+
+def regresion(x, y):
+    """(pendiente, ordenada, r, pares) de y ~ x por fila, sin los NaN de x o y."""
+    validos = ~np.isnan(x) & ~np.isnan(y)
+    n, mx, my, dx, dy = _momentos(x, y, validos)
+    sxx, syy, sxy = (dx * dx).sum(axis=-1), (dy * dy).sum(axis=-1), (dx * dy).sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pendiente = np.where(n >= 2, sxy / sxx, np.nan)
+        r = np.where(n >= MINIMO, sxy / np.sqrt(sxx * syy), np.nan)
+    return pendiente, my - pendiente * mx, r, n
+
+
+def correlacion_movil(x, y, ventana=VENTANA, minimo=MINIMO):
+    """Correlación de x e y por fila en las ventanas de `ventana` días que acaban en cada día."""
+    validos = ~np.isnan(x) & ~np.isnan(y)
+    # Centradas en la media de la fila: las sumas acumuladas no pierden precisión
+    _, _, _, dx, dy = _momentos(x, y, validos)
+    n = _sumas_moviles(validos.astype(float), ventana)
+    sx, sy = _sumas_moviles(dx, ventana), _sumas_moviles(dy, ventana)
+    sxx, syy, sxy = (_sumas_moviles(v, ventana) for v in (dx * dx, dy * dy, dx * dy))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxy - sx * sy / n
+        r = cov / np.sqrt((sxx - sx * sx / n) * (syy - sy * sy / n))
+    return np.where(n >= minimo, np.clip(r, -1, 1), np.nan)
+
+
+def descomponer(y, dias, periodo=PERIODO):
+    """(tendencia, estacional, residuo) por fila de y, con `dias` los días epoch de las columnas.
+
+    Tendencia: media móvil centrada de `periodo` días (2 × periodo con
+    periodo par, como en la descomposición clásica) de los días con datos.
+    Estacional: media de y - tendencia en cada día del periodo, centrada en 0.
+    """
+    validos = ~np.isnan(y)
+    valores = np.where(validos, y, 0.0)
+    # Media móvil centrada: suma de la ventana que acaba `mitad` días después
+    mitad = periodo // 2
+    relleno = ((0, 0), (0, mitad))
+    suma = _sumas_moviles(np.pad(valores, relleno), periodo)[:, mitad:]
+    cuenta = _sumas_moviles(np.pad(validos.astype(float), relleno), periodo)[:, mitad:]
+    if periodo % 2 == 0:
+        # Ventana par: media de las dos ventanas vecinas
+        suma = (suma + np.pad(suma, ((0, 0), (1, 0)))[:, :-1]) / 2
+        cuenta = (cuenta + np.pad(cuenta, ((0, 0), (1, 0)))[:, :-1]) / 2
+    # Solo con la ventana completa (en los extremos no hay tendencia)
+    tendencia = np.where(cuenta >= periodo, suma / np.maximum(cuenta, 1), np.nan)
+
+    # Día del periodo de cada columna: con periodo 7, 0 = lunes (el día epoch 0 fue jueves)
+    fase = (np.asarray(dias) + 3) % periodo
+    sin_tendencia = y - tendencia
+    hay = ~np.isnan(sin_tendencia)
+    por_fase = np.zeros((len(y), periodo))
+    cuenta_fase = np.zeros((len(y), periodo))
+    np.add.at(por_fase.T, fase, np.where(hay, sin_tendencia, 0.0).T)
+    np.add.at(cuenta_fase.T, fase, hay.T.astype(float))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        medias = por_fase / cuenta_fase
+    # Centrada: la media de las fases con datos pasa a la tendencia
+    con_fase = cuenta_fase > 0
+    medias -= np.where(con_fase, medias, 0).sum(axis=1, keepdims=True) / np.maximum(con_fase.sum(axis=1, keepdims=True), 1)
+    estacional = np.where(validos, medias[:, fase], np.nan)
+    return tendencia, estacional, y - tendencia - estacional
+
+
+class PotenciaEmisiones:
+    """Potencia e intensidad por (país, día), y sus análisis por país."""
+
+    def __init__(self, potencia, intensidad, dias, paises, nombres):
+        self.potencia = potencia
+        self.intensidad = intensidad
+        self.dias = np.asarray(dias)
+        self.paises = list(paises)
+        self.nombres = list(nombres)
+        self.i_pais = {p: i for i, p in enumerate(self.paises)}
+        self.i_pais.update((n, i) for i, n in enumerate(self.nombres))
+
+        # Análisis de todos los países a la vez
+        self.pendiente, self.ordenada, self.r, self.pares = regresion(potencia, intensidad)
+        self.correlacion = correlacion_movil(potencia, intensidad)
+        self.tendencia, self.estacional, self.residuo = descomponer(intensidad, self.dias)
+
+    @classmethod
+    @trazas.medir('prep')
+    def desde(cls, emisiones, df_pot):
+        """Alinea la potencia de combined.csv (date, power, name) con un EmisionesPaises.
+
+        Solo se guardan los países con alguna potencia; las filas de días o
+        países que no están en las emisiones se descartan.
+        """
+        dias = pd.to_datetime(df_pot['date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+        pais = pd.Categorical(df_pot['name'], categories=emisiones.paises).codes
+        dia = np.searchsorted(emisiones.dias, dias)
+        filas = (pais >= 0) & (dia < len(emisiones.dias))
+        filas[filas] = emisiones.dias[dia[filas]] == dias[filas]
+
+        potencia = np.full(emisiones.medias.shape, np.nan)
+        potencia[pais[filas], dia[filas]] = df_pot['power'].to_numpy(dtype=float)[filas]
+        con_datos = np.flatnonzero(~np.isnan(potencia).all(axis=1))
+        return cls(potencia[con_datos], emisiones.medias[con_datos], emisiones.dias,
+                   [emisiones.paises[i] for i in con_datos], [emisiones.nombres[i] for i in con_datos])
+
+    @property
+    def fechas(self):
+        return pd.to_datetime(self.dias, unit='D').as_unit('ns')
+
+    @trazas.medir('filtro')
+    def resumen(self):
+        """Una fila por país: días, medias, pendiente, r y amplitud semanal de la intensidad."""
+        validos = ~np.isnan(self.potencia) & ~np.isnan(self.intensidad)
+        hay = self.pares > 0
+        potencia = np.where(hay, np.where(validos, self.potencia, 0).sum(axis=1) / np.maximum(self.pares, 1), np.nan)
+        intensidad = np.where(hay, np.where(validos, self.intensidad, 0).sum(axis=1) / np.maximum(self.pares, 1), np.nan)
+        amplitud = np.nanmax(self.estacional, axis=1, initial=-np.inf) - np.nanmin(self.estacional, axis=1, initial=np.inf)
+        return pd.DataFrame({
+            'país': self.nombres,
+            'días': self.pares,
+            'potencia media (MW)': potencia,
+            'intensidad media (gCO2eq/kWh)': intensidad,
+            # gCO2eq/kWh por cada GW más de potencia media
+            'pendiente (por GW)': self.pendiente * 1000,
+            'r': self.r,
+            'amplitud semanal (gCO2eq/kWh)': np.where(np.isfinite(amplitud), amplitud, np.nan),
+        })
+
+    @trazas.medir('filtro')
+    def pais(self, pais):
+        """Días con los dos valores de un país (date, power, value) y su recta (fitted)."""
+        i = self.i_pais[pais]
+        hay = ~np.isnan(self.potencia[i]) & ~np.isnan(self.intensidad[i])
+        return pd.DataFrame({
+            'date': self.fechas[hay],
+            'power': self.potencia[i, hay],
+            'value': self.intensidad[i, hay],
+            'fitted': self.ordenada[i] + self.pendiente[i] * self.potencia[i, hay],
+        })
+
+    @trazas.medir('filtro')
+    def correlacion_pais(self, pais):
+        """Correlación móvil de un país en los días en que se puede calcular (date, value)."""
+        i = self.i_pais[pais]
+        hay = ~np.isnan(self.correlacion[i])
+        return pd.DataFrame({'date': self.fechas[hay], 'value': self.correlacion[i, hay]})
+
+    @trazas.medir('filtro')
+    def descomposicion(self, pais):
+        """Intensidad observada, tendencia, componente semanal y residuo de un país (date, componente, value)."""
+        i = self.i_pais[pais]
+        componentes = {'observada': self.intensidad[i], 'tendencia': self.tendencia[i],
+                       'semanal': self.estacional[i], 'residuo': self.residuo[i]}
+        bloque = np.stack(list(componentes.values()), axis=1)
+        dia, componente = np.nonzero(~np.isnan(bloque))
+        return pd.DataFrame({
+            'date': self.fechas[dia],
+            'componente': pd.Categorical.from_codes(componente, categories=list(componentes)),
+            'value': bloque[dia, componente],
+        })
@@ -0,0 +1,140 @@
+# IMPORTS
+import numpy as np
+import pandas as pd
+
+from cubo import NS, POR_DIA, nivel_para
+import trazas
+
+
+
+#####################################################
+## Precios horarios por día y país (array denso)
+#####################################################
+
+# get_plot_precio_hora_eu convertía en cada llamada la columna name a una
+# categoría ordenada, ordenaba las filas y dejaba al navegador el pivotado de
+# la tabla del tooltip (transform_pivot). Aquí los precios del año se guardan
+# una vez, al cargar, en un array (día, hora del día, país) con los países en
+# un orden fijo: un día es una vista de 24 × países, ya pivotada, que
+# alimenta a la vez las líneas y la tabla del tooltip.
+#
+# El array sale de la matriz horaria del cubo de precios (cubo.py). Los días
+# son días UTC, como en el resto de consultas; si hay varios valores en una
+# hora (datos cuartohorarios) se guarda su media. Con datos de 15 o 5 minutos
+# se guarda además un array (día, periodo del día, país) por cada nivel más
+# fino del cubo, y ancho() elige el que cabe en el ancho del gráfico.
+
+# Orden de los países en los gráficos; los que no están aquí van detrás, por orden alfabético
+ORDEN_PAISES = ['Alemania', 'Bélgica', 'España', 'Francia', 'Italia', 'Países bajos', 'Portugal', 'Reino unido']
+
+# Puntos por serie de los gráficos de un día (el ancho del gráfico en píxeles)
+PUNTOS = 600
+
+
+def por_dia(cubo, total=False, nivel='hora'):
+    """(días epoch, array (día, periodo UTC, serie) con NaN sin datos, series) del cubo.
+
+    Los periodos son los de `nivel` ('hora', '15min' o '5min'). Con
+    total=True, una sola serie con la suma de las medias de todas en cada
+    periodo.
+    """
+    claves, suma, cuenta = cubo.nivel(nivel)
+    media = suma / np.maximum(cuenta, 1)
+    if total:
+        valores = np.where(cuenta.any(axis=1), media.sum(axis=1), np.nan)[:, None]
+        series = [None]
+    else:
+        valores = np.where(cuenta > 0, media, np.nan)
+        series = list(cubo.nombres)
+
+    periodos = POR_DIA[nivel]
+    dias, fila = np.unique(claves // periodos, return_inverse=True)
+    horas = np.full((len(dias), periodos, valores.shape[1]), np.nan)
+    horas[fila.ravel(), claves % periodos] = valores
+    return dias, horas, series
+
+
+def ordenar_paises(paises, orden=ORDEN_PAISES):
+    """Países de `orden` que están en `paises` y después el resto, alfabéticamente."""
+    return [p for p in orden if p in paises] + sorted(p for p in paises if p not in orden)
+
+
+class PreciosHorarios:
+    """Precio por (día, hora, país) en un array con índices por eje.
+
+    `periodos` tiene, además del nivel 'hora' (self.horas), los arrays de los
+    niveles más finos si los datos los tienen.
+    """
+
+    def __init__(self, horas, dias, paises, periodos=None):
+        self.horas = horas
+        self.periodos = dict(periodos or {}, hora=horas)
+        # Niveles disponibles, del más fino al horario
+        self.niveles = sorted(self.periodos, key=POR_DIA.get, reverse=True)
+        self.dias = np.asarray(dias)
+        self.paises = list(paises)
+        self.i_dia = {int(d): i for i, d in enumerate(self.dias)}
+        self.i_pais = {p: i for i, p in enumerate(self.paises)}
+
+    @classmethod
+    def desde_cubo(cls, cubo, orden=ORDEN_PAISES):
+        """Precios de cada día, hora y país del cubo, con los países en `orden`."""
+        dias, horas, series = por_dia(cubo)
+        paises = ordenar_paises(series, orden)
+        columnas = [series.index(p) for p in paises]
+        # Los niveles finos tienen los mismos días que el horario: salen de las mismas filas
+        periodos = {nivel: por_dia(cubo, nivel=nivel)[1][:, :, columnas]
+                    for nivel in cubo.niveles_dia()[:-2]}
+        return cls(horas[:, :, columnas], dias, paises, periodos)
+
+    def _dia(self, date):
+        return self.i_dia.get(int(np.datetime64(date, 'D').astype(np.int64)))
+
+    def tiene(self, date):
+        return self._dia(date) is not None
+
+    def dia(self, date, nivel='hora'):
+        """Bloque periodos × países de `date` (vista del array; None si no hay datos)."""
+        i = self._dia(date)
+        return None if i is None else self.periodos[nivel][i]
+
+    def _bloque(self, date, nivel):
+        # Periodos y países con algún dato del día, y sus instantes
+        bloque = self.dia(date, nivel)
+        if bloque is None:
+            bloque = np.empty((0, len(self.paises)))
+        hay = ~np.isnan(bloque)
+        filas = np.flatnonzero(hay.any(axis=1))
+        columnas = np.flatnonzero(hay.any(axis=0))
+        dia = int(np.datetime64(date, 'D').astype(np.int64))
+        instantes = pd.to_datetime((dia * POR_DIA[nivel] + filas) * NS[nivel], utc=True)
+        return bloque[np.ix_(filas, columnas)], instantes, [self.paises[c] for c in columnas]
+
+    def nivel_para(self, puntos=PUNTOS):
+        """Nivel más fino con a lo sumo `puntos` periodos en un día (como mínimo, 'hora')."""
+        return nivel_para(self.niveles, 1, puntos)
+
+    @trazas.medir('filtro')
+    def ancho(self, date, puntos=PUNTOS):
+        """Una fila por periodo y una columna por país (datetime, <país>...), ya pivotado.
+
+        El periodo es el del nivel más fino que cabe en `puntos` (nivel_para).
+        """
+        bloque, instantes, paises = self._bloque(date, self.nivel_para(puntos))
+        df = pd.DataFrame(bloque, columns=paises)
+        df.insert(0, 'datetime', instantes)
+        return df
+
+    @trazas.medir('filtro')
+    def rango(self, desde, hasta, paises=None):
+        """(datetime, name, value) de los días [desde, hasta) y `paises`, sin horas a NaN."""
+        paises = self.paises if paises is None else list(paises)
+        i, j = np.searchsorted(self.dias, [np.datetime64(desde, 'D').astype(np.int64),
+                                           np.datetime64(hasta, 'D').astype(np.int64)])
+        bloque = self.horas[i:j][:, :, [self.i_pais[p] for p in paises]]
+        dia, hora, pais = np.nonzero(~np.isnan(bloque))
+        return pd.DataFrame({
+            'datetime': pd.to_datetime((self.dias[i:j][dia] * 24 + hora) * NS['hora'], utc=True),
+            'name': pd.Categorical.from_codes(pais, categories=paises),
+            'value': bloque[dia, hora, pais],
+        })
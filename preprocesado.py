@@ -0,0 +1,171 @@
+# IMPORTS
+import numpy as np
+import pandas as pd
+
+import trazas
+
+
+
+# Preprocesamiento de los datos de cada gráfico del dashboard. Se mantiene fuera
+# de dashboard.py para poder reutilizar las mismas reglas desde la ingesta
+# (ingesta.py) sin ejecutar la aplicación de Streamlit.
+
+#####################################################
+## Normalización común (generación y precios)
+#####################################################
+
+# Los exportados de ESIOS repiten en cada fila el nombre completo del indicador
+# ("Generación medida Eólica", "Precio medio horario componente ...") y el
+# instante como texto. En lugar de convertir name a categoría y luego recortar
+# el texto fila a fila, los nombres se limpian una vez por id en una tabla
+# pequeña y cada fila guarda solo su código. Resultado:
+#   - id: int32
+#   - name: categoría (códigos compactos)
+#   - value: float32
+#   - datetime: datetime64[ns, UTC] (int64 por debajo)
+# Sin columna date: los gráficos diarios usan el índice por días (indice.py).
+
+def _datetime_utc(columna, mascara):
+    # Cada instante se repite una vez por tecnología/componente/país: se
+    # convierten solo los distintos y se reparten con sus códigos
+    codigos, unicos = pd.factorize(columna)
+    unicos = pd.DatetimeIndex(pd.to_datetime(unicos, utc = True))
+    return unicos.take(codigos[mascara], allow_fill=True, fill_value=pd.NaT)
+
+def normalizar(df, id_total, prefijo, capitalizar=False):
+    # Elimino la categoria total con una máscara booleana
+    ids = df['id'].to_numpy()
+    mascara = ids != id_total
+    ids = ids[mascara]
+
+    # Tabla id -> nombre limpio (una fila por id): el texto solo se lee y se
+    # recorta en la primera aparición de cada id
+    valores_id, primeras, inversa = np.unique(ids, return_index=True, return_inverse=True)
+    nombres = df['name'].iloc[np.flatnonzero(mascara)[primeras]].reset_index(drop=True).str.slice(prefijo)
+    if capitalizar:
+        nombres = nombres.str.capitalize()
+
+    # Varios ids podrían compartir nombre limpio: las categorías no se repiten
+    codigos_nombre, categorias = pd.factorize(nombres)
+    name = pd.Categorical.from_codes(codigos_nombre[inversa.ravel()], categories=categorias)
+
+    return pd.DataFrame({
+        'id': ids.astype(np.int32),
+        'name': name,
+        'value': pd.to_numeric(df['value']).to_numpy()[mascara].astype(np.float32),
+        'datetime': _datetime_utc(df['datetime'], mascara),
+    })
+
+
+###################################
+# Gráfico A.1: Generación eléctrica por tecnologías en España
+###################################
+
+@trazas.medir('prep')
+def prep_g1(df_G):
+    # Elimino la categoria total (no es relevante en este caso) y adapto nombres
+    return normalizar(df_G, 10195, 18)
+
+
+###################################
+# Gráfico A.3: Generación eléctrica por tecnologías en España (anual)
+###################################
+
+@trazas.medir('prep')
+def prep_g3(df):
+    return agregar_g3(prep_g1(df))
+
+# Proporción anual por tecnología a partir de datos ya limpios (sirve también
+# sobre las sumas mensuales de agregar_g4)
+def agregar_g3(df):
+    df = df.groupby('name', observed=True)['value'].sum().sort_values(ascending=False).reset_index()
+
+    # Calcular la suma total de la columna 'value'
+    total_sum = df['value'].sum()
+
+    # Normalizar la columna 'value' a un 100%
+    df['value_normalized'] = (df['value'] / total_sum)
+    
+    return df
+
+
+###################################
+# Gráfico A.4: Generación eléctrica por tecnologías en España (mensual)
+###################################
+
+@trazas.medir('prep')
+def prep_g4(df):
+    return agregar_g4(prep_g1(df))
+
+# Suma mensual por tecnología a partir de datos ya limpios
+def agregar_g4(df):
+    # Creo una columna llamada Month (sin modificar df, que puede venir de la caché)
+    month = pd.to_datetime(df['datetime'], utc = True).dt.month.rename('month')
+    df = df.groupby([month, 'name'], observed=True).agg({'value': 'sum'}).reset_index()
+
+    return df
+
+
+###################################
+# Gráfico B.1: Desglose horario de precio España
+###################################
+
+@trazas.medir('prep')
+def prep_b1(df):
+    # Limpieza de datos: sin el total y con el nombre del componente
+    return normalizar(df, 10211, 32, capitalizar=True)
+
+
+###################################
+# Gráfico B.2: Desglose horario de precio EU
+###################################
+
+@trazas.medir('prep')
+def prep_b2(df):
+    # Limpieza de datos: sin el total y con el nombre del país
+    return normalizar(df, 1001, 27, capitalizar=True)
+
+
+###################################
+# Gráfico C.1: Emisiones medias diarias
+###################################
+
+@trazas.medir('prep')
+def prep_c1(df):
+    return agregar_c1(normalizar_c1(df))
+
+# Paso de formato ancho (una columna por país) a una fila por hora y país
+@trazas.medir('prep')
+def normalizar_c1(df):
+    # Convertir la columna datetime a tipo datetime
+    df['datetime'] = pd.to_datetime(df['datetime'], utc = True) 
+    df['date'] = df['datetime'].dt.date
+    
+    df = pd.melt(df, id_vars=['datetime', 'date'], var_name='name', value_name='value')
+
+    return df
+
+# Media diaria por país a partir de los datos horarios ya fundidos
+@trazas.medir('prep')
+def agregar_c1(df):
+    # date se calcula a partir de datetime si no viene (datos del almacén)
+    date = df['date'] if 'date' in df else df['datetime'].dt.date.rename('date')
+    df_emis_avg = df.groupby([date, 'name']).agg({'value': 'mean'}).reset_index()
+    df_emis_avg['date'] = pd.to_datetime(df_emis_avg['date'])
+    
+    return df_emis_avg
+
+
+###################################
+# Gráfico C.2: Emisiones medias diarias (mapa)
+###################################
+
+@trazas.medir('prep')
+def prep_c2(df_emis_avg, df_pot):
+    
+    # Convertir la columna date tipo datetime
+    df_pot['date'] = pd.to_datetime(df_pot['date'])
+    
+    result_df = pd.merge(df_emis_avg, df_pot, on=['date', 'name'], how='inner')
+
+    return result_df
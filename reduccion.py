@@ -0,0 +1,135 @@
+# IMPORTS
+import numpy as np
+import pandas as pd
+
+import trazas
+
+
+
+#####################################################
+## Reducción de los datos que se incrustan en los gráficos
+#####################################################
+
+# Altair copia todas las filas del DataFrame en la especificación Vega-Lite que
+# se envía al navegador, aunque la codificación agregue después (sum(value),
+# transform_pivot...). Los get_plot_* pasan sus datos por aquí antes de crear
+# el gráfico:
+#
+#   - solo se conservan las columnas que usa la codificación,
+#   - si una serie supera el presupuesto de puntos se reduce (LTTB para
+#     líneas, medias por tramos para áreas apiladas),
+#   - se comprueba que el tamaño estimado de los datos no supera LIMITE_BYTES.
+
+# Puntos por gráfico (el límite de filas por defecto de Altair es 5000)
+PRESUPUESTO = 5000
+
+# Tamaño máximo de los datos incrustados en un gráfico
+LIMITE_BYTES = 1_000_000
+
+# Por debajo de este presupuesto no se sigue reduciendo para cumplir el límite
+_PRESUPUESTO_MINIMO = 100
+
+
+class CargaExcesiva(ValueError):
+    """Los datos de un gráfico superan LIMITE_BYTES incluso tras reducirlos."""
+
+
+def _numerico(valores):
+    # Eje x como float (los datetime como nanosegundos)
+    valores = pd.Series(valores)
+    if isinstance(valores.dtype, pd.DatetimeTZDtype):
+        valores = valores.dt.tz_convert('UTC').dt.tz_localize(None)
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        return valores.astype('datetime64[ns]').to_numpy().astype(np.int64).astype(float)
+    return valores.to_numpy(dtype=float)
+
+
+def lttb(x, y, n):
+    """Posiciones de los n puntos que elige Largest-Triangle-Three-Buckets.
+
+    x debe estar ordenado. Se conservan el primer y el último punto; de cada
+    tramo intermedio se toma el punto que forma el triángulo de mayor área con
+    el punto elegido en el tramo anterior y la media del tramo siguiente.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if n >= len(x):
+        return np.arange(len(x))
+    if n < 3:
+        return np.array([0, len(x) - 1])[:n]
+
+    # Límites de los n - 2 tramos intermedios sobre los puntos 1..len-2
+    limites = np.linspace(1, len(x) - 1, n - 1).astype(np.int64)
+    seleccion = np.empty(n, np.int64)
+    seleccion[0], seleccion[-1] = 0, len(x) - 1
+
+    anterior = 0
+    for k in range(n - 2):
+        inicio, fin = limites[k], limites[k + 1]
+        # Media del tramo siguiente (el último punto para el último tramo)
+        sig_inicio, sig_fin = fin, limites[k + 2] if k + 2 < len(limites) else len(x)
+        mx, my = x[sig_inicio:sig_fin].mean(), y[sig_inicio:sig_fin].mean()
+
+        ax, ay = x[anterior], y[anterior]
+        areas = np.abs((ax - mx) * (y[inicio:fin] - ay) - (ax - x[inicio:fin]) * (my - ay))
+        anterior = inicio + int(np.argmax(areas))
+        seleccion[k + 1] = anterior
+    return seleccion
+
+
+def reducir_lineas(df, x, y, serie, presupuesto=PRESUPUESTO):
+    """Reduce cada serie de un gráfico de líneas (LTTB) a su parte del presupuesto."""
+    if len(df) <= presupuesto:
+        return df
+    df = df.sort_values([serie, x], kind='stable')
+    grupos = df.groupby(serie, observed=True, sort=False, dropna=False).indices
+    por_serie = max(presupuesto // max(len(grupos), 1), 3)
+
+    posiciones = []
+    for filas in grupos.values():
+        elegidos = lttb(_numerico(df[x].iloc[filas]), df[y].iloc[filas], por_serie)
+        posiciones.append(filas[elegidos])
+    return df.iloc[np.sort(np.concatenate(posiciones))].reset_index(drop=True)
+
+
+def reducir_apiladas(df, x, y, serie, presupuesto=PRESUPUESTO):
+    """Medias por tramos de x comunes a todas las series (áreas apiladas).
+
+    Las series apiladas tienen que compartir los valores de x, así que en lugar
+    de elegir puntos por serie se agrupan instantes consecutivos.
+    """
+    instantes = np.unique(df[x].to_numpy())
+    series = df[serie].nunique()
+    if len(instantes) * series <= presupuesto:
+        return df
+
+    paso = -(-len(instantes) * series // presupuesto)
+    tramo = np.searchsorted(instantes, df[x].to_numpy()) // paso
+    # Cada tramo se representa en su primer instante
+    reducido = df.groupby([tramo, serie], observed=True, sort=True, dropna=False).agg({x: 'first', y: 'mean'})
+    return reducido.reset_index(level=serie).reset_index(drop=True)[list(df.columns)]
+
+
+def tamano(df):
+    """Tamaño aproximado en bytes de df tal como se incrusta en la especificación."""
+    return len(df.to_json(orient='records', date_format='iso'))
+
+
+@trazas.medir('filtro')
+def datos(df, columnas, reducir=None, presupuesto=PRESUPUESTO, limite=LIMITE_BYTES):
+    """Datos listos para alt.Chart: columnas usadas, reducidos y dentro del límite.
+
+    `reducir(df, presupuesto)` es la reducción del gráfico (o None si el número
+    de filas ya está acotado). Si los datos reducidos superan `limite` se vuelve
+    a reducir con un presupuesto proporcionalmente menor.
+    """
+    df = df[columnas]
+    reducido = reducir(df, presupuesto) if reducir else df
+    bytes_ = tamano(reducido)
+    while bytes_ > limite and reducir and presupuesto > _PRESUPUESTO_MINIMO:
+        presupuesto = max(int(presupuesto * limite / bytes_ * 0.9), _PRESUPUESTO_MINIMO)
+        reducido = reducir(df, presupuesto)
+        bytes_ = tamano(reducido)
+    if bytes_ > limite:
+        raise CargaExcesiva('%d bytes de datos en el gráfico (límite %d)' % (bytes_, limite))
+    return reducido
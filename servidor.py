@@ -0,0 +1,169 @@
+# IMPORTS
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import carga
+import consultas
+import fuentes
+import vigilancia
+
+
+
+#####################################################
+## API HTTP de consultas (JSON)
+#####################################################
+
+# Servidor HTTP local (solo biblioteca estándar) de las consultas de
+# consultas.py, para herramientas que necesitan las mismas cifras que el
+# dashboard sin Streamlit:
+#
+#   GET /api                                   consultas disponibles y sus parámetros
+#   GET /api/<consulta>?desde=...&paises=...   resultado en JSON
+#
+# Cada respuesta lleva un ETag que depende de la consulta, de sus parámetros
+# y de la versión de los datos: con If-None-Match y el mismo ETag se responde
+# 304 sin cuerpo. Si el cliente acepta gzip, se envía la versión comprimida
+# que consultas.py ya guarda junto al JSON, con su propio ETag (terminado en
+# -gzip). Conexiones persistentes
+# (HTTP/1.1), un hilo por conexión.
+#
+# Errores: 404 consulta desconocida, 400 parámetro no válido, 503 si faltan
+# los ficheros de datos y 500 con cualquier otro fallo de la consulta.
+#
+# Uso (desde la raíz del repositorio):
+#   python servidor.py --puerto 8502
+#   curl 'http://127.0.0.1:8502/api/precios_eu?desde=2023-03-01&hasta=2023-03-02&paises=España,Francia'
+
+# Por debajo de este tamaño no compensa comprimir
+MINIMO_GZIP = 1024
+
+
+def _acepta_gzip(cabecera):
+    # "gzip" en Accept-Encoding salvo con q=0
+    for codificacion in (cabecera or '').split(','):
+        nombre, _, calidad = codificacion.partition(';')
+        if nombre.strip() == 'gzip':
+            try:
+                return float(calidad.strip().removeprefix('q=') or 1) > 0
+            except ValueError:
+                return True
+    return False
+
+
+def _coincide(cabecera, etag):
+    # If-None-Match: lista de ETags (débiles o no) o *
+    etiquetas = [e.strip() for e in (cabecera or '').split(',')]
+    return '*' in etiquetas or any((e[2:] if e.startswith('W/') else e) == etag for e in etiquetas)
+
+
+def catalogo():
+    """Consultas disponibles: descripción y parámetros."""
+    return {nombre: {'descripcion': c.descripcion, 'parametros': list(c.parametros)}
+            for nombre, c in consultas.CONSULTAS.items()}
+
+
+class Manejador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Cabeceras y cuerpo se escriben por separado: sin TCP_NODELAY cada
+    # respuesta esperaría al ACK retardado del cliente (~40 ms)
+    disable_nagle_algorithm = True
+    registro = False
+
+    def do_GET(self):
+        # Con vigilancia.py, toda la petición usa la misma versión de los datos
+        carga.fijar()
+        url = urlsplit(self.path)
+        partes = [p for p in url.path.split('/') if p]
+        if partes in ([], ['api']):
+            return self._json(200, catalogo())
+        if len(partes) != 2 or partes[0] != 'api':
+            return self._json(404, {'error': 'Ruta desconocida: %s' % url.path})
+        if partes[1] not in consultas.CONSULTAS:
+            return self._json(404, {'error': 'Consulta desconocida: %s' % partes[1],
+                                    'consultas': list(consultas.CONSULTAS)})
+
+        # Un valor por parámetro (el último si se repite)
+        parametros = {p: v[-1] for p, v in parse_qs(url.query).items()}
+        try:
+            resultado = consultas.obtener(partes[1], parametros)
+        except consultas.ParametroInvalido as e:
+            return self._json(400, {'error': str(e)})
+        except OSError as e:
+            return self._json(503, {'error': 'No se han podido cargar los datos: %s' % e})
+        except Exception as e:
+            # Sin respuesta el cliente solo vería la conexión cerrada
+            return self._json(500, {'error': 'Error en la consulta: %s: %s' % (type(e).__name__, e)})
+
+        comprimir = len(resultado.cuerpo) >= MINIMO_GZIP and _acepta_gzip(self.headers.get('Accept-Encoding'))
+        cabeceras = {'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if resultado.etag is not None:
+            # El cuerpo con gzip es otra representación: su ETag (fuerte) es otro
+            cabeceras['ETag'] = resultado.etag[:-1] + '-gzip"' if comprimir else resultado.etag
+            if _coincide(self.headers.get('If-None-Match'), cabeceras['ETag']):
+                return self._enviar(304, b'', cabeceras)
+
+        cuerpo = resultado.cuerpo
+        if comprimir:
+            cuerpo = resultado.comprimido
+            cabeceras['Content-Encoding'] = 'gzip'
+        self._enviar(200, cuerpo, dict(cabeceras, **{'Content-Type': 'application/json; charset=utf-8'}))
+
+    def _json(self, estado, valor):
+        self._enviar(estado, json.dumps(valor, ensure_ascii=False).encode('utf-8'),
+                     {'Content-Type': 'application/json; charset=utf-8'})
+
+    def _enviar(self, estado, cuerpo, cabeceras):
+        self.send_response(estado)
+        for nombre, valor in cabeceras.items():
+            self.send_header(nombre, valor)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        if cuerpo:
+            self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        if self.registro:
+            super().log_message(formato, *args)
+
+
+class Servidor(ThreadingHTTPServer):
+    # Cola de conexiones pendientes mayor que la de socketserver (5): con más
+    # clientes a la vez el kernel descartaría conexiones (reintento en 1 s)
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def crear(host='127.0.0.1', puerto=8502, registro=False):
+    """Servidor (sin arrancar) en host:puerto; puerto 0 elige uno libre."""
+    manejador = type('Manejador', (Manejador,), {'registro': registro})
+    return Servidor((host, puerto), manejador)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API HTTP (JSON) de las consultas del dashboard')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8502)
+    parser.add_argument('--sin-precarga', action='store_true', help='No cargar las fuentes del último año al arrancar')
+    parser.add_argument('--registro', action='store_true', help='Mostrar cada petición')
+    parser.add_argument('--vigilar', action='store_true', help='Incorporar en segundo plano los ficheros nuevos de Datos/')
+    args = parser.parse_args()
+
+    servidor = crear(args.host, args.puerto, args.registro)
+    if not args.sin_precarga:
+        # En segundo plano (cargador.py): el servidor responde mientras tanto
+        fuentes.precargar(fuentes.anios_disponibles()[-1])
+    if args.vigilar:
+        vigilancia.arrancar()
+    print('Consultas en http://%s:%d/api' % servidor.server_address[:2])
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
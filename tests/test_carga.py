@@ -0,0 +1,121 @@
+# IMPORTS
+import os
+import threading
+
+import pytest
+
+import carga
+
+
+@pytest.fixture
+def fichero(tmp_path):
+    ruta = str(tmp_path / 'datos.csv')
+    with open(ruta, 'w') as f:
+        f.write('a\n1\n')
+    yield ruta
+    carga.invalidar()
+    carga.vigilar(False)
+    carga.fijar()
+
+
+def _contador():
+    llamadas = []
+
+    def construir():
+        llamadas.append(1)
+        return object()
+    return llamadas, construir
+
+
+def _tocar(ruta, contenido=None):
+    # Cambia el mtime (y el contenido si se indica)
+    if contenido is not None:
+        with open(ruta, 'w') as f:
+            f.write(contenido)
+    st = os.stat(ruta)
+    os.utime(ruta, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_obtener_reutiliza_mientras_no_cambie_el_contenido(fichero):
+    llamadas, construir = _contador()
+    valor = carga.obtener(('prueba', fichero), [fichero], construir)
+    assert carga.obtener(('prueba', fichero), [fichero], construir) is valor
+
+    # Mismo contenido con otro mtime: sigue valiendo (y se actualiza la huella)
+    _tocar(fichero)
+    assert carga.obtener(('prueba', fichero), [fichero], construir) is valor
+    assert len(llamadas) == 1
+
+    # Contenido distinto: se vuelve a construir
+    _tocar(fichero, 'a\n2\n')
+    nuevo = carga.obtener(('prueba', fichero), [fichero], construir)
+    assert nuevo is not valor
+    assert len(llamadas) == 2
+    assert carga.version(nuevo) == carga.version_rutas([fichero]) != carga.version(valor)
+
+
+def test_huella_reutiliza_el_hash(fichero, monkeypatch):
+    previa = carga.huella(fichero)
+    monkeypatch.setattr(carga, '_hash_contenido', lambda ruta: pytest.fail('no debería leer el fichero'))
+    assert carga.huella(fichero, previa) is previa
+
+
+def test_transaccion_publica_todo_al_salir(fichero):
+    carga.reemplazar(('a', fichero), [fichero], 'a0')
+    carga.reemplazar(('b', fichero), [fichero], 'b0')
+
+    def desde_otro_hilo():
+        resultado = {}
+        hilo = threading.Thread(target=lambda: resultado.update(
+            a=carga.actual(('a', fichero)), b=carga.actual(('b', fichero))))
+        hilo.start()
+        hilo.join()
+        return resultado
+
+    with carga.transaccion() as cambios:
+        carga.reemplazar(('a', fichero), [fichero], 'a1')
+        carga.descartar([('b', fichero)])
+        # Este hilo ve lo pendiente; los demás, la versión publicada
+        assert carga.actual(('a', fichero)) == 'a1'
+        assert carga.actual(('b', fichero)) is None
+        assert desde_otro_hilo() == {'a': 'a0', 'b': 'b0'}
+    assert set(cambios) == {('a', fichero), ('b', fichero)}
+    assert desde_otro_hilo() == {'a': 'a1', 'b': None}
+
+
+def test_transaccion_con_error_no_publica(fichero):
+    carga.reemplazar(('a', fichero), [fichero], 'a0')
+    with pytest.raises(RuntimeError):
+        with carga.transaccion():
+            carga.reemplazar(('a', fichero), [fichero], 'a1')
+            raise RuntimeError('fallo')
+    assert carga.actual(('a', fichero)) == 'a0'
+
+
+def test_version_fijada_no_comprueba_ficheros(fichero):
+    llamadas, construir = _contador()
+    valor = carga.obtener(('prueba', fichero), [fichero], construir)
+    carga.vigilar(True)
+    carga.fijar()
+    _tocar(fichero, 'a\n3\n')
+    assert carga.obtener(('prueba', fichero), [fichero], construir) is valor
+
+    # Lo publica otro hilo (vigilancia.py); se ve a partir del siguiente fijar()
+    def publicar():
+        with carga.transaccion():
+            carga.reemplazar(('prueba', fichero), [fichero], 'nuevo')
+    hilo = threading.Thread(target=publicar)
+    hilo.start()
+    hilo.join()
+    assert carga.obtener(('prueba', fichero), [fichero], construir) is valor
+    carga.fijar()
+    assert carga.obtener(('prueba', fichero), [fichero], construir) == 'nuevo'
+    assert len(llamadas) == 1
+
+
+def test_descartar_cambiadas(fichero):
+    carga.reemplazar(('a', fichero), [fichero], 'a0')
+    assert carga.descartar_cambiadas() == []
+    _tocar(fichero)
+    assert carga.descartar_cambiadas() == [('a', fichero)]
+    assert carga.actual(('a', fichero)) is None
@@ -0,0 +1,62 @@
+# IMPORTS
+import threading
+
+import pytest
+
+import cargador
+from cargador import Etapa
+
+
+def test_dependientes_de_una_etapa_fallida_no_se_ejecutan():
+    ejecutadas = []
+
+    def etapa(nombre, error=False):
+        def funcion():
+            ejecutadas.append(nombre)
+            if error:
+                raise OSError('sin fichero')
+            return nombre
+        return funcion
+
+    resultados = cargador.ejecutar([
+        Etapa('a', etapa('a', error=True), ()),
+        Etapa('b', etapa('b'), ('a',)),
+        Etapa('c', etapa('c'), ('b',)),
+        Etapa('d', etapa('d'), ()),
+    ])
+    assert sorted(ejecutadas) == ['a', 'd']
+    assert isinstance(resultados['a'].error, OSError)
+    assert isinstance(resultados['b'].error, cargador.DependenciaFallida)
+    assert isinstance(resultados['c'].error, cargador.DependenciaFallida)
+    assert resultados['d'].ok and resultados['d'].valor == 'd'
+
+
+def test_respeta_dependencias_y_ejecuta_a_la_vez_las_independientes():
+    # a y b solo terminan si se ejecutan a la vez; c necesita las dos
+    barrera = threading.Barrier(2, timeout=10)
+    resultados = cargador.ejecutar([
+        Etapa('a', lambda: barrera.wait() or 'a', ()),
+        Etapa('b', lambda: barrera.wait() or 'b', ()),
+        Etapa('c', lambda: 'c', ('a', 'b')),
+    ])
+    assert all(r.ok for r in resultados.values())
+    assert resultados['c'].inicio >= max(resultados['a'].fin, resultados['b'].fin)
+
+
+def test_sin_etapas():
+    assert cargador.ejecutar([]) == {}
+
+
+@pytest.mark.parametrize('etapas', [
+    [Etapa('a', int, ('b',)), Etapa('b', int, ('a',))],
+    [Etapa('a', int, ('a',))],
+    [Etapa('a', int, ()), Etapa('b', int, ('c',)), Etapa('c', int, ('d',)), Etapa('d', int, ('b',))],
+])
+def test_rechaza_ciclos(etapas):
+    with pytest.raises(ValueError, match='circulares'):
+        cargador.Carga(etapas)
+
+
+def test_rechaza_dependencias_desconocidas():
+    with pytest.raises(ValueError, match='desconocidas'):
+        cargador.Carga([Etapa('a', int, ('x',))])
@@ -0,0 +1,101 @@
+# IMPORTS
+import datetime as dt
+import gzip
+import http.client
+import json
+import threading
+
+import pytest
+
+import consultas
+import fuentes
+import servidor
+
+
+@pytest.fixture
+def anios(monkeypatch):
+    monkeypatch.setattr(fuentes, 'anios_disponibles', lambda: [2022, 2023])
+
+
+def test_normalizar_valores_por_defecto(anios):
+    valores = consultas.normalizar('precios_eu', {'paises': 'España, Francia,,España'})
+    assert valores == {'anio': 2023, 'desde': dt.date(2023, 1, 1), 'hasta': dt.date(2024, 1, 1),
+                       'paises': ('España', 'Francia')}
+
+
+def test_normalizar_anio_del_rango(anios):
+    valores = consultas.normalizar('precios_eu', {'desde': '2022-03-01', 'hasta': '2022-03-02'})
+    assert valores == {'anio': 2022, 'desde': dt.date(2022, 3, 1), 'hasta': dt.date(2022, 3, 2)}
+    assert consultas.normalizar('precios_eu', {'hasta': '2023-01-01'})['anio'] == 2022
+
+
+@pytest.mark.parametrize('nombre, parametros', [
+    ('generacion_mensual', {'desde': '2023-01-01'}),
+    ('precios_eu', {'anio': 'dos mil'}),
+    ('precios_eu', {'anio': '2019'}),
+    ('precios_eu', {'desde': '2023-13-01'}),
+    ('precios_eu', {'desde': '2023-03-02', 'hasta': '2023-03-01'}),
+    ('precios_eu', {'anio': '2023', 'desde': '2022-03-01', 'hasta': '2022-03-02'}),
+    ('precios_eu', {'desde': '2022-12-31', 'hasta': '2023-01-02'}),
+    ('estadisticas_precio', {'fuente': 'precio_fr'}),
+    ('estadisticas_precio', {'estadisticas': 'media,moda'}),
+])
+def test_normalizar_rechaza_parametros(anios, nombre, parametros):
+    with pytest.raises(consultas.ParametroInvalido):
+        consultas.normalizar(nombre, parametros)
+
+
+def test_paises_por_codigo_o_nombre():
+    # Emisiones (por código) y precios (por nombre) admiten los dos
+    assert consultas._paises(['DE', 'ES'], ('ES', 'España', 'Alemania')) == ['ES', 'DE']
+    assert consultas._paises(['Alemania', 'España'], ('ES', 'España')) == ['España']
+    assert consultas._paises(['DE', 'ES'], ()) == ['DE', 'ES']
+    with pytest.raises(consultas.ParametroInvalido):
+        consultas._paises(['DE', 'ES'], ('FR',))
+
+
+@pytest.fixture
+def http_servidor():
+    http_servidor = servidor.crear('127.0.0.1', 0)
+    hilo = threading.Thread(target=http_servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield http_servidor
+    http_servidor.shutdown()
+    http_servidor.server_close()
+
+
+def _pedir(http_servidor, ruta, cabeceras=None):
+    conexion = http.client.HTTPConnection(*http_servidor.server_address[:2], timeout=10)
+    conexion.request('GET', ruta, headers=cabeceras or {})
+    respuesta = conexion.getresponse()
+    cuerpo = respuesta.read()
+    conexion.close()
+    return respuesta, cuerpo
+
+
+def test_servidor_responde_500_con_errores_inesperados(monkeypatch, http_servidor):
+    def fallar(nombre, parametros):
+        raise RuntimeError('fallo')
+    monkeypatch.setattr(consultas, 'obtener', fallar)
+
+    respuesta, cuerpo = _pedir(http_servidor, '/api/precios_eu')
+    assert respuesta.status == 500
+    assert 'RuntimeError' in json.loads(cuerpo)['error']
+
+
+def test_servidor_etag_distinto_con_gzip(monkeypatch, http_servidor):
+    cuerpo = json.dumps(list(range(1000))).encode()
+    resultado = consultas.Resultado(cuerpo, gzip.compress(cuerpo), 'v1', '"abc"')
+    monkeypatch.setattr(consultas, 'obtener', lambda nombre, parametros: resultado)
+
+    plano, _ = _pedir(http_servidor, '/api/precios_eu')
+    comprimido, datos = _pedir(http_servidor, '/api/precios_eu', {'Accept-Encoding': 'gzip'})
+    assert comprimido.getheader('Content-Encoding') == 'gzip' and gzip.decompress(datos) == cuerpo
+    assert plano.getheader('ETag') == '"abc"'
+    assert comprimido.getheader('ETag') == '"abc-gzip"'
+
+    # Cada ETag solo valida su propia representación
+    assert _pedir(http_servidor, '/api/precios_eu', {'If-None-Match': '"abc"'})[0].status == 304
+    assert _pedir(http_servidor, '/api/precios_eu', {'If-None-Match': '"abc-gzip"'})[0].status == 200
+    assert _pedir(http_servidor, '/api/precios_eu', {'If-None-Match': '"abc-gzip"',
+                                                     'Accept-Encoding': 'gzip'})[0].status == 304
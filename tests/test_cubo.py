@@ -0,0 +1,140 @@
+# IMPORTS
+import numpy as np
+import pandas as pd
+import pytest
+
+from cubo import Cubo
+
+
+def _filas(inicio, periodos, freq, series=('Eólica', 'Solar'), semilla=0):
+    # Filas normalizadas (datetime UTC, name, value) con algún NaN
+    rng = np.random.default_rng(semilla)
+    fechas = pd.date_range(inicio, periods=periodos, freq=freq, tz='UTC')
+    df = pd.DataFrame({
+        'datetime': np.repeat(fechas, len(series)),
+        'name': np.tile(series, periodos),
+        'value': rng.uniform(0, 100, periodos * len(series)),
+    })
+    df.loc[rng.choice(len(df), len(df) // 10, replace=False), 'value'] = np.nan
+    return df
+
+
+def _esperado(df, periodo, media):
+    # Referencia con groupby (los NaN no cuentan)
+    agrupado = df.groupby([df['datetime'].dt.tz_convert(None).dt.floor(periodo), 'name'])['value']
+    resultado = (agrupado.mean() if media else agrupado.sum(min_count=1)).dropna()
+    return resultado.rename_axis(['datetime', 'name'])
+
+
+def _nivel(cubo, nivel, media):
+    claves, suma, cuenta = cubo.nivel(nivel)
+    valores = suma / np.maximum(cuenta, 1) if media else suma
+    fila, col = np.nonzero(cuenta)
+    unidad = {'hora': 'h', 'dia': 'D'}[nivel]
+    indice = pd.MultiIndex.from_arrays([pd.to_datetime(claves[fila], unit=unidad).as_unit('ns'),
+                                        np.array(cubo.nombres)[col]], names=['datetime', 'name'])
+    return pd.Series(valores[fila, col], index=indice, name='value').sort_index()
+
+
+@pytest.mark.parametrize('media', [False, True])
+def test_niveles_como_groupby(media):
+    df = _filas('2023-03-25', 24 * 10, '1h')
+    cubo = Cubo.desde(df)
+    for nivel, periodo in (('hora', 'h'), ('dia', 'D')):
+        pd.testing.assert_series_equal(_nivel(cubo, nivel, media), _esperado(df, periodo, media).sort_index(),
+                                       check_names=False, check_index_type=False)
+
+
+def test_nan_no_cuenta():
+    df = pd.DataFrame({
+        'datetime': pd.date_range('2023-01-01', periods=3, freq='1h', tz='UTC'),
+        'name': 'ES',
+        'value': [100.0, np.nan, 200.0],
+    })
+    cubo = Cubo.desde(df)
+    assert cubo.medias_diarias()['value'].tolist() == [150.0]
+    assert cubo.diario('2023-01-01')['value'].tolist() == [300.0]
+
+
+def test_mes_y_anio():
+    df = _filas('2022-12-30', 24 * 40, '1h')
+    cubo = Cubo.desde(df)
+    mensual = cubo.mensual(2023).set_index(['month', 'name'])['value']
+    meses = df[df['datetime'].dt.year == 2023]
+    esperado = meses.groupby([meses['datetime'].dt.month, 'name'])['value'].sum()
+    np.testing.assert_allclose(mensual.sort_index().to_numpy(), esperado.sort_index().to_numpy())
+
+
+def test_rangos():
+    df = _filas('2023-01-01', 24 * 60, '1h')
+    cubo = Cubo.desde(df)
+    desde, hasta = pd.Timestamp('2023-01-10'), pd.Timestamp('2023-02-03')
+    tramo = df[(df['datetime'] >= desde.tz_localize('UTC')) & (df['datetime'] < hasta.tz_localize('UTC'))]
+
+    suma, cuenta, periodos = cubo.totales(desde.date(), hasta.date())
+    esperado = tramo.groupby('name')['value'].agg(['sum', 'count'])
+    np.testing.assert_allclose(suma, esperado['sum'].loc[cubo.nombres])
+    np.testing.assert_array_equal(cuenta, esperado['count'].loc[cubo.nombres])
+    assert periodos == 24
+
+    medias = cubo.medias(desde.date(), hasta.date()).set_index('name')['value']
+    np.testing.assert_allclose(medias.loc[cubo.nombres], tramo.groupby('name')['value'].mean().loc[cubo.nombres])
+
+    diario = cubo.diario_rango(desde.date(), hasta.date(), media=True).set_index(['date', 'name'])['value']
+    referencia = tramo.groupby([tramo['datetime'].dt.tz_convert(None).dt.floor('D'), 'name'])['value'].mean()
+    np.testing.assert_allclose(diario.sort_index().to_numpy(), referencia.sort_index().to_numpy())
+
+
+def test_anadir_desordenado_igual_que_de_una_vez():
+    df = _filas('2023-01-01', 24 * 20, '1h')
+    partes = Cubo.desde(df.iloc[len(df) // 2:]).anadir(df.iloc[:len(df) // 2])
+    entero = Cubo.desde(df)
+    for nivel in ('hora', 'dia', 'mes'):
+        for a, b in zip(partes.nivel(nivel), entero.nivel(nivel)):
+            np.testing.assert_allclose(a, b)
+
+
+def test_refinar_a_cuartohorario():
+    # Horario y después cuartohorario: el nivel base baja a 15 minutos y las
+    # horas siguen siendo las de las filas de las dos resoluciones
+    horario = _filas('2023-01-01', 24, '1h', semilla=1)
+    cuartos = _filas('2023-01-02', 96, '15min', semilla=2)
+    cubo = Cubo.desde(horario).anadir(cuartos)
+    assert cubo.base == '15min'
+    assert cubo.niveles_dia() == ('15min', 'hora', 'dia')
+
+    todas = pd.concat([horario, cuartos], ignore_index=True)
+    for nivel, periodo in (('hora', 'h'), ('dia', 'D')):
+        pd.testing.assert_series_equal(_nivel(cubo, nivel, True), _esperado(todas, periodo, True).sort_index(),
+                                       check_names=False, check_index_type=False)
+
+    # Las horas del primer día quedan en el minuto 0 de su hora
+    claves, _, cuenta = cubo.nivel('15min')
+    primer_dia = claves[claves < 96 * (pd.Timestamp('2023-01-02').value // (86400 * 10**9))]
+    assert (primer_dia % 4 == 0).all()
+
+    # Pero a 15 minutos el día horario se da por horas (no la hora entera en un cuarto)
+    for desde, hasta in (('2023-01-01', '2023-01-02'), ('2023-01-01', '2023-01-03')):
+        serie = cubo.serie(desde, hasta, '15min')
+        dia = serie[serie['datetime'] < pd.Timestamp('2023-01-02', tz='UTC')].set_index(['datetime', 'name'])
+        horas = cubo.serie('2023-01-01', '2023-01-02', 'hora').set_index(['datetime', 'name'])
+        pd.testing.assert_series_equal(dia['value'], horas['value'])
+    assert serie['datetime'].is_monotonic_increasing
+    cuartos_serie = serie[serie['datetime'] >= pd.Timestamp('2023-01-02', tz='UTC')]
+    esperado = _esperado(cuartos, '15min', False) / 0.25
+    np.testing.assert_allclose(cuartos_serie.set_index(['datetime', 'name'])['value'].sort_index(),
+                               esperado.sort_index())
+
+    # Y se puede añadir después con la resolución más gruesa
+    otro = Cubo.desde(cuartos).anadir(horario)
+    for a, b in zip(otro.nivel('dia'), cubo.nivel('dia')):
+        np.testing.assert_allclose(a, b)
+
+
+def test_nivel_para():
+    cubo = Cubo.desde(_filas('2023-01-01', 288, '5min'))
+    assert cubo.niveles_dia() == ('5min', '15min', 'hora', 'dia')
+    assert cubo.nivel_para(1, 600) == '5min'
+    assert cubo.nivel_para(3, 600) == '15min'
+    assert cubo.nivel_para(7, 600) == 'hora'
+    assert cubo.nivel_para(365, 600) == 'dia'
@@ -0,0 +1,51 @@
+# IMPORTS
+import numpy as np
+
+import estadisticas_precio
+
+
+def _dias(*fechas):
+    return np.array([np.datetime64(f, 'D') for f in fechas]).astype(np.int64)
+
+
+def test_punta_en_hora_de_madrid():
+    invierno, verano = estadisticas_precio.punta(_dias('2023-01-15', '2023-07-15'))
+    assert list(np.flatnonzero(invierno)) == list(range(7, 19))
+    assert list(np.flatnonzero(verano)) == list(range(6, 18))
+
+
+def test_diferencial():
+    # 10 €/MWh más en las horas punta del día (en UTC, distintas en invierno y en verano)
+    dias = _dias('2023-01-15', '2023-07-15')
+    horas = np.where(estadisticas_precio.punta(dias), 60.0, 50.0)[:, :, None]
+    horas[1, 0, 0] = np.nan
+    valores = estadisticas_precio.calcular(horas, dias)
+    diferencial = valores[estadisticas_precio.ESTADISTICAS.index('diferencial')]
+    np.testing.assert_allclose(diferencial[:, 0], [10.0, 10.0])
+
+
+def test_como_numpy_sin_avisos(recwarn):
+    # Días y series sin ningún dato: NaN, sin avisos de numpy
+    rng = np.random.default_rng(0)
+    dias = np.arange(19358, 19368)
+    horas = rng.normal(50, 30, (len(dias), 24, 3))
+    horas[rng.random(horas.shape) < 0.3] = np.nan
+    horas[2] = np.nan
+    horas[5, :, 1] = np.nan
+    valores = estadisticas_precio.calcular(horas, dias)
+    assert not recwarn.list
+
+    hay = ~np.isnan(horas).all(axis=1)
+    con_datos = np.moveaxis(horas, 1, -1)[hay]
+    esperado = {
+        'media': np.nanmean(con_datos, axis=1),
+        'minimo': np.nanmin(con_datos, axis=1),
+        'maximo': np.nanmax(con_datos, axis=1),
+        'p50': np.nanpercentile(con_datos, 50, axis=1),
+        'volatilidad': np.nanstd(con_datos, axis=1),
+        'horas_negativas': (con_datos < 0).sum(axis=1),
+    }
+    for estadistica, valor in esperado.items():
+        calculado = valores[estadisticas_precio.ESTADISTICAS.index(estadistica)]
+        np.testing.assert_allclose(calculado[hay], valor)
+        assert np.isnan(calculado[~hay]).all()
@@ -0,0 +1,73 @@
+# IMPORTS
+import os
+
+import pandas as pd
+import pytest
+
+import excel
+
+openpyxl = pytest.importorskip('openpyxl')
+
+
+def _libro(ruta, valores):
+    pd.DataFrame({
+        'id': 600, 'name': 'Precio', 'value': valores, 'otra': 'x',
+        'datetime': ['2023-01-01T%02d:00:00.000+01:00' % h for h in range(len(valores))],
+    }).to_excel(ruta, index=False)
+
+
+def test_auxiliar_se_reconstruye_si_cambia_el_libro(tmp_path):
+    ruta = str(tmp_path / 'PrecioMedioHorarioFinal_2023_h.xlsx')
+    _libro(ruta, [1.0, 2.0])
+    assert not excel.auxiliar_valido(ruta)
+
+    df = excel.leer(ruta)
+    assert list(df.columns) == excel.COLUMNAS
+    assert df['value'].tolist() == [1.0, 2.0]
+    assert excel.auxiliar_valido(ruta)
+
+    # Con el auxiliar al día no se vuelve a convertir
+    mtime = os.stat(excel.ruta_auxiliar(ruta)).st_mtime_ns
+    excel.leer(ruta)
+    assert os.stat(excel.ruta_auxiliar(ruta)).st_mtime_ns == mtime
+
+    # Otro contenido (otro hash): el auxiliar deja de valer y se reconstruye
+    _libro(ruta, [1.0, 2.0, 3.0])
+    assert not excel.auxiliar_valido(ruta)
+    assert excel.leer(ruta)['value'].tolist() == [1.0, 2.0, 3.0]
+    assert excel.auxiliar_valido(ruta)
+
+
+def test_auxiliar_sin_las_columnas_pedidas(tmp_path):
+    ruta = str(tmp_path / 'libro.xlsx')
+    _libro(ruta, [1.0])
+    excel.leer(ruta, ['id', 'value'])
+    assert excel.auxiliar_valido(ruta, ['id', 'value'])
+    assert not excel.auxiliar_valido(ruta)
+    assert list(excel.leer(ruta).columns) == excel.COLUMNAS
+
+
+def test_es_auxiliar():
+    assert excel.es_auxiliar('Datos/Economico/PrecioMedioHorarioFinal_2023_h.xlsx.parquet')
+    assert excel.es_auxiliar('libro.XLS.parquet')
+    assert not excel.es_auxiliar('Datos/Almacen/precio_es/year=2023/month=01/part-0.parquet')
+    assert not excel.es_auxiliar('libro.xlsx')
+
+
+@pytest.mark.parametrize('columna, valores', [
+    # Un número guardado como texto después del primer bloque
+    ('value', [1.0, 2.0, 3.0, 4.0, 5.0, '12,5', 7.0]),
+    # Una columna vacía en todo el primer bloque
+    ('id', [None] * 5 + [600, 600]),
+])
+def test_tipos_iguales_en_todos_los_bloques(tmp_path, columna, valores):
+    ruta = str(tmp_path / 'libro.xlsx')
+    datos = {'id': 600, 'name': 'Precio', 'value': 1.0, 'datetime': '2023-01-01'}
+    datos[columna] = valores
+    pd.DataFrame(datos).to_excel(ruta, index=False)
+
+    excel.convertir(ruta, filas=5)
+    por_bloques = excel.leer(ruta)
+    excel.convertir(ruta)
+    pd.testing.assert_frame_equal(por_bloques, excel.leer(ruta))
+    assert por_bloques[columna].tolist()[-2] == valores[-2]
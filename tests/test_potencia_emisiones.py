@@ -0,0 +1,79 @@
+# IMPORTS
+import numpy as np
+import pandas as pd
+
+import potencia_emisiones
+
+
+def _series(semilla=0, paises=3, dias=200):
+    # Potencia e intensidad relacionadas (con ruido) y huecos de NaN en las dos
+    rng = np.random.default_rng(semilla)
+    x = rng.uniform(1000, 5000, (paises, dias))
+    y = 300 - 0.03 * x + rng.normal(0, 20, (paises, dias))
+    x[rng.random(x.shape) < 0.1] = np.nan
+    y[rng.random(y.shape) < 0.1] = np.nan
+    x[0, 50:90] = np.nan
+    return x, y
+
+
+def test_regresion_como_polyfit():
+    x, y = _series()
+    pendiente, ordenada, r, pares = potencia_emisiones.regresion(x, y)
+    for i in range(len(x)):
+        hay = ~np.isnan(x[i]) & ~np.isnan(y[i])
+        esperada = np.polyfit(x[i, hay], y[i, hay], 1)
+        np.testing.assert_allclose([pendiente[i], ordenada[i]], esperada)
+        np.testing.assert_allclose(r[i], np.corrcoef(x[i, hay], y[i, hay])[0, 1])
+        assert pares[i] == hay.sum()
+
+
+def test_regresion_sin_pares_suficientes():
+    x = np.array([[1.0, 2.0, np.nan], [np.nan] * 3])
+    y = np.array([[3.0, 5.0, 7.0], [1.0, 2.0, 3.0]])
+    pendiente, ordenada, r, pares = potencia_emisiones.regresion(x, y)
+    np.testing.assert_allclose([pendiente[0], ordenada[0]], [2.0, 1.0])
+    assert np.isnan(r).all()
+    assert np.isnan(pendiente[1]) and pares.tolist() == [2, 0]
+
+
+def test_correlacion_movil_como_rolling():
+    x, y = _series(semilla=1)
+    correlacion = potencia_emisiones.correlacion_movil(x, y, ventana=30, minimo=10)
+    for i in range(len(x)):
+        esperada = pd.Series(x[i]).rolling(30, min_periods=10).corr(pd.Series(y[i]))
+        np.testing.assert_allclose(correlacion[i], esperada.to_numpy(), atol=1e-9)
+    # Sin pares suficientes dentro del hueco no hay correlación
+    assert np.isnan(correlacion[0, 70:90]).all()
+
+
+def test_descomposicion_tendencia_y_semana():
+    # Recta más un patrón semanal de media 0: la descomposición los separa
+    dias = np.arange(19358, 19358 + 70)
+    semana = np.array([5.0, 3.0, 1.0, 0.0, -1.0, -3.0, -5.0])
+    fase = (dias + 3) % 7
+    y = (200 + 0.5 * np.arange(len(dias)) + semana[fase])[None, :]
+    y[0, 30] = np.nan
+
+    tendencia, estacional, residuo = potencia_emisiones.descomponer(y, dias)
+    # Sin tendencia en los 3 días de cada extremo ni donde la ventana tiene un hueco
+    sin_tendencia = np.isnan(tendencia[0])
+    assert sin_tendencia[:3].all() and sin_tendencia[-3:].all() and sin_tendencia[27:34].all()
+    np.testing.assert_allclose(tendencia[0, ~sin_tendencia], (200 + 0.5 * np.arange(len(dias)))[~sin_tendencia])
+    np.testing.assert_allclose(np.delete(estacional[0], 30), np.delete(semana[fase], 30))
+    assert np.isnan(estacional[0, 30]) and np.isnan(residuo[0, 30])
+    np.testing.assert_allclose(residuo[0, ~sin_tendencia], 0, atol=1e-9)
+
+
+def test_descomposicion_como_medias_moviles_de_pandas():
+    # Tendencia: media móvil centrada de 7 días (solo con la ventana completa)
+    _, y = _series(semilla=2, dias=120)
+    dias = np.arange(19358, 19358 + 120)
+    tendencia, estacional, residuo = potencia_emisiones.descomponer(y, dias)
+    for i in range(len(y)):
+        esperada = pd.Series(y[i]).rolling(7, center=True, min_periods=7).mean()
+        np.testing.assert_allclose(tendencia[i], esperada.to_numpy())
+        # Componente semanal de media 0 y la suma de las tres partes es la serie
+        medias = pd.Series(estacional[i]).groupby((dias + 3) % 7).mean()
+        np.testing.assert_allclose(medias.mean(), 0, atol=1e-9)
+        hay = ~np.isnan(tendencia[i])
+        np.testing.assert_allclose((tendencia + estacional + residuo)[i, hay], y[i, hay])
@@ -0,0 +1,87 @@
+# IMPORTS
+import os
+
+import pandas as pd
+
+import vigilancia
+
+
+CABECERA = b'id;name;value;datetime\n'
+
+
+def _fila(hora):
+    return b'600;Espa\xc3\xb1a;%d.5;2023-01-01T%02d:00:00.000+01:00\n' % (hora, hora)
+
+
+def _estado(ruta):
+    st = os.stat(ruta)
+    return vigilancia.estado(ruta, 'precio_eu', st.st_size, st.st_mtime_ns)
+
+
+def _nuevas(ruta, previo):
+    st = os.stat(ruta)
+    return vigilancia.nuevas(ruta, 'precio_eu', previo, st.st_size, st.st_mtime_ns)
+
+
+def test_nuevas_lee_solo_lo_anadido(tmp_path):
+    ruta = str(tmp_path / 'PrecioEuropa_2023_h.csv')
+    with open(ruta, 'wb') as f:
+        f.write(CABECERA + _fila(0) + _fila(1))
+    previo = _estado(ruta)
+
+    # Una línea completa y otra a medio escribir: solo se lee la completa
+    with open(ruta, 'ab') as f:
+        f.write(_fila(2) + _fila(3)[:10])
+    actual, df = _nuevas(ruta, previo)
+    assert list(df['value']) == [2.5]
+    assert list(df.columns) == ['id', 'name', 'value', 'datetime']
+
+    # El resto de la línea llega en la siguiente revisión
+    with open(ruta, 'ab') as f:
+        f.write(_fila(3)[10:])
+    actual, df = _nuevas(ruta, actual)
+    assert list(df['value']) == [3.5]
+
+    # Sin cambios: nada nuevo
+    _, df = _nuevas(ruta, actual)
+    assert df.empty
+
+
+def test_nuevas_detecta_reescritura(tmp_path):
+    ruta = str(tmp_path / 'PrecioEuropa_2023_h.csv')
+    with open(ruta, 'wb') as f:
+        f.write(CABECERA + _fila(0) + _fila(1))
+    previo = _estado(ruta)
+
+    # Cambia lo ya leído (mismo tamaño): no se sabe qué es nuevo
+    with open(ruta, 'wb') as f:
+        f.write(CABECERA + _fila(0) + _fila(1).replace(b'1.5', b'9.5'))
+    actual, df = _nuevas(ruta, previo)
+    assert df is None
+    assert actual.leido == os.path.getsize(ruta)
+
+    # Más corto que lo leído
+    with open(ruta, 'wb') as f:
+        f.write(CABECERA + _fila(0))
+    _, df = _nuevas(ruta, actual)
+    assert df is None
+
+
+def test_auxiliar_de_excel_no_se_vigila(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Con almacén (una partición cualquiera) cuenta cualquier exportación de las fuentes
+    particion = tmp_path / 'Datos/Almacen/precio_eu/year=2023/month=01'
+    particion.mkdir(parents=True)
+    pd.DataFrame({'value': [1.0]}).to_parquet(particion / 'part-0.parquet')
+    economico = tmp_path / 'Datos/Economico'
+    economico.mkdir(parents=True)
+
+    vigilante = vigilancia.Vigilante(carpetas=('Datos/Economico', 'Datos/Almacen'))
+    vigilante.estados = vigilante.linea_base()
+    # excel.py escribe el auxiliar junto al libro después de la línea base
+    pd.DataFrame({'value': [1.0]}).to_parquet(economico / 'PrecioMedioHorarioFinal_2023_h.xlsx.parquet')
+
+    assert vigilancia.fuente_de('Datos/Economico/PrecioMedioHorarioFinal_2023_h.xlsx.parquet') is None
+    assert vigilancia.fuente_de('Datos/Economico/PrecioMedioHorarioFinal_2023_h.xlsx') == 'precio_es'
+    revision = vigilante.revisar()
+    assert revision is None or not revision.errores
@@ -0,0 +1,209 @@
+# IMPORTS
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+
+
+
+#####################################################
+## Trazas de tiempo de las etapas de cada rerun
+#####################################################
+
+# Las funciones de lectura, preparación, filtrado, construcción de gráficos y
+# serialización se marcan con @medir(categoria) (o un bloque con tramo()).
+# Cada llamada medida deja un tramo: nombre, categoría, inicio y duración
+# relativos al comienzo del rerun, nivel de anidamiento y filas del resultado.
+#
+# Solo se mide lo que se ejecuta dentro de una ejecución abierta con iniciar()
+# en el mismo hilo (el dashboard la abre cuando la URL lleva ?depurar=1), o
+# todo si se llama a activar() (benchmarks, scripts). Con las trazas
+# apagadas (ninguna ejecución abierta en el proceso), una función medida solo
+# comprueba dos variables del módulo antes de llamar a la original.
+#
+# Los tramos de cada ejecución se añaden a RUTA (una línea JSON por tramo) y
+# se acumulan por (categoría, nombre) para las estadísticas.
+
+RUTA = 'trazas.jsonl'
+
+CATEGORIAS = ('lectura', 'carga', 'prep', 'filtro', 'grafico', 'serializacion')
+
+_local = threading.local()
+_global = False
+_abiertas = 0
+_cerrojo = threading.Lock()
+_acumulado = {}
+_ids = itertools.count(1)
+
+
+class Tramo:
+    __slots__ = ('nombre', 'categoria', 'inicio', 'duracion', 'nivel', 'filas', 'datos')
+
+    def __init__(self, nombre, categoria, inicio, nivel, datos):
+        self.nombre = nombre
+        self.categoria = categoria
+        self.inicio = inicio
+        self.duracion = None
+        self.nivel = nivel
+        self.filas = None
+        self.datos = datos
+
+    def como_dict(self):
+        return dict(self.datos, nombre=self.nombre, categoria=self.categoria, inicio=self.inicio,
+                    duracion=self.duracion, nivel=self.nivel, filas=self.filas)
+
+
+class _Nulo:
+    # Tramo que no mide nada (trazas apagadas): acepta y descarta atributos
+    __slots__ = ()
+
+    datos = property(lambda self: {})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def __setattr__(self, nombre, valor):
+        pass
+
+
+_NULO = _Nulo()
+
+
+class _Medicion:
+    __slots__ = ('tramo', '_t0')
+
+    def __init__(self, nombre, categoria, datos):
+        self.tramo = Tramo(nombre, categoria, None, getattr(_local, 'nivel', 0), datos)
+
+    def __enter__(self):
+        _local.nivel = self.tramo.nivel + 1
+        self._t0 = time.perf_counter()
+        self.tramo.inicio = self._t0 - getattr(_local, 'origen', self._t0)
+        return self.tramo
+
+    def __exit__(self, tipo, valor, traza):
+        self.tramo.duracion = time.perf_counter() - self._t0
+        _local.nivel = self.tramo.nivel
+        if tipo is not None:
+            self.tramo.datos['error'] = tipo.__name__
+        _registrar(self.tramo)
+        return False
+
+
+def _midiendo():
+    return _global or (_abiertas and getattr(_local, 'tramos', None) is not None)
+
+
+def _registrar(tramo):
+    with _cerrojo:
+        n, total, maximo, filas = _acumulado.get((tramo.categoria, tramo.nombre), (0, 0.0, 0.0, 0))
+        _acumulado[(tramo.categoria, tramo.nombre)] = (
+            n + 1, total + tramo.duracion, max(maximo, tramo.duracion), filas + (tramo.filas or 0))
+
+    tramos = getattr(_local, 'tramos', None)
+    if tramos is not None:
+        tramos.append(tramo)
+    else:
+        # Modo global fuera de una ejecución (otro hilo, un script): se escribe ya
+        _escribir([tramo], None)
+
+
+def _escribir(tramos, ejecucion):
+    if not RUTA or not tramos:
+        return
+    ahora = time.time()
+    lineas = ''.join(json.dumps(dict(t.como_dict(), ejecucion=ejecucion, ts=ahora, pid=os.getpid(),
+                                     hilo=threading.current_thread().name), default=str) + '\n'
+                     for t in tramos)
+    with _cerrojo:
+        with open(RUTA, 'a', encoding='utf-8') as f:
+            f.write(lineas)
+
+
+def filas(valor):
+    """Filas de un resultado: DataFrame, gráfico con datos, o el primero de una tupla."""
+    if isinstance(valor, tuple) and valor:
+        valor = valor[0]
+    datos = getattr(valor, 'data', None)
+    if datos is not None and hasattr(datos, 'shape') and not hasattr(valor, 'shape'):
+        valor = datos
+    forma = getattr(valor, 'shape', None)
+    return int(forma[0]) if forma else None
+
+
+def tramo(nombre, categoria, **datos):
+    """Bloque medido: `with tramo('leer', 'lectura') as t: ...; t.filas = n`."""
+    if not _midiendo():
+        return _NULO
+    return _Medicion(nombre, categoria, datos)
+
+
+def medir(categoria, nombre=None):
+    """Decorador: mide cada llamada a la función y las filas de su resultado."""
+    def decorar(funcion):
+        etiqueta = nombre or funcion.__qualname__
+
+        @functools.wraps(funcion)
+        def medida(*args, **kwargs):
+            if not (_global or (_abiertas and getattr(_local, 'tramos', None) is not None)):
+                return funcion(*args, **kwargs)
+            with _Medicion(etiqueta, categoria, {}) as t:
+                resultado = funcion(*args, **kwargs)
+                t.filas = filas(resultado)
+            return resultado
+        return medida
+    return decorar
+
+
+def iniciar():
+    """Abre una ejecución (un rerun) en este hilo: desde aquí se miden sus tramos."""
+    global _abiertas
+    if getattr(_local, 'tramos', None) is None:
+        with _cerrojo:
+            _abiertas += 1
+    _local.tramos = []
+    _local.nivel = 0
+    _local.origen = time.perf_counter()
+    _local.ejecucion = next(_ids)
+    return _local.ejecucion
+
+
+def terminar():
+    """Cierra la ejecución del hilo, escribe sus tramos en RUTA y los devuelve."""
+    global _abiertas
+    tramos = getattr(_local, 'tramos', None)
+    if tramos is None:
+        return []
+    _local.tramos = None
+    with _cerrojo:
+        _abiertas -= 1
+    _escribir(tramos, _local.ejecucion)
+    return tramos
+
+
+def activar():
+    """Mide en todos los hilos, haya o no una ejecución abierta."""
+    global _global
+    _global = True
+
+
+def desactivar():
+    global _global
+    _global = False
+
+
+def estadisticas():
+    """Por (categoría, nombre): llamadas, tiempo total y máximo (s) y filas acumuladas."""
+    with _cerrojo:
+        return {clave: dict(zip(('llamadas', 'total', 'maximo', 'filas'), valores))
+                for clave, valores in _acumulado.items()}
+
+
+def vaciar():
+    with _cerrojo:
+        _acumulado.clear()
@@ -0,0 +1,305 @@
+# IMPORTS
+import argparse
+import fnmatch
+import io
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+import pandas as pd
+
+import almacen
+import carga
+import excel
+import fuentes
+from ingesta import FUENTES
+
+
+
+#####################################################
+## Actualización en segundo plano desde Datos/
+#####################################################
+
+# Durante el día llegan a Datos/ exportaciones nuevas de ESIOS y de emisiones.
+# Antes solo se veían reiniciando, que vuelve a leer y preparar el año entero.
+# Aquí un hilo revisa cada INTERVALO segundos las carpetas de CARPETAS y, para
+# cada fichero nuevo o cambiado:
+#
+#   - lee solo lo añadido: en los CSV, los bytes desde lo ya leído hasta el
+#     último salto de línea (con la cabecera delante); en los Excel, que no se
+#     pueden leer por el final, el libro entero (excel.py) del que se toman
+#     las filas a partir de las ya vistas;
+#   - lo normaliza con los mismos prep_* que la carga (fuentes.normalizar_filas);
+#   - lo añade a los datos ya cargados (fuentes.incorporar): los cubos se
+#     copian y se amplían, nunca se modifican;
+#   - vuelve a pedir las etapas de los años precargados (fuentes.refrescar),
+#     que reconstruyen lo derivado (estadísticas, precios horarios, medias de
+#     emisiones) a partir de lo ya ampliado.
+#
+# Todo ocurre dentro de carga.transaccion(): la versión nueva se publica de una
+# vez al terminar. Los reruns fijan al empezar la versión publicada
+# (carga.fijar) y no comprueban los ficheros, así que no esperan a la ingesta
+# ni ven un estado a medias; el siguiente rerun ya usa la versión nueva.
+#
+# Con almacén, las filas nuevas se escriben también en sus particiones, que se
+# vigilan igual: si cambian por otro lado (ingesta.py), lo de los años
+# precargados se reconstruye aquí y el resto de lo que depende de ellas se
+# quita de la caché (carga.descartar_cambiadas) para leerlo cuando se pida.
+#
+# Si un CSV no solo ha crecido (cambia la cabecera o lo anterior a lo leído) o
+# un libro tiene menos filas, no se sabe qué es nuevo: sin almacén, la etapa
+# correspondiente lo vuelve a leer entero (en este hilo); con almacén, se
+# avisa en la revisión para volver a ingerirlo con ingesta.py.
+#
+# Se supone, como con ingesta.py --anadir, que lo añadido son horas nuevas. Lo
+# que ya tienen los ficheros al arrancar se da por cargado.
+#
+# Uso (desde la raíz del repositorio), para ver las revisiones sin el dashboard:
+#   python vigilancia.py [--intervalo 10]
+
+# Con el almacén también se vigilan sus particiones (p. ej. ingesta.py lanzado aparte)
+CARPETAS = ('Datos/Generacion', 'Datos/Economico', 'Datos/Emisiones', almacen.RAIZ)
+
+# Segundos entre revisiones
+INTERVALO = 10
+
+# Fuente de cada fichero según su ruta (uno o varios patrones)
+PATRONES = {
+    'generacion': ('Datos/Generacion/GeneracionTotal_*_h.csv',),
+    'precio_es': tuple('Datos/Economico/PrecioMedioHorarioFinal_*_h' + e for e in excel.EXTENSIONES),
+    'precio_eu': ('Datos/Economico/PrecioEuropa_*_h.csv',),
+    'emisiones': ('Datos/Emisiones/output/CI_bottom_up_method.csv',),
+    'combinado': (fuentes.graf5_path,),
+}
+
+SEPARADORES = dict({fuente: separador for fuente, (separador, _) in FUENTES.items()}, combinado=',')
+
+# Los Parquet auxiliares que excel.py deja junto a los libros no se vigilan:
+# son una copia de un libro que ya se vigila (excel.es_auxiliar)
+EXTENSIONES = ('.csv', '.parquet') + excel.EXTENSIONES
+
+# Bytes anteriores a lo leído que deben seguir iguales para leer solo lo añadido
+COLA = 4096
+
+# Lo ya incorporado de un fichero. leido: en los CSV, bytes hasta el último
+# salto de línea; en los Excel, filas; None si no se lleva la cuenta (ficheros
+# que no son de una fuente)
+Estado = namedtuple('Estado', ['tamano', 'mtime_ns', 'leido', 'cabecera', 'cola'])
+
+# Revisión con cambios: inicio (epoch), duración, filas añadidas por fichero y errores
+Revision = namedtuple('Revision', ['inicio', 'segundos', 'filas', 'errores'])
+
+
+def escanear(carpetas=CARPETAS):
+    """{ruta: (tamaño, mtime_ns)} de los CSV, Excel y Parquet bajo `carpetas` (sin los auxiliares)."""
+    ficheros = {}
+    for carpeta in carpetas:
+        for raiz, _, nombres in os.walk(carpeta):
+            for nombre in nombres:
+                if nombre.lower().endswith(EXTENSIONES) and not excel.es_auxiliar(nombre):
+                    ruta = os.path.join(raiz, nombre)
+                    try:
+                        st = os.stat(ruta)
+                    except FileNotFoundError:
+                        continue
+                    ficheros[ruta.replace(os.sep, '/')] = (st.st_size, st.st_mtime_ns)
+    return ficheros
+
+
+def fuente_de(ruta):
+    """Fuente cuyos datos contiene `ruta` (None si no es de ninguna).
+
+    Sin almacén solo cuentan los ficheros que lee fuentes.py; con almacén,
+    cualquier exportación de la fuente (se ingiere en sus particiones).
+    """
+    if excel.es_auxiliar(ruta):
+        return None
+    if not fuentes.usar_almacen() and ruta not in list(fuentes.FICHEROS.values()) + [fuentes.graf5_path]:
+        return None
+    for fuente, patrones in PATRONES.items():
+        if any(fnmatch.fnmatch(ruta, patron) for patron in patrones):
+            return fuente
+    return None
+
+
+def estado(ruta, fuente, tamano, mtime_ns):
+    """Estado de un fichero dando por incorporado todo lo que tiene ahora."""
+    if fuente is None:
+        return Estado(tamano, mtime_ns, None, b'', b'')
+    if excel.es_excel(ruta):
+        return Estado(tamano, mtime_ns, len(excel.leer(ruta)), b'', b'')
+    # Hasta el final aunque falte el último salto de línea: si se añade luego
+    # una línea que empieza por él, read_csv se salta la línea vacía
+    with open(ruta, 'rb') as f:
+        cabecera = f.readline()
+        f.seek(max(0, tamano - COLA))
+        cola = f.read(min(tamano, COLA))
+    return Estado(tamano, mtime_ns, tamano, cabecera, cola)
+
+
+def _vacio(ruta):
+    # Fichero nuevo: nada incorporado salvo la cabecera
+    if excel.es_excel(ruta):
+        return Estado(0, 0, 0, b'', b'')
+    with open(ruta, 'rb') as f:
+        cabecera = f.readline()
+    return Estado(0, 0, len(cabecera), cabecera, b'')
+
+
+def nuevas(ruta, fuente, previo, tamano, mtime_ns):
+    """(estado, filas añadidas desde `previo` o None si se ha reescrito) de un fichero."""
+    if excel.es_excel(ruta):
+        df = excel.leer(ruta)
+        if len(df) < previo.leido:
+            return estado(ruta, fuente, tamano, mtime_ns), None
+        return Estado(tamano, mtime_ns, len(df), b'', b''), df.iloc[previo.leido:]
+
+    with open(ruta, 'rb') as f:
+        cabecera = f.readline()
+        f.seek(previo.leido - len(previo.cola))
+        cola = f.read(len(previo.cola))
+        if tamano < previo.leido or cabecera != previo.cabecera or cola != previo.cola:
+            return estado(ruta, fuente, tamano, mtime_ns), None
+        bloque = f.read(tamano - previo.leido)
+
+    # Solo líneas completas: lo que quede a medio escribir se lee en la siguiente
+    fin = bloque.rfind(b'\n') + 1
+    bloque = bloque[:fin]
+    actual = Estado(tamano, mtime_ns, previo.leido + fin, cabecera, (previo.cola + bloque)[-COLA:])
+    if not bloque:
+        return actual, pd.DataFrame()
+    return actual, pd.read_csv(io.BytesIO(cabecera + bloque), delimiter=SEPARADORES[fuente])
+
+
+class Vigilante:
+    """Hilo que incorpora los cambios de `carpetas` y publica versiones nuevas de los datos."""
+
+    def __init__(self, carpetas=CARPETAS, intervalo=INTERVALO):
+        self.carpetas = carpetas
+        self.intervalo = intervalo
+        self.estados = None
+        self.revisiones = deque(maxlen=50)
+        self._parar = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name='vigilancia', daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        self._hilo.join()
+
+    def linea_base(self):
+        """Estados de los ficheros actuales (todo lo que tienen se da por cargado)."""
+        estados = {}
+        for ruta, (tamano, mtime_ns) in escanear(self.carpetas).items():
+            try:
+                estados[ruta] = estado(ruta, fuente_de(ruta), tamano, mtime_ns)
+            except Exception:
+                # Sin poder leerlo ahora, sus cambios se tratan como reescrituras
+                estados[ruta] = Estado(tamano, mtime_ns, None, b'', b'')
+        return estados
+
+    def revisar(self):
+        """Incorpora los cambios desde la revisión anterior (None si no publica nada)."""
+        if self.estados is None:
+            self.estados = self.linea_base()
+        actuales = escanear(self.carpetas)
+        cambiados = sorted(r for r, v in actuales.items() if r not in self.estados or self.estados[r][:2] != v)
+        borrados = [r for r in self.estados if r not in actuales]
+        if not cambiados and not borrados:
+            return None
+
+        inicio, reloj = time.time(), time.perf_counter()
+        estados, filas, errores = {}, {}, {}
+        with carga.transaccion() as cambios:
+            # Particiones cambiadas por otro lado: sus meses y su año se vuelven a leer
+            particiones = {almacen.particion(r) for r in cambiados + borrados} - {None}
+            carga.descartar([('almacen', f, a, m) for f, a, m in particiones] +
+                            [('almacen', f, a) for f, a, _ in particiones])
+
+            for ruta in cambiados:
+                fuente = fuente_de(ruta)
+                try:
+                    previo = self.estados.get(ruta) or (_vacio(ruta) if fuente else None)
+                    if fuente is None or previo.leido is None:
+                        estados[ruta] = estado(ruta, fuente, *actuales[ruta])
+                        continue
+                    estados[ruta], df = nuevas(ruta, fuente, previo, *actuales[ruta])
+                    if df is None:
+                        if fuentes.usar_almacen():
+                            errores[ruta] = ValueError('Reescrito (no solo ampliado): vuelve a ingerirlo con ingesta.py')
+                        continue
+                    if len(df):
+                        df = fuentes.normalizar_filas(fuente, df)
+                        for escrita in fuentes.incorporar(fuente, df):
+                            st = os.stat(escrita)
+                            estados[escrita.replace(os.sep, '/')] = Estado(st.st_size, st.st_mtime_ns, None, b'', b'')
+                        filas[ruta] = len(df)
+                except Exception as e:
+                    # Se reintenta en la siguiente revisión
+                    estados.pop(ruta, None)
+                    errores[ruta] = e
+            for (anio, etapa), e in fuentes.refrescar().items():
+                errores['%s (%d)' % (etapa, anio)] = e
+            # Lo que aún depende de ficheros cambiados y no se ha reconstruido
+            # se quita: se volverá a leer cuando se pida
+            carga.descartar_cambiadas()
+
+        self.estados.update(estados)
+        for ruta in borrados:
+            del self.estados[ruta]
+        if not (cambios or errores):
+            return None
+        revision = Revision(inicio, time.perf_counter() - reloj, filas, errores)
+        self.revisiones.append(revision)
+        return revision
+
+    def _bucle(self):
+        self.estados = self.linea_base()
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.revisar()
+            except Exception as e:
+                self.revisiones.append(Revision(time.time(), 0.0, {}, {'revisión': e}))
+
+
+_vigilante = None
+_cerrojo = threading.Lock()
+
+
+def arrancar(carpetas=CARPETAS, intervalo=INTERVALO):
+    """Arranca (una vez por proceso) el hilo y activa las versiones fijadas de carga.py."""
+    global _vigilante
+    with _cerrojo:
+        if _vigilante is None:
+            carga.vigilar(True)
+            _vigilante = Vigilante(carpetas, intervalo).iniciar()
+        return _vigilante
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incorpora en segundo plano los ficheros nuevos de Datos/')
+    parser.add_argument('--intervalo', type=float, default=INTERVALO, help='Segundos entre revisiones')
+    args = parser.parse_args()
+
+    fuentes.precargar(fuentes.anios_disponibles()[-1]).esperar()
+    vigilante = arrancar(intervalo=args.intervalo)
+    ultima = 0
+    try:
+        while True:
+            time.sleep(args.intervalo)
+            for revision in [r for r in vigilante.revisiones if r.inicio > ultima]:
+                print('%s  %.2f s  %s' % (time.strftime('%H:%M:%S', time.localtime(revision.inicio)),
+                                          revision.segundos, revision.filas or 'sin filas nuevas'))
+                for origen, error in revision.errores.items():
+                    print('    error en %s: %s' % (origen, error))
+                ultima = revision.inicio
+    except KeyboardInterrupt:
+        vigilante.parar()
+
+
+if __name__ == '__main__':
+    main()